@@ -48,6 +48,22 @@ class Config():
                 d[key] = str(d[key])
         return d
 
+    def slots(self):
+        """
+        Enabled slots from slot_map as a list of (slot number, slot settings), ordered by slot number.
+
+        Slot settings bind a slot to its hardware, e.g.
+            "2": {"enabled": true, "interface_port": "COM7", "dut_port": "COM8",
+                  "programmer_sn": "0669FF...", "ble_port": "COM9", "leds": {"busy": 1, "pass": 2, "fail": 3}}
+        Ports can also be given by USB attributes, which survive re-enumeration, e.g.
+            "interface_port": {"serial_number": "3677349A3331"}, "dut_port": {"location": "1-2.3:1.0"}
+        (see PortRegistry).
+        Without a slot_map there is one slot that finds its devices by VID/PID.
+        """
+        if not self.slot_map:
+            return [(1, {})]
+        return sorted((int(k), v) for k, v in self.slot_map.items() if v.get("enabled", True))
+
     @classmethod
     def load(cls, config_dir=None):
         """
@@ -0,0 +1,216 @@
+import collections
+import contextlib
+import itertools
+import logging
+import threading
+import time
+
+
+class LeaseTimeout(Exception):
+    pass
+
+
+class LeaseDeadlock(Exception):
+    pass
+
+
+class ResourceArbiter(object):
+    """
+    Named leases on physical resources shared between slots and testcases (ST-Link, BLE dongle,
+    network services).
+
+    Each resource has a capacity (default 1) and a FIFO queue: leases are granted in request order,
+    so a slot cannot be starved by another one re-acquiring in a loop. Leases are reentrant per
+    owner. Waiting honours a timeout (LeaseTimeout).
+
+    lease() acquires several resources in name order, which cannot deadlock. Nested acquisitions
+    that break that order are logged, and an acquisition that would close a cycle in the wait-for
+    graph (owner A holds X and waits for Y, owner B holds Y and waits for X) raises LeaseDeadlock
+    instead of blocking forever.
+
+    The time spent queueing is recorded per resource, stats() gives the totals and a histogram.
+    """
+
+    # histogram bucket upper bounds, seconds
+    BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0, 60.0)
+    # queue waits kept per resource for stats(); a production line runs for weeks
+    WAITS_SIZE = 10000
+
+    lock = threading.Lock()
+    default = None
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.cv = threading.Condition()
+        self.capacity = {}
+        # name -> {owner: lease count}
+        self.holders = collections.defaultdict(dict)
+        # name -> deque of waiting tickets, head is served first
+        self.queues = collections.defaultdict(collections.deque)
+        # owner -> name it is waiting for
+        self.waiting = {}
+        self.tickets = itertools.count()
+        # name -> the last WAITS_SIZE queue waits
+        self.waits = collections.defaultdict(lambda: collections.deque(maxlen=self.WAITS_SIZE))
+        self.counters = collections.defaultdict(lambda: {"leases": 0, "timeouts": 0, "deadlocks": 0,
+                                                         "out_of_order": 0})
+
+    @classmethod
+    def instance(cls):
+        """
+        Process wide arbiter shared by all slots
+        """
+        with cls.lock:
+            if cls.default is None:
+                cls.default = cls()
+            return cls.default
+
+    def configure(self, name, capacity=1):
+        """
+        Allow `capacity` concurrent leases of a resource (e.g. a rate limited network service)
+        """
+        with self.cv:
+            self.capacity[name] = capacity
+            self.cv.notify_all()
+
+    def held(self, owner):
+        with self.cv:
+            return sorted(name for name, h in self.holders.items() if owner in h)
+
+    def _deadlock(self, name, owner):
+        # walk the wait-for graph from the holders of name, looking for owner
+        seen = set()
+        pending = list(self.holders[name])
+        while pending:
+            o = pending.pop()
+            if o == owner:
+                return True
+            if o in seen:
+                continue
+            seen.add(o)
+            if o in self.waiting:
+                pending.extend(self.holders[self.waiting[o]])
+        return False
+
+    def acquire(self, name, owner, timeout=None):
+        """
+        Lease name for owner, return the time spent waiting
+        """
+        start = time.monotonic()
+        with self.cv:
+            holders = self.holders[name]
+            if owner in holders:
+                holders[owner] += 1
+                return 0.0
+
+            held = [n for n, h in self.holders.items() if owner in h]
+            if held and name < max(held):
+                self.counters[name]["out_of_order"] += 1
+                self.logger.warning("ResourceArbiter: %s acquires %s while holding %s (out of order)" % (
+                    owner, name, ", ".join(sorted(held))))
+
+            ticket = next(self.tickets)
+            queue = self.queues[name]
+            queue.append(ticket)
+            self.waiting[owner] = name
+            try:
+                while queue[0] != ticket or len(holders) >= self.capacity.get(name, 1):
+                    if self._deadlock(name, owner):
+                        self.counters[name]["deadlocks"] += 1
+                        raise LeaseDeadlock("%s waiting for %s: deadlock with %s" % (
+                            owner, name, ", ".join(holders)))
+                    remaining = None
+                    if timeout is not None:
+                        remaining = start + timeout - time.monotonic()
+                        if remaining <= 0:
+                            self.counters[name]["timeouts"] += 1
+                            raise LeaseTimeout("%s: no lease on %s after %.1fs (held by %s)" % (
+                                owner, name, timeout, ", ".join(holders)))
+                    self.cv.wait(remaining)
+            except Exception:
+                queue.remove(ticket)
+                del self.waiting[owner]
+                self.cv.notify_all()
+                raise
+
+            queue.popleft()
+            del self.waiting[owner]
+            holders[owner] = 1
+            wait = time.monotonic() - start
+            self.waits[name].append(wait)
+            self.counters[name]["leases"] += 1
+            # the next ticket may fit in the remaining capacity
+            self.cv.notify_all()
+            return wait
+
+    def release(self, name, owner):
+        with self.cv:
+            holders = self.holders[name]
+            if owner not in holders:
+                raise Exception("ResourceArbiter: %s does not hold %s" % (owner, name))
+            holders[owner] -= 1
+            if holders[owner] == 0:
+                del holders[owner]
+                self.cv.notify_all()
+
+    @contextlib.contextmanager
+    def lease(self, names, owner, timeout=None):
+        """
+        Hold all of names for the duration of the with block. Yields {name: wait seconds}.
+        timeout applies to the whole acquisition.
+        """
+        start = time.monotonic()
+        acquired = []
+        waits = {}
+        try:
+            for name in sorted(set(names)):
+                remaining = None
+                if timeout is not None:
+                    remaining = max(0.0, start + timeout - time.monotonic())
+                waits[name] = self.acquire(name, owner, remaining)
+                acquired.append(name)
+            yield waits
+        finally:
+            for name in reversed(acquired):
+                self.release(name, owner)
+
+    @staticmethod
+    def histogram(waits):
+        """
+        Summary of a list of wait times: count, total, max and counts per BUCKETS bound
+        """
+        buckets = collections.OrderedDict(("<=%gs" % b, 0) for b in ResourceArbiter.BUCKETS)
+        buckets[">%gs" % ResourceArbiter.BUCKETS[-1]] = 0
+        for w in waits:
+            for b in ResourceArbiter.BUCKETS:
+                if w <= b:
+                    buckets["<=%gs" % b] += 1
+                    break
+            else:
+                buckets[">%gs" % ResourceArbiter.BUCKETS[-1]] += 1
+        return {
+            "n": len(waits),
+            "wait_total": sum(waits),
+            "wait_max": max(waits) if waits else 0.0,
+            "histogram": buckets,
+        }
+
+    def stats(self):
+        """
+        Per resource lease counts since start (or reset_stats()) and histogram of the last WAITS_SIZE
+        queue waits
+        """
+        with self.cv:
+            stats = {}
+            for name in sorted(set(self.waits) | set(self.counters)):
+                stats[name] = ResourceArbiter.histogram(self.waits[name])
+                stats[name].update(self.counters[name])
+            return stats
+
+    def reset_stats(self):
+        with self.cv:
+            self.waits.clear()
+            self.counters.clear()
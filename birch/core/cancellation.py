@@ -0,0 +1,282 @@
+import contextlib
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+class CancellationToken(object):
+    """
+    Cooperative cancellation for blocking test code.
+
+    A token is bound to the thread running a testcase (bind()), so drivers find it with current()
+    without it being threaded through every call. Waits go through sleep() / timeout() / check(),
+    which return early or raise OperationCancelled once the token is cancelled. Blocking calls that
+    cannot poll (a child process, a serial read) register an on_cancel() callback that interrupts
+    them, e.g. kill the process or cancel_read() the port.
+
+    activity() names the call in progress; when the token is cancelled the current step and call
+    stack are captured in `active`, so a timeout records exactly what was running.
+
+    The token also accounts where the time goes: account() charges a wait to sleep, io or
+    subprocess, and split() breaks the wall time since a mark() down into those, CPU and other
+    (waits nobody accounted for).
+    """
+
+    # kinds of wait for account()
+    WAITS = ("sleep", "io", "subprocess")
+
+    _local = threading.local()
+
+    def __init__(self, name="token", logger=None):
+        self.name = name
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        self.reason = None
+        self.deadline = None
+        self.step = None
+        self.calls = []
+        self.callbacks = []
+        # step/calls snapshot taken when cancelled
+        self.active = None
+        self.timing = dict.fromkeys(self.WAITS, 0.0)
+        # CPU time spent inside accounted waits, not counted again as compute
+        self.wait_cpu = 0.0
+        self._depth = 0
+
+    @classmethod
+    def current(cls):
+        """
+        Token bound to this thread, a token that is never cancelled if none
+        """
+        return getattr(cls._local, "token", None) or NEVER
+
+    @contextlib.contextmanager
+    def bind(self):
+        previous = getattr(CancellationToken._local, "token", None)
+        CancellationToken._local.token = self
+        try:
+            yield self
+        finally:
+            CancellationToken._local.token = previous
+
+    def cancel(self, reason="cancelled"):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.reason = reason
+            self.active = {"step": self.step, "calls": list(self.calls)}
+            callbacks = list(self.callbacks)
+            self.event.set()
+        self.logger.warning("%s: %s during step %s, call %s" % (
+            self.name, reason, self.active["step"], " > ".join(self.active["calls"]) or "-"))
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                self.logger.warning("%s: cancel callback failed: %s" % (self.name, e))
+
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        """
+        Raise OperationCancelled if cancelled
+        """
+        if self.event.is_set():
+            raise OperationCancelled("%s: %s" % (self.name, self.reason))
+
+    def remaining(self):
+        """
+        Seconds to the deadline, None without one
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout(self, timeout):
+        """
+        timeout clipped to the deadline, for calls that take a timeout argument
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def sleep(self, seconds):
+        """
+        time.sleep() that wakes up and raises OperationCancelled when cancelled
+        """
+        with self.account("sleep"):
+            self.event.wait(seconds)
+        self.check()
+
+    @contextlib.contextmanager
+    def on_cancel(self, fn):
+        """
+        Call fn (from the cancelling thread) if cancelled during the with block
+        """
+        with self.lock:
+            self.callbacks.append(fn)
+            cancelled = self.event.is_set()
+        try:
+            if cancelled:
+                fn()
+            yield
+        finally:
+            with self.lock:
+                self.callbacks.remove(fn)
+
+    @contextlib.contextmanager
+    def activity(self, call):
+        """
+        Name the blocking call in progress (nested calls stack up)
+        """
+        self.check()
+        with self.lock:
+            self.calls.append(call)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.calls.pop()
+
+    @contextlib.contextmanager
+    def account(self, kind):
+        """
+        Charge the time spent in the with block to kind (see WAITS). Nested blocks count once,
+        for the outermost kind.
+        """
+        if self._depth:
+            yield
+            return
+        self._depth += 1
+        start = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.timing[kind] += time.perf_counter() - start
+            self.wait_cpu += time.thread_time() - cpu
+            self._depth -= 1
+
+    def mark(self):
+        return time.perf_counter(), time.thread_time(), dict(self.timing), self.wait_cpu
+
+    def split(self, mark):
+        """
+        Wall time since mark() split into the accounted waits, cpu and other, seconds
+        """
+        wall = time.perf_counter() - mark[0]
+        split = {kind: round(self.timing[kind] - mark[2][kind], 4) for kind in self.WAITS}
+        cpu = max(0.0, time.thread_time() - mark[1] - (self.wait_cpu - mark[3]))
+        split["cpu"] = round(cpu, 4)
+        split["other"] = round(max(0.0, wall - sum(split[kind] for kind in self.WAITS) - cpu), 4)
+        split["wall"] = round(wall, 4)
+        return split
+
+
+class _NeverCancelled(CancellationToken):
+    """
+    Token seen by code running outside a testcase: plain sleeps, nothing recorded
+    """
+
+    def cancel(self, reason="cancelled"):
+        raise Exception("The default token cannot be cancelled")
+
+    @contextlib.contextmanager
+    def activity(self, call):
+        yield
+
+    @contextlib.contextmanager
+    def account(self, kind):
+        yield
+
+
+NEVER = _NeverCancelled("never")
+
+
+def cancellable(fn):
+    """
+    Decorator: run a driver method as an activity() of the current token, named after the method
+    and its first argument, e.g. "UBloxSara.at_command b'AT+CGMI'"
+    """
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        call = fn.__qualname__ if not args else "%s %r" % (fn.__qualname__, args[0])
+        with CancellationToken.current().activity(call):
+            return fn(self, *args, **kwargs)
+    return wrapper
+
+
+class Watchdog(object):
+    """
+    Enforces deadlines: one thread cancels each watched token when its deadline passes.
+    """
+
+    lock = threading.Lock()
+    default = None
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.cv = threading.Condition()
+        # (deadline, seq, token, timeout), earliest first
+        self.heap = []
+        self.seq = itertools.count()
+        self.fired = 0
+        self.thread = threading.Thread(target=self.run, name="watchdog", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def instance(cls):
+        with cls.lock:
+            if cls.default is None:
+                cls.default = cls()
+            return cls.default
+
+    def watch(self, token, timeout):
+        """
+        Cancel token `timeout` seconds from now unless unwatch()ed first
+        """
+        token.deadline = time.monotonic() + timeout
+        with self.cv:
+            heapq.heappush(self.heap, (token.deadline, next(self.seq), token, timeout))
+            self.cv.notify()
+
+    def unwatch(self, token):
+        with self.cv:
+            self.heap = [e for e in self.heap if e[2] is not token]
+            heapq.heapify(self.heap)
+        token.deadline = None
+
+    @contextlib.contextmanager
+    def deadline(self, token, timeout):
+        self.watch(token, timeout)
+        try:
+            yield token
+        finally:
+            self.unwatch(token)
+
+    def run(self):
+        while True:
+            with self.cv:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    self.cv.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                deadline, _, token, timeout = heapq.heappop(self.heap)
+                self.fired += 1
+            token.cancel("timeout after %.1fs" % timeout)
@@ -0,0 +1,76 @@
+import logging
+import queue
+import threading
+import time
+
+
+class CompletionPipeline(object):
+    """
+    Background worker for the post-test work of a slot (result log, database upload, job file).
+
+    Jobs run one at a time in submission order on a daemon thread, so the slot can show the verdict
+    and accept the next DUT while the previous result is still being stored. A job that raises is
+    logged and reported through on_error(name, exception); it never reaches the slot thread.
+    """
+
+    def __init__(self, name="pipeline", on_error=None, logger=None):
+        self.name = name
+        self.on_error = on_error
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.queue = queue.Queue()
+        # jobs submitted and not finished yet
+        self.pending = 0
+        self.cv = threading.Condition()
+        self.counters = {"jobs": 0, "failures": 0, "busy_time": 0.0, "max_pending": 0, "max_latency": 0.0}
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, name, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs), return immediately
+        """
+        with self.cv:
+            self.pending += 1
+            self.counters["max_pending"] = max(self.counters["max_pending"], self.pending)
+        self.queue.put((name, fn, args, kwargs, time.monotonic()))
+
+    def run(self):
+        while True:
+            name, fn, args, kwargs, submitted = self.queue.get()
+            start = time.monotonic()
+            failed = False
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                failed = True
+                self.logger.exception("%s: %s failed: %s" % (self.name, name, e))
+                if self.on_error is not None:
+                    try:
+                        self.on_error(name, e)
+                    except Exception:
+                        self.logger.exception("%s: error callback failed" % self.name)
+            end = time.monotonic()
+            with self.cv:
+                self.pending -= 1
+                self.counters["jobs"] += 1
+                self.counters["failures"] += failed
+                self.counters["busy_time"] += end - start
+                # submit -> done, including the time queued behind earlier jobs
+                self.counters["max_latency"] = max(self.counters["max_latency"], end - submitted)
+                self.cv.notify_all()
+
+    def drain(self, timeout=None):
+        """
+        Wait for all submitted jobs to finish. Return False on timeout.
+        """
+        with self.cv:
+            return self.cv.wait_for(lambda: self.pending == 0, timeout)
+
+    def stats(self):
+        with self.cv:
+            stats = dict(self.counters)
+            stats["pending"] = self.pending
+            return stats
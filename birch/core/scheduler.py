@@ -0,0 +1,156 @@
+import logging
+import queue
+import threading
+
+from birch.test_status import TestStatus
+
+
+class TestcaseScheduler(object):
+    """
+    Runs the testcases of a suite in dependency order.
+
+    The preconditions DAG is checked and ordered once. A testcase is eligible when it is UNTESTED
+    and all of its preconditions PASSed. Sequentially this is the same selection as the original
+    TestSuite.next_testcase(). In parallel mode every eligible testcase whose resources do not
+    conflict with a running one is started on its own thread. Testcases that share a resource still
+    start in suite order, so a later one never overtakes an earlier one on the same device. A
+    testcase with resources=None claims everything and always runs alone.
+    """
+
+    def __init__(self, testcases, preconditions, order=None, logger=None):
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.testcases = testcases
+        self.preconditions = preconditions
+
+        # order may come precomputed from a SuitePlan
+        if order is None:
+            order = TestcaseScheduler.sort(list(self.testcases.keys()), self.preconditions)
+        self.order = order
+
+    @staticmethod
+    def sort(test_ids, preconditions):
+        """
+        Sequential selection order assuming every testcase passes. Raises on unknown
+        preconditions and cycles.
+        """
+        for test_id in test_ids:
+            for d in preconditions[test_id]:
+                if d not in test_ids:
+                    raise Exception("Test case %s: unknown precondition %s" % (test_id, d))
+
+        order = []
+        done = set()
+        remaining = list(test_ids)
+        while remaining:
+            for test_id in remaining:
+                if all(d in done for d in preconditions[test_id]):
+                    break
+            else:
+                raise Exception("Test case preconditions form a cycle: %s" % ", ".join(remaining))
+            remaining.remove(test_id)
+            done.add(test_id)
+            order.append(test_id)
+        return order
+
+    @staticmethod
+    def conflicts(a, b):
+        """
+        True if two resource claims overlap (None claims everything).
+        """
+        if a is None or b is None:
+            return True
+        return bool(set(a) & set(b))
+
+    def eligible(self, t):
+        if t.status != TestStatus.UNTESTED:
+            return False
+        return all(self.testcases[d].status == TestStatus.PASS for d in self.preconditions[t.test_id])
+
+    def blocked(self, t, pending, running):
+        # A precondition finished without passing, or was itself dropped: t will never become eligible
+        for d in self.preconditions[t.test_id]:
+            status = self.testcases[d].status
+            if status == TestStatus.PASS or d in running:
+                continue
+            if status == TestStatus.UNTESTED and d in pending:
+                continue
+            return True
+        return False
+
+    def next_testcase(self):
+        """
+        Return the next test, None when done
+        """
+        for t in self.testcases.values():
+            if self.eligible(t):
+                return t
+        return None
+
+    def run(self, run_fn, parallel=False, on_complete=None):
+        """
+        Execute the suite. run_fn(testcase) runs one testcase (including retries) and returns its
+        result; on_complete(testcase, result) is called on the calling thread as each one finishes.
+        Returns [(testcase, result)] in completion order.
+        """
+        if parallel:
+            return self._run_parallel(run_fn, on_complete)
+
+        completed = []
+        t = self.next_testcase()
+        while t is not None:
+            result = run_fn(t)
+            completed.append((t, result))
+            if on_complete is not None:
+                on_complete(t, result)
+            t = self.next_testcase()
+        return completed
+
+    def _run_parallel(self, run_fn, on_complete):
+        completed = []
+        done = queue.Queue()
+        running = {}  # test_id -> resources
+        pending = [test_id for test_id in self.order if self.testcases[test_id].status == TestStatus.UNTESTED]
+
+        def worker(t):
+            try:
+                result = run_fn(t)
+            except Exception as e:
+                self.logger.exception("TestcaseScheduler: %s raised %s" % (t.test_id, e))
+                t.status = TestStatus.ERROR
+                result = None
+            done.put((t, result))
+
+        while pending or running:
+            waiting = []  # claims of earlier testcases that could not start yet
+            for test_id in list(pending):
+                t = self.testcases[test_id]
+                if self.blocked(t, pending, running):
+                    pending.remove(test_id)
+                    continue
+                claim = getattr(t, "resources", None)
+                busy = list(running.values()) + waiting
+                if not self.eligible(t) or any(self.conflicts(claim, r) for r in busy):
+                    waiting.append(claim)
+                    continue
+                pending.remove(test_id)
+                running[test_id] = claim
+                # Mark as started before the thread runs so it is not selected twice
+                t.status = TestStatus.INCOMPLETE
+                self.logger.debug("TestcaseScheduler: start %s (resources=%s, running=%s)" % (
+                    test_id, claim, list(running.keys())))
+                threading.Thread(target=worker, args=(t,), name="testcase-%s" % test_id, daemon=True).start()
+
+            if not running:
+                # Nothing left that can start
+                break
+
+            t, result = done.get()
+            del running[t.test_id]
+            completed.append((t, result))
+            if on_complete is not None:
+                on_complete(t, result)
+
+        return completed
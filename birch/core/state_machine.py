@@ -1,4 +1,6 @@
+import collections
 import enum
+import threading
 import time
 import attr
 import logging
@@ -10,10 +12,14 @@ from .stoppable_thread import StoppableThread
 class State():
     """
     Generic state, wraps calling of entry , run and exit functions
+
+    event_fn(event, data) is called for each message posted to the state machine while the state
+    is active, before run_fn.
     """
     enter_fn = attr.ib()
     run_fn = attr.ib()
     exit_fn = attr.ib()
+    event_fn = attr.ib(default=None)
 
     def enter(self):
         if self.enter_fn:
@@ -27,11 +33,21 @@ class State():
         if self.exit_fn:
             self.exit_fn()
 
+    def event(self, event, data):
+        if self.event_fn:
+            self.event_fn(event, data)
+
 
 class StateMachine(LogObject):
     event_logger = logging.getLogger("event_logger")
     """
     State transition machinery
+
+    The machine thread sleeps on a condition variable and is woken by state_transition() from any
+    thread, post(), wake() or a timer set with set_timer(), so a transition is acted on as soon as
+    it is requested. The current state's run_fn is called after every wake-up and, for
+    compatibility with polling states, at least every tick_period seconds. tick_period=None makes
+    the machine purely event driven.
     """
 
     def __init__(self, prefix="SM", tick_period=0.1, debug=True, *args, **kwargs):
@@ -44,16 +60,81 @@ class StateMachine(LogObject):
         self.thread = None
         self.state_timer = 0
 
+        self.cv = threading.Condition()
+        # (event, data, time.monotonic() when posted)
+        self.events = collections.deque()
+        self.woken = False
+        # time.monotonic() deadline for set_timer(), cleared on every state change
+        self.timer = None
+        # time.monotonic() of the last state_transition() and the delay until the new state was entered
+        self.transition_time = None
+        self.transition_latency = None
+
     def start(self):
         self.log_debug("start")
         self.running = True
 
     def stop(self):
         self.log_debug("stop")
-        self.running = False
+        with self.cv:
+            self.running = False
+            self.cv.notify_all()
 
     def state_transition(self, new_state):
-        self.state = new_state
+        with self.cv:
+            self.state = new_state
+            self.transition_time = time.monotonic()
+            self.cv.notify_all()
+
+    def post(self, event, data=None):
+        """
+        Queue a message for the current state's event_fn and wake the machine. Safe from any thread.
+        """
+        with self.cv:
+            self.events.append((event, data, time.monotonic()))
+            self.cv.notify_all()
+
+    def wake(self):
+        """
+        Run the current state's run_fn now, e.g. from a pubsub listener or a fixture callback.
+        """
+        with self.cv:
+            self.woken = True
+            self.cv.notify_all()
+
+    def set_timer(self, seconds):
+        """
+        Wake the current state after `seconds` (replaces a pending timer).
+        """
+        with self.cv:
+            self.timer = time.monotonic() + seconds
+            self.cv.notify_all()
+
+    def _wait(self, current_state):
+        # Block until something may have changed for current_state
+        with self.cv:
+            while self.running and self.state == current_state and not self.events and not self.woken:
+                now = time.monotonic()
+                deadline = None
+                if self.tick_period is not None:
+                    deadline = now + self.tick_period
+                if self.timer is not None:
+                    if self.timer <= now:
+                        self.timer = None
+                        break
+                    deadline = self.timer if deadline is None else min(deadline, self.timer)
+                if not self.cv.wait(None if deadline is None else deadline - now):
+                    # tick or timer elapsed
+                    if self.timer is not None and self.timer <= time.monotonic():
+                        self.timer = None
+                    break
+            self.woken = False
+
+    def _dispatch(self, s):
+        with self.cv:
+            events, self.events = self.events, collections.deque()
+        for event, data, t in events:
+            s.event(event, data)
 
     def run(self):
         self.start()
@@ -63,11 +144,20 @@ class StateMachine(LogObject):
             self.log_info("%s -> %s" % (current_state, self.state))
             current_state = self.state
             s = self.state_table[current_state]
+            with self.cv:
+                self.timer = None
+                if self.transition_time is not None:
+                    self.transition_latency = time.monotonic() - self.transition_time
             s.enter()
             self.state_timer = time.time()
             while current_state == self.state and self.running:
-                time.sleep(self.tick_period)
+                self._dispatch(s)
+                if current_state != self.state:
+                    break
                 s.run()
+                if current_state != self.state:
+                    break
+                self._wait(current_state)
             s.exit()
 
     def state_elapsed_time(self):
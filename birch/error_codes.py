@@ -1,13 +1,29 @@
 import enum
 from pathlib import Path
 import json
+import os
+import threading
+
+_cache = {}
+_lock = threading.Lock()
 
 
 def load_error_codes(config_dir):
     """
     Load application specific error codes from config_dir/error_codes.json.  
+
+    The enum is built once and reused until the file changes, so every testcase of every DUT
+    shares the same ErrorCode class.
     """
-    f = open(Path(config_dir) / "error_codes.json", "r")
-    l = json.load(f)
-    e = enum.IntEnum('ErrorCode', l)
-    return e
+    p = Path(config_dir) / "error_codes.json"
+    st = os.stat(p)
+    key = (str(p.resolve()), st.st_mtime_ns, st.st_size)
+    with _lock:
+        e = _cache.get(key)
+        if e is None:
+            with open(p, "r") as f:
+                l = json.load(f)
+            e = enum.IntEnum('ErrorCode', l)
+            _cache.clear()
+            _cache[key] = e
+        return e
@@ -2,6 +2,8 @@ import wx
 import time
 import json
 
+from birch.peripheral.port_registry import port_label
+
 
 class AboutFrame(wx.Dialog):
     def __init__(self, config, *args, **kwds):
@@ -17,10 +19,8 @@ class AboutFrame(wx.Dialog):
         self.key_value(grid_sizer, "Fixture number", config.fixture_number)
         self.key_value(grid_sizer, "Sofware version", config.version)
 
-        for slot in sorted(config.slot_map.keys()):
-            slot_info = config.slot_map[slot]
-            if slot_info["enabled"] == False:
-                continue
+        for slot, slot_info in config.slots():
+            self.key_value(grid_sizer, "Slot %d" % slot, port_label(slot_info.get("interface_port", "auto")))
             fw = "not connected"
         #           try:
         #               fw = Config["firmware_version"][slot]
@@ -8,7 +8,7 @@ TIMER_UPDATE_INTERVAL_MS = 143
 
 
 class SlotPanel(wx.Panel):
-    def __init__(self, index, show_serial=False, *args, **kwds):
+    def __init__(self, index, show_serial=False, number=None, *args, **kwds):
         kwds["style"] = wx.TAB_TRAVERSAL | wx.BORDER_DOUBLE
         wx.Panel.__init__(self, *args, **kwds)
 
@@ -18,16 +18,18 @@ class SlotPanel(wx.Panel):
         self.result_font = wx.Font(24, wx.SWISS, wx.NORMAL, wx.BOLD)
 
         self.index = index
+        # slot_map number of the slot shown, see Slot
+        self.number = index + 1 if number is None else number
         self.eui = " "
         self.bgcolor = TestStatus.color(
             TestStatus.INACTIVE)  # tuple([a-b for a,b in zip(self.GetBackgroundColour(), (25,25,25))])
         self.SetBackgroundColour(self.bgcolor)
         # slot name
-        self.slot_name = wx.StaticText(self, label="%d" % (index + 1))
+        self.slot_name = wx.StaticText(self, label="%d" % self.number)
         self.slot_name.SetFont(self.emph_font)
         self.textcolor = self.slot_name.GetForegroundColour()
 
-        self.msg_topic = "slot%02d" % index
+        self.msg_topic = "slot%02d" % self.number
 
         self.run_timer = wx.Timer(self)
         self.show_serial = show_serial
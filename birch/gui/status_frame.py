@@ -37,6 +37,8 @@ class StatusFrame(wx.Frame):
         self.warning_enable = False
         
         self.create_menubar()
+        # non-modal alerts, e.g. a result upload that failed after the slot moved on
+        self.CreateStatusBar()
 
         # the subclass will fill this with a list of slots
         self.slotpanel = [None] * self.slot_count
@@ -126,7 +128,8 @@ class StatusFrame(wx.Frame):
             "log_upload_enable": self.log_upload_warning,
             "barcode_set": self.disable_checkboxes,
             "testing_complete": self.disable_checkboxes,
-            "internet_warning": self.show_internet_warning         
+            "internet_warning": self.show_internet_warning,
+            "alert": self.show_alert,
             # "barcode": self.set_barcode
         }
 
@@ -153,6 +156,9 @@ class StatusFrame(wx.Frame):
 
     def show_internet_warning(self, bool:bool):
         pass
+
+    def show_alert(self, text):
+        self.SetStatusText(time.strftime("%H:%M:%S ") + text)
     
 
 
@@ -35,6 +35,8 @@ class Job():
     _units_tested = attr.ib(default=0)  # units tested
     _required_pass = attr.ib(default=0)  # required number of passes to complete job
     _reserved_tokens = {}  # list of tokens reserved for consumption
+    _units_active = 0  # units being tested by the slots
+    _deleted = False
     _token_filter = "[a-zA-Z0-9]*"  # token file naming format
 
     # Testing
@@ -140,14 +142,33 @@ class Job():
         pub.sendMessage("status", message={"units_tested": self._units_tested})
         self.save()
 
-    def unit_tested(self):
+    def unit_tested(self, save=True):
         """
-        Called to increment the tested counter
+        Called to increment the tested counter. save=False leaves the job file update to the caller.
         """
         with self._lock:
             self._units_tested += 1
         pub.sendMessage("status", message={"units_tested": self._units_tested})
-        self.save()
+        if save:
+            self.save()
+
+    def start_unit(self):
+        """
+        Called by a slot before testing a DUT. Return False if the units passed plus the units being
+        tested in other slots already reach required_pass, so parallel slots do not overshoot the job.
+        """
+        with self._lock:
+            if self._required_pass > 0 and self._units_passed + self._units_active >= self._required_pass:
+                return False
+            self._units_active += 1
+            return True
+
+    def end_unit(self):
+        """
+        Called by a slot when its DUT is done, after unit_passed()
+        """
+        with self._lock:
+            self._units_active = max(0, self._units_active - 1)
 
     def token_total(self):
         return self._token_total
@@ -275,6 +296,11 @@ class Job():
         """
         Remove the job
         """
+        with self._lock:
+            # every slot removes the job when it completes
+            if self._deleted:
+                return
+            self._deleted = True
         event_logger.info("Removing job %s %s" % (self._id, self._path))
 
         if self._debug:
@@ -7,7 +7,8 @@ from pubsub import pub
 from birch.config import find_config_dir
 from birch.core.state_machine import StateMachine, State
 from birch import Config
-from birch.slot import Slot
+from birch.slot import Slot, SlotState
+from birch.peripheral.port_registry import PortRegistry
 from birch.operator import OperatorList
 from birch.job.job_manager import JobManager
 from birch.job.job_bundle_installer import JobBundleInstaller
@@ -26,7 +27,9 @@ class ManagerState(enum.Enum):
 
 
 class Manager(StateMachine):
-    def __init__(self, config_dir="assets/conf/", slot_count=1, *args, **kwargs):
+    def __init__(self, config_dir="assets/conf/", slot_count=None, *args, **kwargs):
+        # every manager transition comes from a callback, no polling needed
+        kwargs.setdefault("tick_period", None)
         super().__init__(*args, **kwargs)
         self.config_dir = config_dir
 
@@ -65,8 +68,11 @@ class Manager(StateMachine):
         # list of test interfaces/object available
         self.device_list = {}
 
-        # Target slots
-        self.slot_count = slot_count
+        # Target slots, one per enabled slot_map entry unless limited by slot_count
+        self.slot_config = self.config.slots()
+        if slot_count is not None:
+            self.slot_config = self.slot_config[:slot_count]
+        self.slot_count = len(self.slot_config)
         self.slots = []
 
         self.msg_topic = "system"
@@ -94,11 +100,13 @@ class Manager(StateMachine):
 
     def create_slots(self):
         self.slots = [
-            Slot.create(self.config.product, mgr=self, index=i, config=self.config,
-                        complete_cb=self.job_complete_callback) for i in range(self.slot_count)
+            Slot.create(self.config.product, mgr=self, index=i, number=number, config=self.config,
+                        complete_cb=self.job_complete_callback, slot_config=c)
+            for i, (number, c) in enumerate(self.slot_config)
         ]
 
     def start(self):
+        PortRegistry.instance().start()
         self.create_slots()
         super().start()
 
@@ -106,6 +114,7 @@ class Manager(StateMachine):
         super().stop()
         for s in self.slots:
             s.stop()
+        PortRegistry.instance().stop()
 
     def state_init_enter(self):
         self.operator_list = OperatorList.load(self.config_dir, self.select_operator_callback)
@@ -165,7 +174,11 @@ class Manager(StateMachine):
             self.state_transition(ManagerState.JOB_ACTIVE)
 
     def job_complete_callback(self, *args, **kwargs):
-        self.state_transition(ManagerState.JOB_COMPLETE)
+        # slots finish their last DUT independently, the job is complete once all of them are;
+        # stopped slots and slots in error are not waited for
+        active = [s for s in self.slots if s.running and s.state != SlotState.ERROR]
+        if all(s.state == SlotState.COMPLETE for s in active):
+            self.state_transition(ManagerState.JOB_COMPLETE)
 
     def barcode_scan_callback(self, *args, **kwargs):
         """
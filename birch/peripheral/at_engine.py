@@ -0,0 +1,225 @@
+"""
+AT command engine for u-blox modules on a UartReader.
+
+A command resolves as soon as its final result code (OK, ERROR, +CME ERROR: <err>, +CMS ERROR: <err>)
+or the ">" data prompt arrives, within a per-command timeout (TIMEOUTS, the maximum response
+times of the SARA-R4 AT commands manual). Information responses are split into typed fields:
+
+    +COPS: 0,0,"AT&T",7                 -> [0, 0, "AT&T", 7]
+    +CEREG: 2,1,"1A2B","01A2D001",7     -> [2, 1, "1A2B", "01A2D001", 7]
+
+URCs registered with on() are taken out of the command responses and passed to their callbacks
+as (prefix, fields, line), on the reader thread.
+
+    at = AtEngine(reader, name="LTE")
+    at.on(b"+CEREG", lambda prefix, fields, line: print(fields))
+    r = at.command(b"AT+COPS?")
+    r.ok, r.fields(), r.cme_error, r.elapsed
+"""
+import collections
+import logging
+import re
+import time
+
+from birch.core.cancellation import cancellable
+
+FINAL = (rb"^OK$", rb"^ERROR$", rb"^\+CM[ES] ERROR:", rb"^NO CARRIER$", rb"^ABORTED$")
+PROMPT = rb">$"
+
+_FIELD = re.compile(rb'\s*("[^"]*"|[^,]*)\s*(?:,|$)')
+
+
+def command_name(cmd: bytes) -> bytes:
+    """
+    b"AT+COPS?" -> b"+COPS", b"ATI9" -> b"I", b"AT" -> b""
+    """
+    m = re.match(rb"AT([+&]?[A-Z]+)", cmd.strip().upper())
+    return m.group(1) if m else b""
+
+
+def parse_fields(line: bytes):
+    """
+    Fields of an information response or URC, without its "+NAME:" prefix: int for numbers, str
+    for quoted and other text, None for empty fields
+    """
+    line = line.strip()
+    m = re.match(rb"\+[A-Z]+:", line)
+    if m:
+        line = line[m.end():]
+    fields = []
+    for f in _FIELD.findall(line)[:-1] if line.strip() else []:
+        f = f.strip()
+        if f.startswith(b'"') and f.endswith(b'"') and len(f) >= 2:
+            fields.append(f[1:-1].decode("utf-8", "replace"))
+        elif re.match(rb"^-?\d+$", f):
+            fields.append(int(f))
+        elif f:
+            fields.append(f.decode("utf-8", "replace"))
+        else:
+            fields.append(None)
+    return fields
+
+
+class AtResponse(object):
+    """
+    Result of one AT command
+    """
+
+    def __init__(self, command, lines, final, elapsed):
+        self.command = command  # as sent, without terminator
+        self.lines = lines  # information response lines (no echo, no final result code)
+        self.final = final  # final result code or prompt, None on timeout
+        self.elapsed = elapsed
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        return "AtResponse(%r, %r, %r, %.3f s)" % (self.command, self.lines, self.final, self.elapsed)
+
+    @property
+    def ok(self):
+        return self.final in (b"OK", b">")
+
+    @property
+    def timed_out(self):
+        return self.final is None
+
+    @property
+    def cme_error(self):
+        """
+        <err> of a +CME/+CMS ERROR (int, or str in verbose mode), None otherwise
+        """
+        if self.final is None or not re.match(rb"^\+CM[ES] ERROR:", self.final):
+            return None
+        fields = parse_fields(self.final.split(b":", 1)[1])
+        return fields[0] if fields else None
+
+    @property
+    def text(self):
+        return b"\r\n".join(self.lines)
+
+    def info(self, prefix=None):
+        """
+        Fields of every information line starting with prefix (default: the command's "+NAME")
+        """
+        prefix = command_name(self.command) if prefix is None else prefix
+        return [parse_fields(line) for line in self.lines if line.startswith(prefix + b":")]
+
+    def fields(self, prefix=None):
+        """
+        Fields of the first information line (see info()), [] without one
+        """
+        info = self.info(prefix)
+        return info[0] if info else []
+
+    def as_dict(self) -> dict:
+        return {"command": self.command.decode("utf-8", "replace"),
+                "final": None if self.final is None else self.final.decode("utf-8", "replace"),
+                "elapsed": round(self.elapsed, 4)}
+
+
+class AtEngine(object):
+    """
+    Sends AT commands over a UartReader and routes the URCs registered with on()
+    """
+
+    DEFAULT_TIMEOUT = 2.0
+    # a command without any response is sent once more only up to this timeout; the network
+    # commands (+COPS, +CGACT, ...) would otherwise wait minutes twice
+    RESEND_TIMEOUT = 5.0
+    # seconds to the final result code, by command name
+    TIMEOUTS = {
+        b"+COPS": 180.0,
+        b"+CFUN": 180.0,
+        b"+CGATT": 180.0,
+        b"+CGACT": 150.0,
+        b"+UPSDA": 180.0,
+        b"+USECMNG": 20.0,
+        b"+ULSTFILE": 5.0,
+        b"+CCID": 5.0,
+        b"+CPIN": 10.0,
+        b"+CLCK": 10.0,
+    }
+
+    def __init__(self, connection, name="AT", timeouts=None, logger=None):
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.connection = connection
+        self.name = name
+        self.timeouts = dict(self.TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        self.callbacks = collections.defaultdict(list)
+        self.counters = collections.Counter()
+        self.latencies = []
+
+    def timeout(self, cmd):
+        return self.timeouts.get(command_name(cmd), self.DEFAULT_TIMEOUT)
+
+    @cancellable
+    def command(self, cmd: bytes, timeout=None, prompt=False) -> AtResponse:
+        """
+        Send cmd and wait for its final result code (or the ">" prompt when prompt). A command with a
+        timeout up to RESEND_TIMEOUT that gets no response at all is sent once more.
+        """
+        name = command_name(cmd)
+        timeout = self.timeout(cmd) if timeout is None else timeout
+        until = FINAL + (PROMPT,) if prompt else FINAL
+        claim = (rb"^" + re.escape(name) + rb":",) if name.startswith(b"+") else ()
+        start = time.monotonic()
+        lines = []
+        complete = False
+        for attempt in range(2 if timeout <= self.RESEND_TIMEOUT else 1):
+            if attempt:
+                self.counters["retries"] += 1
+            self.logger.info("%s >> %s" % (self.name, cmd))
+            complete, lines = self.connection.exchange(cmd + b"\r\n", until=until, timeout=timeout, claim=claim)
+            if lines:
+                break
+        self.logger.info("%s << %s" % (self.name, b"\r\n".join(lines)))
+        final = lines.pop() if complete else None
+        if lines and lines[0] == cmd.strip():
+            # echo (ATE1)
+            lines.pop(0)
+        response = AtResponse(cmd, lines, final, time.monotonic() - start)
+        self.counters["commands"] += 1
+        if final is None:
+            self.counters["timeouts"] += 1
+        elif not response.ok:
+            self.counters["errors"] += 1
+        self.latencies.append(response.elapsed)
+        return response
+
+    def query(self, cmd: bytes, timeout=None):
+        """
+        Fields of the information response of cmd, None if it failed
+        """
+        r = self.command(cmd, timeout=timeout)
+        return r.fields() if r.ok else None
+
+    # ---------- URCs ----------
+
+    def on(self, prefix: bytes, callback):
+        """
+        Call callback(prefix, fields, line) for every URC starting with prefix (b"+CEREG")
+        """
+        self.callbacks[prefix].append(callback)
+        pattern = b"|".join(rb"^" + re.escape(p) + rb"(?![A-Z])" for p in self.callbacks)
+        self.connection.subscribe(pattern, self._urc, key="at-%s" % self.name)
+
+    def _urc(self, line):
+        self.counters["urcs"] += 1
+        for prefix, callbacks in self.callbacks.items():
+            if re.match(rb"^" + re.escape(prefix) + rb"(?![A-Z])", line):
+                fields = parse_fields(line)
+                for callback in callbacks:
+                    callback(prefix, fields, line)
+
+    def stats(self) -> dict:
+        d = dict(self.counters)
+        if self.latencies:
+            d["latency"] = {"n": len(self.latencies), "mean": round(sum(self.latencies) / len(self.latencies), 4),
+                            "max": round(max(self.latencies), 4)}
+        return d
@@ -3,7 +3,7 @@ import binascii
 import logging
 
 from .bled112.scanner import BLED112
-from birch.peripheral.util import find_port
+from birch.peripheral.util import resolve_port
 
 
 class BLE():
@@ -14,14 +14,18 @@ class BLE():
     PID = "0001"
     event_logger = logging.getLogger("event_logger")
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, port=None, keep_open=False, *args, **kwargs):
         self.bled = None
+        # dongle port from the slot_map, else the first dongle found by VID/PID
+        self.port = port
+        # keep the dongle open between scans/connections (SessionManager), opening it costs seconds
+        self.keep_open = keep_open
 
     def open(self):
         if self.bled is not None:
             # already open
             return True
-        port = find_port(vid=self.VID, pid=self.PID)
+        port = resolve_port(self.port, vid=self.VID, pid=self.PID)
         if port is None:
             return False
         try:
@@ -44,14 +48,16 @@ class BLE():
         devices = self.bled.scan(duration)
         
         if devices is None:
-            self.close()
+            if not self.keep_open:
+                self.close()
             return {}
         # format addresses
         ret = {}
         for device in devices:
             addr = binascii.b2a_hex(device[::-1]).decode("utf-8")
             ret[addr] = devices[device]
-        self.close()
+        if not self.keep_open:
+            self.close()
         return ret
 
     def connect(self, addr: str, duration=5):
@@ -78,7 +84,25 @@ class BLE():
     def disconnect(self):
         if self.bled:
             self.bled.disconnect()
-            self.close()
+            if not self.keep_open:
+                self.close()
+
+    def healthy(self):
+        ser = getattr(self.bled, "ser", None)
+        if ser is None or not ser.is_open:
+            return False
+        try:
+            ser.in_waiting
+        except Exception:
+            return False
+        return True
+
+    def reset(self):
+        """
+        Drop a connection left over from the previous DUT
+        """
+        if self.bled is not None and self.bled.connected():
+            self.bled.disconnect()
 
     def transmit(self):
         return True
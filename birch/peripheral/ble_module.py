@@ -39,11 +39,24 @@ class BLEModule():
 
 
 class UBloxNina(BLEModule):
+    """
+    The connection is the UartReader of the port the NINA is passed through to
+    """
+    # unsolicited result codes (connection events, restarts), logged and kept out of command responses
+    URCS = (rb"^\+UUBTACLC:", rb"^\+UUBTACLD:", rb"^\+UUBTLEPHYU:", rb"^\+STARTUP")
 
-    def at_command(self, cmd: bytes):
+    def __init__(self, connection):
+        super().__init__(connection)
+        if connection is not None:
+            connection.subscribe(b"|".join(self.URCS), self.on_urc, key="nina")
+
+    def on_urc(self, line):
+        self.event_logger.info("Nina <<! %s" % line)
+
+    def at_command(self, cmd: bytes, timeout=1.0):
         self.event_logger.info("Nina >> %s" % cmd)
-        self.connection.write(cmd + b"\r\n")
-        resp = self.connection.read(1024)
+        complete, lines = self.connection.exchange(cmd + b"\r\n", timeout=timeout)
+        resp = b"\r\n".join(lines)
         self.event_logger.info("Nina << %s" % resp)
         result = b"OK" in resp
         resp = resp.replace(b"OK", b"")
@@ -104,34 +117,30 @@ class UBloxNina(BLEModule):
 
         return module_info
 
-    def wait_for_connect(self, timeout=10):
+    def wait_for_connect(self, timeout=10, since=None):
         """
-        Wait up to 10 seconds for a connection
+        Wait up to 10 seconds for a connection, reported from since (time.time(), default now) on
 
         Return (True|False, remote address)
         """
-        t0 = time.time()
-        while time.time() - t0 < timeout:
-            resp = self.connection.read(1024)
-            if b"+UUBTACLC" in resp:
-                try:
-                    connection_handle, connection_type, address = re.findall(b"UUBTACLC:(\d),(\d),(\w+)", resp.strip())[
-                        0]
-                    address = address[:-1].decode("utf-8")
-                    return True, address
-                except Exception:
-                    return False, ""
+        resp = self.connection.wait_for(rb"\+UUBTACLC", timeout=timeout, since=since)
+        if resp is not None:
+            try:
+                connection_handle, connection_type, address = re.findall(b"UUBTACLC:(\d),(\d),(\w+)", resp.strip())[
+                    0]
+                address = address[:-1].decode("utf-8")
+                return True, address
+            except Exception:
+                return False, ""
         return False, ""
 
-    def wait_for_disconnect(self, timeout=10):
+    def wait_for_disconnect(self, timeout=10, since=None):
         """
         Wait up to 10 seconds for disconnect
         """
-        t0 = time.time()
-        while time.time() - t0 < timeout:
-            resp = self.connection.read(1024)
-            if b"+UUBTACLD" in resp:
-                return True, resp
+        resp = self.connection.wait_for(rb"\+UUBTACLD", timeout=timeout, since=since)
+        if resp is not None:
+            return True, resp
 
         return False, ""
 
@@ -8,3 +8,15 @@ class Device():
 
     def close(self, *args, **kwargs):
         return True
+
+    def healthy(self):
+        """
+        True if the open handle still works (checked by SessionManager before each suite)
+        """
+        return True
+
+    def reset(self):
+        """
+        Clear protocol state left by the previous DUT, keeping the handle open
+        """
+        pass
@@ -28,3 +28,18 @@ class Interface(Device):
 
     def power_off(self):
         pass
+
+    def flush_rails(self):
+        """
+        Apply power changes deferred by testcase teardowns, at the end of a test suite.
+        """
+        pass
+
+    def reset_stats(self):
+        pass
+
+    def stats(self):
+        """
+        Per-DUT interface counters, added to the test result when not empty.
+        """
+        return {}
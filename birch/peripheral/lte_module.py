@@ -2,6 +2,10 @@ import serial
 import time
 import re
 import logging
+import threading
+
+from birch.core.cancellation import CancellationToken, cancellable
+from birch.peripheral.at_engine import AtEngine, FINAL
 
 """
 UBlox SARA LTE modem module driver
@@ -14,38 +18,114 @@ class LTEModule():
     pass
 
 
+class NetworkRegistration(object):
+    """
+    EPS registration and PDP context state of a SARA, followed from its +CEREG/+CREG/+CGEV URCs
+    (see UBloxSara.watch_registration). Times are seconds from start (time.monotonic(), default
+    the start of the watch), e.g. from when the modem was powered.
+    """
+
+    REGISTERED = (1, 5)  # home, roaming
+
+    def __init__(self, start=None):
+        self.cv = threading.Condition()
+        self.start = time.monotonic() if start is None else start
+        # <stat> by URC prefix (b"+CEREG", b"+CREG")
+        self.stats = {}
+        self.context = False
+        self.time_to_register = None
+        self.time_to_data_context = None
+        self.events = []
+
+    @property
+    def registered(self):
+        return any(stat in self.REGISTERED for stat in self.stats.values())
+
+    def update(self, prefix=None, stat=None, context=None, line=None):
+        with self.cv:
+            t = time.monotonic() - self.start
+            if line is not None:
+                self.events.append((round(t, 3), line.decode("utf-8", "replace")))
+            if stat is not None:
+                self.stats[prefix] = stat
+                if self.registered and self.time_to_register is None:
+                    self.time_to_register = t
+            if context is not None:
+                self.context = context
+                if context and self.time_to_data_context is None:
+                    self.time_to_data_context = t
+            self.cv.notify_all()
+
+    def urc(self, prefix, fields, line):
+        if prefix in (b"+CEREG", b"+CREG") and fields and isinstance(fields[0], int):
+            self.update(prefix, stat=fields[0], line=line)
+        elif prefix == b"+CGEV":
+            if b"PDN ACT" in line:
+                self.update(context=True, line=line)
+            elif b"DEACT" in line or b"DETACH" in line:
+                self.update(context=False, line=line)
+
+    def wait(self, predicate, timeout):
+        """
+        Wait until predicate() holds (checked on every update); False on timeout
+        """
+        token = CancellationToken.current()
+        deadline = time.monotonic() + token.timeout(timeout)
+        with self.cv:
+            while not predicate():
+                token.check()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                with token.account("io"):
+                    self.cv.wait(min(remaining, 0.1))
+            return True
+
+    def wait_registered(self, timeout):
+        return self.wait(lambda: self.registered, timeout)
+
+    def wait_data_context(self, timeout):
+        return self.wait(lambda: self.context, timeout)
+
+    def as_dict(self) -> dict:
+        with self.cv:
+            return {"registered": self.registered,
+                    "stat": {k.decode(): v for k, v in self.stats.items()},
+                    "data_context": self.context,
+                    "time_to_register": None if self.time_to_register is None else round(self.time_to_register, 3),
+                    "time_to_data_context":
+                        None if self.time_to_data_context is None else round(self.time_to_data_context, 3),
+                    "events": list(self.events)}
+
+
 class UBloxSara(LTEModule):
+    """
+    The connection is the UartReader of the port the SARA is passed through to; commands go
+    through an AtEngine (self.at)
+    """
+    # unsolicited result codes, logged and kept out of the response of the command running at the time
+    URCS = (b"+CEREG", b"+CREG", b"+CGREG", b"+CGEV", b"+CIEV", b"+PACSP", b"+UUPSDA", b"+UUPSDD", b"+UUSORD",
+            b"+UUSOCL")
+
     def __init__(self, connection):
         self.connection = connection
+        self.at = None
+        self.registration = None
+        if connection is not None:
+            self.at = AtEngine(connection, name="LTE", logger=self.event_logger)
+            for prefix in self.URCS:
+                self.at.on(prefix, self.on_urc)
 
-    def at_command(self, cmd: bytes):
-        self.event_logger.info("LTE >> %s" % cmd)
-
-        self.connection.write(cmd + b"\r\n")
-        time.sleep(0.1)
-        resp = self.connection.read(1024)
-        tryCount =0
-        while(resp == b""):
-            resp = self.connection.read(1024)
-            tryCount +=1
-            time.sleep(0.1)
-            if(tryCount>20):
-                break
-        if resp == b"":
-            self.event_logger.info("LTE >> %s" % cmd)
-            self.connection.write(cmd + b"\r\n")
-            time.sleep(0.1)
-            resp = self.connection.read(1024)
-            tryCount =0
-            while(resp == b""):
-                resp = self.connection.read(1024)
-                tryCount +=1
-                time.sleep(0.1)
-                if(tryCount>20):
-                    break
-        
-        self.event_logger.info("LTE << %s" % resp)
-        result = b"OK" in resp or b"ULSTFILE" in resp
+    def on_urc(self, prefix, fields, line):
+        self.event_logger.info("LTE <<! %s" % line)
+        if self.registration is not None:
+            self.registration.urc(prefix, fields, line)
+
+    def at_command(self, cmd: bytes, timeout=None):
+        r = self.at.command(cmd, timeout=timeout)
+        resp = b"\r\n".join(r.lines + [r.final or b""])
+
+        result = r.ok or b"ULSTFILE" in resp
         if (b"A"+cmd) in resp:
             resp = resp.replace(b"A"+cmd, b"")
         else:
@@ -69,7 +149,7 @@ class UBloxSara(LTEModule):
         return result, resp
 
     def read_info(self, cmds):
-        resp = self.connection.read(1024)
+        self.connection.reset_input_buffer()
         info = {}
         sendATCommands = True
         for k in cmds:
@@ -121,24 +201,76 @@ class UBloxSara(LTEModule):
         }
         return self.read_info(cmds)
 
-    def ping(self):
+    def ping(self, timeout=None):
         """
         Send AT, expect OK
         """
-        result, resp = self.at_command(b"AT")
+        result, resp = self.at_command(b"AT", timeout=timeout)
         return result
 
+    def wait_ready(self, timeout, ping_timeout=0.5):
+        """
+        Ping until the module answers, up to timeout seconds; (answered, pings, seconds)
+        """
+        start = time.monotonic()
+        pings = 0
+        while True:
+            pings += 1
+            sent = time.monotonic()
+            if self.ping(timeout=ping_timeout):
+                return True, pings, time.monotonic() - start
+            if time.monotonic() - start >= timeout:
+                return False, pings, time.monotonic() - start
+            # an immediate failure (ERROR, port gone) is not retried faster than the ping timeout
+            CancellationToken.current().sleep(max(0.0, ping_timeout - (time.monotonic() - sent)))
+
+    def watch_registration(self, start=None):
+        """
+        Enable the EPS registration (+CEREG) and PDP context (+CGEV) URCs and follow them in a
+        NetworkRegistration (self.registration), starting from the state the modem reports now.
+        +CREG is left at its <n> so read_network_info() reports it as before; its URCs count if
+        enabled.
+        """
+        self.registration = NetworkRegistration(start)
+        for cmd in (b"AT+CEREG=2", b"AT+CGEREP=1"):
+            if not self.at.command(cmd):
+                self.event_logger.info("LTE watch_registration: %s refused" % cmd)
+        fields = self.at.query(b"AT+CEREG?")
+        if fields and len(fields) > 1:
+            self.registration.update(b"+CEREG", stat=fields[1])
+        fields = self.at.query(b"AT+CGACT?")
+        if fields and len(fields) > 1 and fields[1] == 1:
+            self.registration.update(context=True)
+        return self.registration
+
+    def registration_status(self):
+        """
+        EPS registration <stat> (AT+CEREG?): 0 not registered, 1 home, 2 searching, 3 denied,
+        5 roaming; None if the modem did not answer
+        """
+        fields = self.at.query(b"AT+CEREG?")
+        return fields[1] if fields and len(fields) > 1 else None
+
+    def signal_quality(self):
+        """
+        (rssi, ber) from AT+CSQ, 99 for unknown; None if the modem did not answer
+        """
+        fields = self.at.query(b"AT+CSQ")
+        return tuple(fields[:2]) if fields and len(fields) >= 2 else None
 
-    # writes a command to lte port and reads the line to self.response after 1 second wait
-    def write(self, msg, insert_newline=True):
-        self.event_logger.info("LTE >> %s" % msg)
+
+    # writes a command to lte port and reads the response to self.response (up to OK/ERROR or the ">" prompt)
+    @cancellable
+    def write(self, msg, insert_newline=True, timeout=None):
         if insert_newline == True:
-            msg = msg + "\r\n"
-        self.connection.write(str.encode(msg))
-        time.sleep(0.35)
-        x = self.connection.read(1024)
+            r = self.at.command(str.encode(msg), timeout=timeout, prompt=True)
+            lines = r.lines + [r.final or b""]
+        else:
+            # data after a ">" prompt, answered once complete
+            self.event_logger.info("LTE >> %s" % msg)
+            complete, lines = self.connection.exchange(str.encode(msg), until=FINAL, timeout=timeout or 2.0)
+        x = b"\r\n".join(lines)
         self.response = x
-        self.event_logger.info("LTE << %s" % x)
         return x
     
     # write entire cert file f to lte module chip 
@@ -159,10 +291,12 @@ class UBloxSara(LTEModule):
             exit()
         
         if self.read_pattern(">") == True:
-            # send cert
+            # send cert; the module answers once it has all num_bytes
             lines = f.readlines()
-            for line in lines:
-                print(self.write(line, False).decode())
+            for line in lines[:-1]:
+                self.connection.write(str.encode(line))
+            if lines:
+                print(self.write(lines[-1], False, timeout=self.at.timeout(b"AT+USECMNG")).decode())
 
         if "OK" in self.response.decode():
             self.event_logger.info(f"Certificate {cert_name} Uploaded Successfully")
@@ -0,0 +1,208 @@
+"""
+Serial port registry: enumerate USB serial ports once, match them by USB attributes and watch for
+hot-plug events.
+"""
+import logging
+import os
+import threading
+
+from pubsub import pub
+import serial.tools.list_ports as list_ports
+
+
+class PortRegistry(object):
+    """
+    Cached view of the serial ports (serial.tools.list_ports.comports()).
+
+    Ports are matched with a spec: a dict of ListPortInfo attributes such as
+        {"serial_number": "3677349A3331"}            a given ST-Link / FTDI cable
+        {"location": "1-2.3:1.0"}                    a given USB hub socket
+        {"vid": "0483", "pid": "5740"}               any fixture board (the old find_port behaviour)
+    or a port name ("COM7", "/dev/ttyACM0", a simulator pty), which is used as is.
+
+    The port list is only enumerated again when the watcher sees the set of tty devices change
+    (/sys/class/tty on Linux, comports() elsewhere), or on a lookup miss. Watched specs publish
+    {"key", "port", "present"} on the "hardware" pubsub topic when their port disappears or returns.
+    """
+
+    TOPIC = "hardware"
+    # ListPortInfo attributes a spec can match on
+    ATTRIBUTES = ("device", "vid", "pid", "serial_number", "location", "manufacturer", "product", "interface",
+                  "description", "hwid")
+
+    lock = threading.Lock()
+    default = None
+
+    def __init__(self, poll_interval=1.0, logger=None):
+        self.poll_interval = poll_interval
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.mutex = threading.RLock()
+        self._ports = None
+        self._signature = None
+        # key -> [spec, port or None]
+        self.watched = {}
+        # specs already reported as matching several ports
+        self.ambiguous = set()
+        self.thread = None
+        self.stop_event = None
+        self.enumerations = 0
+
+    @classmethod
+    def instance(cls):
+        """
+        Process wide registry
+        """
+        with cls.lock:
+            if cls.default is None:
+                cls.default = cls()
+            return cls.default
+
+    # ---------- enumeration ----------
+
+    @staticmethod
+    def signature():
+        """
+        Cheap fingerprint of the attached tty devices, None where it is not available
+        """
+        try:
+            return tuple(sorted(os.listdir("/sys/class/tty")))
+        except OSError:
+            return None
+
+    def changed(self):
+        """
+        True if the tty devices may have changed since the last enumeration
+        """
+        signature = PortRegistry.signature()
+        return signature is None or signature != self._signature
+
+    def refresh(self):
+        """
+        Enumerate the ports again
+        """
+        with self.mutex:
+            self._signature = PortRegistry.signature()
+            self._ports = list_ports.comports()
+            self.enumerations += 1
+            return self._ports
+
+    def ports(self):
+        with self.mutex:
+            if self._ports is None:
+                self.refresh()
+            return self._ports
+
+    @staticmethod
+    def matches(port, spec):
+        for key, value in spec.items():
+            actual = getattr(port, key, None)
+            if actual is None:
+                return False
+            if key in ("vid", "pid"):
+                actual = "%04x" % actual
+            if str(actual).lower() != str(value).lower():
+                return False
+        return True
+
+    def _find(self, spec):
+        found = sorted((p for p in self.ports() if PortRegistry.matches(p, spec)),
+                       key=lambda p: (p.location or "", p.device))
+        if len(found) > 1 and port_label(spec) not in self.ambiguous:
+            # several identical boards and nothing to tell them apart: bind the slot by serial_number/location
+            self.ambiguous.add(port_label(spec))
+            self.logger.warning("PortRegistry: %s matches %s, using %s" % (
+                spec, ", ".join(p.device for p in found), found[0].device))
+        return found[0].device if found else None
+
+    def find(self, spec):
+        """
+        Port name for spec (see class doc), None if not attached
+        """
+        if spec is None:
+            return None
+        if not isinstance(spec, dict):
+            return spec
+        for key in spec:
+            if key not in PortRegistry.ATTRIBUTES:
+                raise Exception("PortRegistry: unknown port attribute %s" % key)
+        port = self._find(spec)
+        if port is None and self.changed():
+            # plugged in since the last enumeration and the watcher has not caught up (or is not running)
+            self.refresh()
+            port = self._find(spec)
+        return port
+
+    def present(self, spec):
+        if spec is None:
+            return False
+        if not isinstance(spec, dict):
+            return os.path.exists(spec) or any(p.device.lower() == spec.lower() for p in self.ports())
+        return self.find(spec) is not None
+
+    # ---------- hot-plug ----------
+
+    def watch(self, key, spec):
+        """
+        Publish on the "hardware" topic when the port for spec disappears or returns
+        """
+        with self.mutex:
+            self.watched[key] = [spec, self.find(spec) if self.present(spec) else None]
+
+    def unwatch(self, key):
+        with self.mutex:
+            self.watched.pop(key, None)
+
+    def poll(self):
+        """
+        Re-enumerate if the tty devices changed and notify watched ports that came or went
+        """
+        if not self.changed():
+            return
+        with self.mutex:
+            self.refresh()
+            changes = []
+            for key, entry in self.watched.items():
+                spec, port = entry
+                present = self.present(spec)
+                if present != (port is not None):
+                    entry[1] = self.find(spec) if present else None
+                    changes.append({"key": key, "port": entry[1] or port, "present": present})
+        for message in changes:
+            self.logger.info("PortRegistry: %s %s %s" % (
+                message["key"], message["port"], "attached" if message["present"] else "removed"))
+            pub.sendMessage(PortRegistry.TOPIC, message=message)
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.exception("PortRegistry poll failed: %s" % e)
+            stop_event.wait(self.poll_interval)
+
+    def start(self):
+        """
+        Watch for hot-plug events every poll_interval
+        """
+        if self.thread is None:
+            self.stop_event = threading.Event()
+            self.thread = threading.Thread(target=self.run, args=(self.stop_event,), name="port_registry",
+                                           daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread = None
+
+
+def port_label(spec):
+    """
+    Short stable text for a port spec, e.g. for lease names and logs
+    """
+    if isinstance(spec, dict):
+        return ",".join("%s=%s" % kv for kv in sorted(spec.items()))
+    return str(spec)
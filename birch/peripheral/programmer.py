@@ -1,6 +1,7 @@
 import subprocess
 import logging
 
+from birch.core.cancellation import CancellationToken
 from .device import Device
 
 
@@ -35,9 +36,10 @@ class Programmer(Device):
         """
         self.event_logger.info("Programmer execute: %s" % " ".join(command))
         self.result = None
+        token = CancellationToken.current()
         try:
             if self.executable is not None or (command and isinstance(command, list)):
-                self.result = subprocess.run(command, capture_output=True, timeout=timeout)
+                self.result = self.run(command, token.timeout(timeout), token)
                 # Log outputs to aid debugging
                 self.event_logger.info("<< %s" % (self.result.stdout,))
                 if self.result.stderr:
@@ -59,4 +61,22 @@ class Programmer(Device):
 
         except Exception as e:
             self.event_logger.error("Programmer exception %s %s" % (command, e))
+            # the testcase timed out: do not report it as a plain programming failure
+            token.check()
             return False
+
+    def run(self, command, timeout, token):
+        """
+        subprocess.run(capture_output=True) that kills the tool when the testcase is cancelled
+        """
+        with token.activity("%s.execute %s" % (type(self).__name__, " ".join(command[1:])[:80])), \
+                subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as p:
+            with token.on_cancel(p.kill), token.account("subprocess"):
+                try:
+                    stdout, stderr = p.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+                    p.communicate()
+                    raise
+            token.check()
+            return subprocess.CompletedProcess(p.args, p.returncode, stdout, stderr)
@@ -0,0 +1,129 @@
+"""
+Per-slot device sessions: keep fixture, DUT UART and dongle handles open across DUTs.
+"""
+import logging
+import time
+
+
+class SessionManager(object):
+    """
+    Owns the open/close life cycle of a slot's devices (device_list entries).
+
+    Devices are opened once. Before each suite prepare() health-checks every handle (healthy()),
+    reopens the ones that fail, e.g. after a USB disconnect, and resets the protocol state of the
+    others (reset()). Counters record opens, reopens and reuses with the time they took, so the
+    open/close time saved per DUT can be reported.
+    """
+
+    def __init__(self, name="sessions", logger=None):
+        self.name = name
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.devices = {}
+        self.opened = {}
+        self.counters = {}
+        # counters at the previous delta() call
+        self.reported = {}
+
+    def add(self, name, device):
+        """
+        Manage device under name, replacing (and closing) a previous one
+        """
+        if name in self.devices and self.devices[name] is not device:
+            self.close(name)
+        self.devices[name] = device
+        self.opened.setdefault(name, False)
+        self.counters.setdefault(name, {"opens": 0, "open_failures": 0, "reopens": 0, "reuses": 0,
+                                        "open_time": 0.0, "check_time": 0.0})
+
+    def open(self, name):
+        c = self.counters[name]
+        start = time.perf_counter()
+        try:
+            ok = self.devices[name].open()
+        except Exception as e:
+            self.logger.exception("%s: opening %s failed: %s" % (self.name, name, e))
+            ok = False
+        # Device.open() returns True/False, some drivers return None on success
+        ok = ok is not False
+        c["open_time"] += time.perf_counter() - start
+        if ok:
+            c["opens"] += 1
+        else:
+            c["open_failures"] += 1
+        self.opened[name] = ok
+        return ok
+
+    def close(self, name):
+        if self.opened.get(name):
+            try:
+                self.devices[name].close()
+            except Exception as e:
+                self.logger.warning("%s: closing %s failed: %s" % (self.name, name, e))
+        self.opened[name] = False
+
+    def open_all(self):
+        """
+        Open every device that is not open yet. Returns the names that failed.
+        """
+        return [name for name in self.devices if not self.opened[name] and not self.open(name)]
+
+    def close_all(self):
+        for name in self.devices:
+            self.close(name)
+
+    def ensure(self, name):
+        """
+        Make sure a device is usable for the next DUT: reuse and reset it if healthy, else reopen.
+        """
+        device = self.devices[name]
+        c = self.counters[name]
+        if self.opened[name]:
+            start = time.perf_counter()
+            try:
+                healthy = device.healthy()
+                if healthy:
+                    device.reset()
+            except Exception as e:
+                self.logger.warning("%s: %s health check failed: %s" % (self.name, name, e))
+                healthy = False
+            c["check_time"] += time.perf_counter() - start
+            if healthy:
+                c["reuses"] += 1
+                return True
+            self.logger.warning("%s: %s not responding, reopening" % (self.name, name))
+            self.close(name)
+            c["reopens"] += 1
+        return self.open(name)
+
+    def prepare(self):
+        """
+        Health-check, reset or reopen every device before a suite. Returns the names that failed.
+        """
+        return [name for name in self.devices if not self.ensure(name)]
+
+    def stats(self):
+        """
+        Counters per device. saved estimates the open/close time avoided by reusing the handle,
+        at the measured cost of an open.
+        """
+        stats = {}
+        for name, c in self.counters.items():
+            s = dict(c)
+            s["saved"] = c["reuses"] * c["open_time"] / c["opens"] if c["opens"] else 0.0
+            stats[name] = s
+        return stats
+
+    def delta(self):
+        """
+        stats() since the previous delta() call, e.g. for one DUT when called once per suite
+        """
+        stats = self.stats()
+        delta = {}
+        for name, s in stats.items():
+            previous = self.reported.get(name, {})
+            delta[name] = {k: v - previous.get(k, 0) for k, v in s.items()}
+        self.reported = stats
+        return delta
@@ -17,6 +17,8 @@ class TargetDUT():
     serial = attr.ib(default="")
 
     event_logger = logging.getLogger("event_logger")
+    # serial port from the slot_map, None to search by VID/PID (not logged)
+    port = None
 
     def log_device_dict(self):
         """
@@ -24,6 +26,34 @@ class TargetDUT():
         """
         return attr.asdict(self)
 
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    def new_unit(self):
+        """
+        Clear the data of the previous DUT so the object (and its connection) can be reused
+        """
+        for f in attr.fields(type(self)):
+            if isinstance(f.default, attr.Factory):
+                setattr(self, f.name, f.default.factory())
+            elif f.default is not attr.NOTHING:
+                setattr(self, f.name, f.default)
+
+    def healthy(self):
+        return True
+
+    def transcript(self, since=None):
+        """
+        Communication with the DUT since `since` (time.time()), one string per line, for failure reports
+        """
+        return []
+
+    def reset(self):
+        pass
+
     def assign_token(self, token):
         return True
 
@@ -0,0 +1,323 @@
+"""
+Background reader for a serial port that carries command responses and unsolicited output.
+
+One thread reads the port and splits the bytes into lines:
+
+  * lines matching a subscribe() pattern (URCs such as "+CEREG: 1", "+UUBTACLC:...", "MODEM TO PC")
+    go to the subscribers, unless a running exchange() claims them as its own response
+  * every other line is queued for whoever waits for a response (exchange(), wait_for(), readline())
+  * every line and every write() goes into a timestamped transcript (transcript()), for the
+    result of a failing testcase
+
+read(), readline(), write() and the buffer calls mirror serial.Serial, so code written against the
+port itself (DutCommandClient, passthrough drivers) runs unchanged on top of the reader.
+
+    reader = UartReader(TimedSerial(port, 115200, timeout=0.1), name="dut").start()
+    reader.subscribe(rb"^\\+CEREG:", lambda line: print(line))
+    complete, lines = reader.exchange(b"AT+CEREG?\\r\\n", claim=(rb"^\\+CEREG:",))
+"""
+import collections
+import datetime
+import itertools
+import logging
+import re
+import threading
+import time
+
+import serial
+
+from birch.core.cancellation import CancellationToken
+from birch.core.stoppable_thread import StoppableThread
+
+FINAL = (rb"^OK$", rb"ERROR")
+
+
+class UartReader(object):
+    """
+    Owns the reading side of an open serial port (see module docstring). Subscriber callbacks run
+    on the reader thread and must not block.
+    """
+
+    TRANSCRIPT_SIZE = 2000
+    # longest wait between cancellation checks
+    POLL = 0.1
+
+    def __init__(self, port, name="uart", transcript_size=TRANSCRIPT_SIZE, logger=None):
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.port = port
+        self.name = name
+        self.cv = threading.Condition()
+        # response lines not taken yet (terminator included)
+        self.lines = collections.deque()
+        # bytes after the last line terminator
+        self.partial = bytearray()
+        self.subscribers = []
+        # patterns of URC-like lines the running exchange() takes as its response
+        self.claims = ()
+        self.transcript_lines = collections.deque(maxlen=transcript_size)
+        # routed transcript entries already returned by wait_for()
+        self.taken = collections.deque(maxlen=transcript_size)
+        self.counters = collections.Counter()
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        self.thread = StoppableThread(target=self.run, name="UartReader-%s" % self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        if self.thread is not None:
+            self.thread.stop()
+            self.thread.join()
+            self.thread = None
+        self.port.close()
+
+    # ---------- reader thread ----------
+
+    def run(self):
+        thread = self.thread
+        while not thread.stopped():
+            try:
+                data = self.port.read(max(1, self.port.in_waiting))
+            except (serial.SerialException, OSError, TypeError) as e:
+                # port gone (USB disconnect) or closed under us
+                with self.cv:
+                    self.error = e
+                    self.cv.notify_all()
+                if not thread.stopped():
+                    self.logger.warning("UartReader %s: read failed: %s" % (self.name, e))
+                return
+            if data:
+                self.feed(data)
+
+    def feed(self, data):
+        """
+        Split received bytes into lines and route them
+        """
+        urcs = []
+        with self.cv:
+            self.counters["bytes"] += len(data)
+            self.partial += data
+            while True:
+                i = self.partial.find(b"\n")
+                if i < 0:
+                    break
+                line = bytes(self.partial[:i + 1])
+                del self.partial[:i + 1]
+                callbacks = self.route(line)
+                if callbacks:
+                    urcs.append((callbacks, line.strip()))
+            self.cv.notify_all()
+        for callbacks, line in urcs:
+            for callback in callbacks:
+                try:
+                    callback(line)
+                except Exception as e:
+                    self.logger.warning("UartReader %s: URC callback failed on %r: %s" % (self.name, line, e))
+
+    def route(self, line):
+        """
+        Queue a line or return the callbacks of the subscribers it is for (called with cv held)
+        """
+        stripped = line.strip()
+        if not stripped:
+            self.lines.append(line)
+            return None
+        self.counters["lines"] += 1
+        if not any(c.search(stripped) for c in self.claims):
+            callbacks = [callback for key, regex, callback in self.subscribers if regex.search(stripped)]
+            if callbacks:
+                self.counters["urcs"] += 1
+                self.record("<<!", stripped)
+                return callbacks
+        self.record("<<", stripped)
+        self.lines.append(line)
+        return None
+
+    # ---------- URCs ----------
+
+    def subscribe(self, pattern, callback, key=None):
+        """
+        Call callback(line) for every line matching pattern (regex, bytes) instead of queuing it.
+        A subscription with the same key (default: the callback) is replaced.
+        """
+        key = callback if key is None else key
+        with self.cv:
+            self.subscribers = [s for s in self.subscribers if s[0] != key]
+            self.subscribers.append((key, re.compile(pattern), callback))
+
+    def unsubscribe(self, key):
+        with self.cv:
+            self.subscribers = [s for s in self.subscribers if s[0] != key]
+
+    # ---------- responses ----------
+
+    def _wait(self, deadline):
+        """
+        Wait for input until deadline (cv held); False once it has passed or the port failed
+        """
+        token = CancellationToken.current()
+        token.check()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or self.error is not None:
+            return False
+        with token.account("io"):
+            self.cv.wait(min(remaining, self.POLL))
+        return True
+
+    def exchange(self, data, until=FINAL, timeout=1.0, claim=()):
+        """
+        Write data and collect the response lines until one matches a pattern in until.
+
+        claim: patterns of lines that would otherwise go to subscribers but answer this command
+        (e.g. rb"^\\+CEREG:" for AT+CEREG?). A line without terminator matching until (the ">"
+        prompt) also ends the response. Response lines queued before the write are dropped.
+        Returns (complete, lines): the stripped, non-empty lines, and whether the last one matched
+        until.
+        """
+        until = [re.compile(u) for u in until]
+        deadline = time.monotonic() + CancellationToken.current().timeout(timeout)
+        lines = []
+        with self.cv:
+            self.claims = tuple(re.compile(c) for c in claim)
+            try:
+                self.lines.clear()
+                self.write(data)
+                while True:
+                    while self.lines:
+                        line = self.lines.popleft().strip()
+                        if not line:
+                            continue
+                        lines.append(line)
+                        if any(u.search(line) for u in until):
+                            return True, lines
+                    prompt = bytes(self.partial).strip()
+                    if prompt and any(u.search(prompt) for u in until):
+                        self.partial.clear()
+                        self.record("<<", prompt)
+                        lines.append(prompt)
+                        return True, lines
+                    if not self._wait(deadline):
+                        self.counters["timeouts"] += 1
+                        return False, lines
+            finally:
+                self.claims = ()
+
+    def wait_for(self, pattern, timeout=1.0, since=None):
+        """
+        Next line matching pattern (regex, bytes): a queued one, or the oldest one routed to
+        subscribers from since (time.time(), default now) on and not returned by an earlier wait_for(),
+        so a URC that came in before the wait is not missed. The stripped line, None if none arrives
+        before timeout.
+        """
+        regex = re.compile(pattern)
+        if since is None:
+            since = time.time()
+        deadline = time.monotonic() + CancellationToken.current().timeout(timeout)
+        with self.cv:
+            while True:
+                for line in self.lines:
+                    if regex.search(line.strip()):
+                        self.lines.remove(line)
+                        return line.strip()
+                recent = itertools.takewhile(lambda entry: entry[0] >= since, reversed(self.transcript_lines))
+                routed = [entry for entry in recent
+                          if entry[1] == "<<!" and regex.search(entry[2]) and entry not in self.taken]
+                if routed:
+                    self.taken.append(routed[-1])
+                    return routed[-1][2]
+                if not self._wait(deadline):
+                    return None
+
+    # ---------- serial.Serial interface ----------
+
+    def write(self, data):
+        with self.cv:
+            self.record(">>", bytes(data).strip())
+        return self.port.write(data)
+
+    def read(self, size=1):
+        """
+        Queued input, up to size bytes, waiting up to the port timeout for some to arrive
+        """
+        deadline = time.monotonic() + (self.port.timeout or 0)
+        with self.cv:
+            while not self.lines and not self.partial:
+                if not self._wait(deadline):
+                    return b""
+            data = bytearray()
+            while self.lines and len(data) < size:
+                data += self.lines.popleft()
+            if len(data) < size and not self.lines:
+                data += self.partial
+                self.partial.clear()
+            if len(data) > size:
+                self.lines.appendleft(bytes(data[size:]))
+                del data[size:]
+            return bytes(data)
+
+    def readline(self, size=-1):
+        """
+        Next queued line, b"" if none arrives within the port timeout
+        """
+        deadline = time.monotonic() + (self.port.timeout or 0)
+        with self.cv:
+            while not self.lines:
+                if not self._wait(deadline):
+                    return b""
+            line = self.lines.popleft()
+            if 0 <= size < len(line):
+                self.lines.appendleft(line[size:])
+                line = line[:size]
+            return line
+
+    def reset_input_buffer(self):
+        with self.cv:
+            self.lines.clear()
+            self.partial.clear()
+
+    def reset_output_buffer(self):
+        self.port.reset_output_buffer()
+
+    def cancel_read(self):
+        with self.cv:
+            self.cv.notify_all()
+
+    @property
+    def in_waiting(self):
+        if self.error is not None:
+            raise serial.SerialException(self.error)
+        self.port.in_waiting
+        with self.cv:
+            return sum(len(line) for line in self.lines) + len(self.partial)
+
+    @property
+    def is_open(self):
+        return self.port.is_open and self.error is None and self.thread is not None
+
+    @property
+    def timeout(self):
+        return self.port.timeout
+
+    # ---------- transcript ----------
+
+    def record(self, direction, data):
+        self.transcript_lines.append((time.time(), direction, data))
+
+    def transcript(self, since=None):
+        """
+        Timestamped lines written (">>"), received ("<<") and routed to subscribers ("<<!"),
+        those from since (time.time()) on
+        """
+        with self.cv:
+            lines = [entry for entry in self.transcript_lines if since is None or entry[0] >= since]
+        return ["%s %s %s %s" % (datetime.datetime.fromtimestamp(t).strftime("%H:%M:%S.%f")[:-3], self.name,
+                                 direction, data.decode("utf-8", "replace")) for t, direction, data in lines]
+
+    def stats(self) -> dict:
+        with self.cv:
+            return dict(self.counters)
@@ -3,36 +3,70 @@ Utility function to find a port
 """
 import logging
 
-import serial.tools.list_ports as list_ports
+import serial
+
+from birch.core.cancellation import CancellationToken
+from birch.peripheral.port_registry import PortRegistry
 
 
 def find_port(vid: str = None, pid: str = None, port_name: str = None):
+    """
+    Port name if attached, else the first port with vid:pid, from the PortRegistry cache
+    """
     event_logger = logging.getLogger("event_logger")
+    registry = PortRegistry.instance()
 
-    ports = list_ports.comports()
-    if port_name:
-        for p in ports:
-            if p.device.lower() == port_name.lower():
-                event_logger.info("find_port: vid: %s pid: %s port_name %s found" % (vid, pid, port_name))
-                return port_name
+    if port_name and registry.find({"device": port_name}):
+        event_logger.info("find_port: vid: %s pid: %s port_name %s found" % (vid, pid, port_name))
+        return port_name
 
     if vid is not None and pid is not None:
-        for p in ports:
-            if p.vid is None or p.pid is None:
-                continue
-            # print("%04x"%p.vid, "%04x"%p.pid, p.device)
-            str_vid = "%04x" % p.vid
-            str_pid = "%04x" % p.pid
-            # print(repr(str_vid), repr(vid), repr(str_pid), repr(pid), p.device)
-            # print(str_vid ==  vid, str_pid == pid)
-            if str_vid == vid and str_pid == pid:
-                event_logger.info("find_port: vid: %s pid: %s port_name %s found: %s" % (vid, pid, port_name, p.device))
-                return p.device
+        port = registry.find({"vid": vid, "pid": pid})
+        if port is not None:
+            event_logger.info("find_port: vid: %s pid: %s port_name %s found: %s" % (vid, pid, port_name, port))
+            return port
 
     event_logger.info("find_port: vid: %s pid: %s port_name %s not found" % (vid, pid, port_name))
     return None
 
 
+def resolve_port(port=None, vid: str = None, pid: str = None):
+    """
+    Port name for a slot_map port setting:
+        "COM7", "/dev/ttyUSB1"                  used as is
+        {"serial_number": "A50285BI"}           USB attributes, matched with the PortRegistry (narrowed to vid:pid)
+        None                                    the first vid:pid port
+    """
+    if isinstance(port, dict):
+        spec = dict(port)
+        if vid is not None and pid is not None:
+            spec.setdefault("vid", vid)
+            spec.setdefault("pid", pid)
+        found = PortRegistry.instance().find(spec)
+        logging.getLogger("event_logger").info("resolve_port: %s -> %s" % (spec, found))
+        return found
+    return port or find_port(vid=vid, pid=pid)
+
+
+class TimedSerial(serial.Serial):
+    """
+    serial.Serial that charges reads and writes to the I/O time of the running testcase
+    (CancellationToken.account())
+    """
+
+    def read(self, size=1):
+        with CancellationToken.current().account("io"):
+            return super().read(size)
+
+    def readline(self, size=-1):
+        with CancellationToken.current().account("io"):
+            return super().readline(size)
+
+    def write(self, data):
+        with CancellationToken.current().account("io"):
+            return super().write(data)
+
+
 if __name__ == "__main__":
     test_ports = [
         # {"port_name": "/dev/ttyUSB0"},
@@ -1,3 +1,4 @@
+import copy
 import json
 import time
 import enum
@@ -7,12 +8,16 @@ import logging
 from pubsub import pub
 
 from birch.core.state_machine import StateMachine, State
+from birch.core.pipeline import CompletionPipeline
 from birch.core.common import BirchObject, LogObject
 from birch.peripheral.target_dut import TargetDUT
+from birch.peripheral.session_manager import SessionManager
+from birch.peripheral.port_registry import PortRegistry, port_label
 #from birch.peripheral.label_printer import LabelPrinter
 
 from birch.testsuite import TestSuite
 from birch.test_status import TestStatus
+from birch.testcase.testcase import Resource
 
 
 class SlotState(enum.IntEnum):
@@ -60,20 +65,28 @@ class Slot(StateMachine):
     One slot deals with one DUT at a time
     """
 
-    def __init__(self, index, mgr=None, config=None, complete_cb=None, enabled=True, device_list={}, *args, **kwargs):
-        super().__init__(prefix="slot%02d" % index, *args, **kwargs)
-        self.mgr = mgr
+    def __init__(self, index, mgr=None, config=None, complete_cb=None, enabled=True, device_list=None,
+                 slot_config=None, number=None, *args, **kwargs):
+        # Inputs (barcode scans, job selection, fixture callbacks) wake the slot; the tick is only a fallback poll
+        kwargs.setdefault("tick_period", 1.0)
+        # index: position among the manager's slots; number: the slot_map key, as labelled on the fixture
         self.index = index
-        self.msg_topic = "slot%02d" % index
+        self.number = index + 1 if number is None else number
+        super().__init__(prefix="slot%02d" % self.number, *args, **kwargs)
+        self.mgr = mgr
+        self.msg_topic = "slot%02d" % self.number
         self.config = config
-        self.device_list = device_list
+        # each slot owns its devices
+        self.device_list = {} if device_list is None else device_list
+        # slot_map entry: ports, programmer serial number, LED indices
+        self.slot_config = {} if slot_config is None else slot_config
         self.result_dict = {}
         self.fw = 'USA'
         self.board_type = 'V1'
 
         self.complete_cb = complete_cb
 
-        self.logger = logging.getLogger(__name__ + "%02d" % index)
+        self.logger = logging.getLogger(__name__ + "%02d" % self.number)
         self.logger.setLevel(logging.DEBUG)
 
         self.state = SlotState.INIT
@@ -121,6 +134,12 @@ class Slot(StateMachine):
         self.operator_id = None
         self.barcode = None
         self.test_suite = None
+        # time.monotonic() when the previous test suite finished, for inter-DUT dead time
+        self.suite_end = None
+        # result log, database upload and job file writes run here, off the operator's critical path
+        self.completion = CompletionPipeline(self.msg_topic, on_error=self.persistence_failed)
+        # device handles stay open from one DUT to the next
+        self.sessions = SessionManager(self.msg_topic)
         self.token = None
         self.provision_enable = False #By default, provision enable is True and only set to false if the check
         self.log_upload_enable = True
@@ -129,7 +148,11 @@ class Slot(StateMachine):
         #self.label_print_warning = True
 
         pub.subscribe(self.pub_listener, "system")
-
+        # hot-plug notifications for the ports bound in slot_map
+        for key in self.PORT_KEYS:
+            if self.slot_config.get(key) is not None:
+                PortRegistry.instance().watch("%s.%s" % (self.msg_topic, key), self.slot_config[key])
+        pub.subscribe(self.hardware_listener, PortRegistry.TOPIC)
 
     
     def pub_listener(self, message, arg2=None):
@@ -157,6 +180,24 @@ class Slot(StateMachine):
 
         # print(f"manager:pub_listener {message} {arg2}")
 
+    def hardware_listener(self, message, arg2=None):
+        """
+        PortRegistry listener: a port of this slot was removed or attached again
+        """
+        key, _, setting = message["key"].partition(".")
+        if key != self.msg_topic:
+            return
+        if message["present"]:
+            self.log_info("%s %s reconnected" % (setting, message["port"]))
+            pub.sendMessage(self.msg_topic, message={"status_msg": "%s reconnected" % setting})
+            # the session is reopened on the next prepare()
+            self.wake()
+        else:
+            self.log_info("%s %s removed" % (setting, message["port"]))
+            pub.sendMessage("status", message={
+                "alert": "Slot %d: %s disconnected (%s)" % (self.number, setting, message["port"])
+            })
+
     def reset_units_passed(self, bool:bool):
         self.job.reset_units_passed()
     def reset_units_tested(self, bool:bool):
@@ -181,6 +222,8 @@ class Slot(StateMachine):
     def stop(self):
         super().stop()
         self.log_info("Slot stop")
+        for key in self.PORT_KEYS:
+            PortRegistry.instance().unwatch("%s.%s" % (self.msg_topic, key))
         # self.peripheral.stop()
         # self.device.stop()
 
@@ -220,10 +263,16 @@ class Slot(StateMachine):
 
         p = self.operator_id
 
-        # create a device
-        d = TargetDUT.factory(product=self.config.product)
-        self.device_list["target"] = d
-        d.open()
+        # reuse the DUT record and its connection, cleared for the new unit
+        d = self.device_list.get("target")
+        if d is None:
+            d = TargetDUT.factory(product=self.config.product)
+            d.port = self.slot_config.get("dut_port")
+            self.device_list["target"] = d
+            self.sessions.add("target", d)
+            self.sessions.open("target")
+        else:
+            d.new_unit()
 
         self.test_auto_scan()
 
@@ -264,6 +313,17 @@ class Slot(StateMachine):
 
 
         self.result_dict = {}
+        # health check / reopen the device handles, reset what the previous DUT left behind
+        failed = self.sessions.prepare()
+        if failed:
+            pub.sendMessage("status", message={
+                "alert": "Slot %d: device(s) not available: %s" % (self.number, ", ".join(failed))
+            })
+        if not self.job.start_unit():
+            # the DUTs under test in other slots will complete the job
+            pub.sendMessage(self.msg_topic, message={"status_msg": "Job units allocated to other slots"})
+            self.state_transition(SlotState.SLOT_SELECT)
+            return
         try:
             self.test_suite = TestSuite(
                 self,
@@ -281,6 +341,7 @@ class Slot(StateMachine):
             if self.job.token_total() > 0:
                 self.token = self.job.reserve_token()
                 if self.token == None:
+                    self.job.end_unit()
                     self.state_transition(SlotState.NO_TOKENS)
                     return
 
@@ -299,8 +360,11 @@ class Slot(StateMachine):
             pub.sendMessage("system", message={
                 "message": "Test suite initialisation failed: %s" % str(e)
             })
-            self.event_logger.exception("Slot %i: state_active_enter exception %s" % (self.index, e))
-            self.log_info("Slot %i: state_active_enter exception %s" % (self.index, e))
+            self.event_logger.exception("Slot %i: state_active_enter exception %s" % (self.number, e))
+            self.log_info("Slot %i: state_active_enter exception %s" % (self.number, e))
+            self.job.release_token(self.token)
+            self.token = None
+            self.job.end_unit()
             self.state_transition(SlotState.INIT)
 
     def state_active_run(self):
@@ -308,12 +372,16 @@ class Slot(StateMachine):
             self.state_transition(SlotState.COMPLETE)
             return
         try:
-            self.result_dict = self.test_suite.run()
+            self.result_dict = self.test_suite.run(persist=False)
+            self.suite_end = time.monotonic()
+            # the target object is reused for the next DUT, store a snapshot of this one
+            self.completion.submit("result %s" % self.barcode, self.test_suite.persist, self.result_dict,
+                                   copy.copy(self.device_list["target"]))
         except Exception as e:
             pub.sendMessage("system", message={
                 "message": "Test suite execution failed: %s" % str(e)
             })
-            self.log_info("Slot %i: state_active_run exception %s" % (self.index, e))
+            self.log_info("Slot %i: state_active_run exception %s" % (self.number, e))
             self.state_transition(SlotState.INIT)
             self.test_suite.status = TestStatus.ERROR
 
@@ -330,7 +398,9 @@ class Slot(StateMachine):
         #self.print_label()
 
         self.token = None
-        self.job.unit_tested()
+        self.job.unit_tested(save=False)
+        self.job.end_unit()
+        self.completion.submit("job file", self.job.save)
 
         # Show test result
         pub.sendMessage(self.msg_topic, message={
@@ -341,6 +411,11 @@ class Slot(StateMachine):
         pub.sendMessage('status', message={
             "testing_complete": False
         })
+        if self.suite_end is not None:
+            # operator-visible dead time: verdict known -> slot ready for the next DUT
+            self.log_info("Slot %i: ready %.3fs after verdict, %d result(s) being stored" % (
+                self.number, time.monotonic() - self.suite_end, self.completion.stats()["pending"]))
+
     def state_result_run(self):
         if self.job.is_complete():
             self.state_transition(SlotState.COMPLETE)
@@ -372,6 +447,10 @@ class Slot(StateMachine):
             "status_msg": "",
             "test_result": TestStatus.JOB_COMPLETE
         })
+        # results of the last DUTs are stored before the job is removed
+        if not self.completion.drain(timeout=60):
+            self.persistence_failed("job complete", Exception("results still pending after 60s"))
+
         if self.complete_cb is not None:
             self.complete_cb()
 
@@ -390,6 +469,10 @@ class Slot(StateMachine):
         })
 
     def state_no_tokens_run(self):
+        if self.job.is_complete():
+            # the units under test in other slots completed the job
+            self.state_transition(SlotState.COMPLETE)
+            return
         if self.job.token_total() > 0:
             self.token = self.job.reserve_token()
             if self.token is None:
@@ -398,9 +481,10 @@ class Slot(StateMachine):
                 })
                 time.sleep(1)
             else:
-                self.release_token(self.token)
+                # a token came back (a unit of another slot failed): test again
+                self.job.release_token(self.token)
                 self.token = None
-        pass
+                self.state_transition(SlotState.SLOT_SELECT)
 
     def state_slot_select_enter(self):
         self.barcode = None
@@ -420,8 +504,8 @@ class Slot(StateMachine):
             self.state_transition(SlotState.COMPLETE)
             return
 
-        # single slot at this time
-        if self.index == 0:
+        # with several slots the operator scans SLOTnn to pick the slot for the next DUT
+        if self.single_slot() or self.config.run_mode == "auto":
             self.state_transition(SlotState.SCAN_BARCODE)
 
     def state_error_enter(self):
@@ -437,11 +521,20 @@ class Slot(StateMachine):
     def set_job(self, job):
         print("set job")
         self.job = job
+        self.wake()
 
     def set_operator(self, name):
         self.operator_id = name
 
     # callbacks 
+    def persistence_failed(self, name, e):
+        """
+        Completion pipeline error: alert the operator without stopping the slot
+        """
+        pub.sendMessage("status", message={
+            "alert": "Slot %d: storing %s failed: %s" % (self.number, name, e)
+        })
+
     def status_msg_cb(self, *args, **kwargs):
         """
         Status message from test case to UI
@@ -460,14 +553,16 @@ class Slot(StateMachine):
         pub.sendMessage(self.msg_topic, message={"error_codes": self.error_codes})
 
     def barcode_scan(self, barcode_string, *args, **kwargs):
-        self.event_logger.info("barcode_scan %s %d %s" % (barcode_string, self.index, self.state))
+        self.event_logger.info("barcode_scan %s %d %s" % (barcode_string, self.number, self.state))
         if self.job is None:
             return
 
         if self.state == SlotState.SCAN_BARCODE:
             self.log_info("barcode_scan %s", barcode_string)
-            if "SLOT" in barcode_string and barcode_string != "SLOT%02d" % (self.index + 1):
-                self.state_transition(SlotState.SLOT_SELECT)
+            if "SLOT" in barcode_string:
+                # another slot selected, the DUT barcode is not for this one
+                if barcode_string != "SLOT%02d" % self.number:
+                    self.state_transition(SlotState.SLOT_SELECT)
             else:
                 # validate barcode
                 if self.job.validate_barcode(barcode_string):
@@ -488,14 +583,18 @@ class Slot(StateMachine):
                     })
 
         elif self.state == SlotState.SLOT_SELECT:
-            if barcode_string == "SLOT%02d" % (self.index + 1):
+            if barcode_string == "SLOT%02d" % self.number:
                 self.state_transition(SlotState.SCAN_BARCODE)
 
         elif self.state == SlotState.RESULT:
+            if "SLOT" in barcode_string:
+                if barcode_string == "SLOT%02d" % self.number:
+                    self.state_transition(SlotState.SCAN_BARCODE)
             # validate barcode
-            if self.job.validate_barcode(barcode_string):
+            elif self.job.validate_barcode(barcode_string):
                 # Showing result, this is a new scan for the next run
-                if self.index == 0:
+                if self.single_slot():
+                    self.device_list["target"].new_unit()
                     if self.device_list["target"].set_barcode(barcode_string):
                         self.state_transition(SlotState.EMPTY)
                         self.barcode = barcode_string
@@ -526,6 +625,34 @@ class Slot(StateMachine):
 
         pass
 
+    # slot_map setting that binds a resource to a device of this slot
+    LEASE_KEYS = {
+        Resource.INTERFACE: "interface_port",
+        Resource.TARGET: "dut_port",
+        Resource.PROGRAMMER: "programmer_sn",
+        Resource.BLE: "ble_port",
+    }
+
+    # slot_map settings that are serial ports: a port name or USB attributes (see PortRegistry)
+    PORT_KEYS = ("interface_port", "dut_port", "ble_port")
+
+    def lease_name(self, resource):
+        """
+        ResourceArbiter lease for a testcase resource. A device without its own entry in this
+        slot's slot_map settings is found by VID/PID, i.e. the same device for every slot, and so
+        is a lease shared by all slots.
+        """
+        device = self.slot_config.get(self.LEASE_KEYS.get(resource))
+        if device is None:
+            return resource
+        return "%s:%s" % (resource, port_label(device))
+
+    def single_slot(self):
+        """
+        True if this is the only slot of the fixture
+        """
+        return self.mgr is None or len(self.mgr.slots) <= 1
+
     def print_label(self):
         if self.result_dict == {}:
             # no result
@@ -544,10 +671,11 @@ class Slot(StateMachine):
     def open_devices(self):
         for d in self.device_list:
             if self.device_list[d] is not None:
-                if not self.device_list[d].open():
-                    pub.sendMessage("system", message={
-                        "message": "Slot: Opening device %s:%s failed" % (d, self.device_list[d])
-                    })
+                self.sessions.add(d, self.device_list[d])
+        for d in self.sessions.open_all():
+            pub.sendMessage("system", message={
+                "message": "Slot: Opening device %s:%s failed" % (d, self.device_list[d])
+            })
 
     @staticmethod
     def all_slots(cls):
@@ -0,0 +1,160 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from birch.core.scheduler import TestcaseScheduler
+from birch.database.db_interface import DBInterface
+from birch.error_codes import load_error_codes
+from birch.testcase.testcase import TestCase
+
+
+class SuitePlan(object):
+    """
+    Compiled test suite: everything about a suite that does not change from one DUT to the next.
+
+    The suite file is read once, testcase classes are resolved, fixture/suite/job parameters are
+    merged and the preconditions are sorted. Plans are cached by a hash of the suite file, the
+    fixture test parameters, the job parameters and the operator options, so a TestSuite per DUT
+    only constructs testcase objects.
+    """
+
+    event_logger = logging.getLogger("event_logger")
+    lock = threading.RLock()
+    cache = {}
+
+    def __init__(self, filename, config, job=None, provision_enable=True, fw='USA', board_type='RS232', key=None):
+        start = time.perf_counter()
+        self.filename = filename
+        self.config = config
+        self.key = key
+
+        with open(filename, 'r') as f:
+            data = json.load(f)
+
+        self.name = data["name"]
+        # default retries
+        self.retries = data.get("retries", 3)
+        self.parallel = data.get("parallel", False)
+        self.db_name = data.get("db_name")
+        self.ErrorCode = load_error_codes(config.config_dir)
+
+        self.testcases = []
+        self.preconditions = {}
+        for c in data["test_cases"]:
+            param = {}
+            param["test_id"] = c["id"]
+            param["timeout"] = c["timeout"]
+            param["retries"] = c.get("retries", self.retries)
+
+            # append fixture level parameters
+            if c["id"] in config.test_parameters:
+                param.update(config.test_parameters[c["id"]])
+
+            param.update({"provision_enable": provision_enable})
+            param.update({'fw': fw})
+            param.update({'board_type': board_type})
+
+            # append test_suite level parameters - these may override the fixture level ones
+            param.update(c["parameters"])
+
+            # append job specific parameters from job.json - these may override the fixture and test_suite level parameters
+            if job is not None:
+                if c["id"] in job._parameters:
+                    param.update(job._parameters[c["id"]])
+
+            self.testcases.append({
+                "id": c["id"],
+                "name": c["name"],
+                "cls": TestCase.find(c["target"]),
+                "param": param,
+                "resources": c["resources"] if "resources" in c else False,
+            })
+            self.preconditions[c["id"]] = c["preconditions"]
+
+        self.order = TestcaseScheduler.sort([c["id"] for c in self.testcases], self.preconditions)
+
+        # one result database connection per upload setting
+        self.db = {}
+        self.uses = 0
+        self.build_time = time.perf_counter() - start
+
+    @staticmethod
+    def hash(filename, config, job=None, provision_enable=True, fw='USA', board_type='RS232'):
+        """
+        Cache key for a plan. The suite file is identified by path, size and modification time.
+        """
+        st = os.stat(filename)
+        h = hashlib.sha256()
+        h.update(json.dumps([
+            str(Path(filename).resolve()),
+            st.st_mtime_ns,
+            st.st_size,
+            str(config.config_path),
+            config.test_parameters,
+            str(job) if job is not None else None,
+            job._parameters if job is not None else None,
+            provision_enable,
+            fw,
+            board_type,
+        ], sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    @classmethod
+    def get(cls, filename, config, job=None, provision_enable=True, fw='USA', board_type='RS232'):
+        """
+        Return the cached plan for these inputs, compiling it on first use.
+        """
+        key = SuitePlan.hash(filename, config, job, provision_enable, fw, board_type)
+        with SuitePlan.lock:
+            plan = SuitePlan.cache.get(key)
+            if plan is None:
+                plan = cls(filename, config, job, provision_enable, fw, board_type, key=key)
+                SuitePlan.cache[key] = plan
+                SuitePlan.event_logger.info("Compiled suite plan %s (%s) in %.3fs" % (
+                    plan.name, key[:12], plan.build_time))
+            plan.uses += 1
+        return plan
+
+    @staticmethod
+    def clear():
+        with SuitePlan.lock:
+            SuitePlan.cache.clear()
+
+    def database(self, log_upload_enable):
+        """
+        Result database connection, created once per upload setting.
+        """
+        with SuitePlan.lock:
+            db = self.db.get(log_upload_enable)
+            if db is None:
+                if self.db_name is not None:
+                    db = DBInterface.create(log_upload_enable=log_upload_enable, product=self.config.product,
+                                            **self.config.result_db)
+                    db.set_database(self.db_name)
+                else:
+                    db = DBInterface.create(None, log_upload_enable, product=self.config.product)
+                    db.disable()
+                self.db[log_upload_enable] = db
+            return db
+
+    def instantiate(self, **kwargs):
+        """
+        Construct the testcases for one DUT. kwargs are the per-run parameters (job, slot,
+        callbacks, device_list, config). Returns testcases {id: instance} in suite order.
+        """
+        testcases = {}
+        for c in self.testcases:
+            param = dict(kwargs)
+            # testcases own their parameters (lists, dicts) so copy them per DUT
+            param.update(copy.deepcopy(c["param"]))
+            instance = c["cls"](**param)
+            if c["resources"] is not False:
+                # suite file override of the class resources
+                instance.resources = c["resources"]
+            testcases[c["id"]] = instance
+        return testcases
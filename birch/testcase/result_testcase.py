@@ -22,7 +22,7 @@ class ResultTestCase(TestCase):
         """
         Dummy step
         """
-        time.sleep(0.5)
+        self.sleep(0.5)
         return {"result": True}
 
     def step2(self):
@@ -31,7 +31,7 @@ class ResultTestCase(TestCase):
 
         if F in barcode 
         """
-        time.sleep(0.5)
+        self.sleep(0.5)
         barcode = self.target.get_barcode()
         if "F" in barcode:
             self.log_error(self.ErrorCode.test_code)
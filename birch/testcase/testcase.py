@@ -6,6 +6,7 @@ import importlib
 from birch.test_status import TestStatus
 from birch.provision_status import ProvisionStatus
 from birch.error_codes import load_error_codes
+from birch.core.cancellation import CancellationToken, OperationCancelled, Watchdog
 
 
 class TestTimeoutException(Exception):
@@ -13,9 +14,27 @@ class TestTimeoutException(Exception):
 
 
 class TestStep:
-    def __init__(self, name, fn):
+    def __init__(self, name, fn, checkpoint=False, resumable=True):
         self.name = name
         self.fn = fn
+        # a passed checkpoint step is not run again on retry, its log entry is reused
+        self.checkpoint = checkpoint
+        # a failed non-resumable step drops the checkpoints: the retry restarts from scratch
+        self.resumable = resumable
+
+
+class Resource:
+    """
+    Names of the shared devices a testcase may claim (keys of device_list, plus the network).
+    Testcases that claim overlapping resources are never run concurrently.
+    """
+    INTERFACE = "interface"
+    TARGET = "target"
+    PROGRAMMER = "programmer"
+    BLE = "ble"
+    NETWORK = "network"
+
+    ALL = (INTERFACE, TARGET, PROGRAMMER, BLE, NETWORK)
 
 
 class StepData:
@@ -29,6 +48,12 @@ class TestCase(object):
     Test case base class
     """
 
+    # Resources claimed while running, see Resource. None claims everything (never run in parallel)
+    resources = None
+
+    # lower case class name -> class, filled by find()
+    _classes = {}
+
     def __init__(self,
                  test_id="ID",
                  status_callback=None,
@@ -66,6 +91,13 @@ class TestCase(object):
         self.error_code = []
         self.status = TestStatus.UNTESTED
         self.provisionStatus = ProvisionStatus.INCOMPLETE
+        # cancelled by the watchdog when the attempt runs past self.timeout
+        self.token = None
+        self.step_mark = None
+        # setup / teardown time split, see CancellationToken.split()
+        self.phases = {}
+        # step name -> log entry of a passed checkpoint step, kept across retries
+        self.checkpoints = {}
         self.reset()
 
     def status_call(self, *args, **kwargs):
@@ -89,30 +121,65 @@ class TestCase(object):
             return True
 
         self.reset()
+        if retry_count == 0:
+            self.checkpoints = {}
         self.status = TestStatus.INCOMPLETE
-        self.status_call("%s: Setup (%d/%d)" % (self.test_id, retry_count + 1, self.retries))
-        self.setup()
+        self.token = CancellationToken(name=self.test_id)
+        # the watchdog interrupts a step that blocks past the budget, not just the next step
+        with Watchdog.instance().deadline(self.token, self.timeout), self.token.bind():
+            try:
+                self.status_call("%s: Setup (%d/%d)" % (self.test_id, retry_count + 1, self.retries))
+                self.token.step = "setup"
+                self.step_mark = self.token.mark()
+                self.setup()
+                self.phases["setup"] = self.token.split(self.step_mark)
+                self.run_steps(retry_count)
+            except OperationCancelled:
+                self.timed_out()
+
+        self.status_call("%s: Tear down (%d/%d)" % (self.test_id, retry_count + 1, self.retries))
+        # not cancelled: the rails must be released even after a timeout
+        token = CancellationToken(name=self.test_id)
+        with token.bind():
+            mark = token.mark()
+            self.teardown()
+            self.phases["teardown"] = token.split(mark)
+
+        self.duration = (datetime.datetime.now(datetime.timezone.utc) - self.timestamp).total_seconds()
+        if self.status == TestStatus.PASS:
+            self.error_code = []
+            self.event_logger.debug("Test passed")
+            return True
+        elif self.status == TestStatus.FAIL:
+            self.event_logger.debug("Test failed")
+            return False
+        elif self.status == TestStatus.ERROR:
+            self.event_logger.debug("Error")
+            return False
+        else:
+            # No steps: treat as skipped
+            self.status = TestStatus.SKIP
+            return True
+
+    def run_steps(self, retry_count):
         count = 0
         self.status = TestStatus.PASS
         for s in self.steps:
             # check if timeout exceeded
-            dt = (datetime.datetime.now(datetime.timezone.utc).astimezone() - self.timestamp).total_seconds()
-            if dt > self.timeout:
-                self.event_logger.debug("timeout %.2f %.2f" % (self.timeout, dt))
-                self.status = TestStatus.ERROR
-                self.log_error(self.ErrorCode.timeout)
-                break
+            self.token.check()
             # check if dut removed
             if self.device_list["interface"].dut_present() != True:
                 self.log_error(self.ErrorCode.dut_removed)
                 self.status = TestStatus.ERROR
                 break
 
-            # update status message in GUI
-            self.status_call("%s: %s (%d/%d)" % (self.test_id, s.name, retry_count + 1, self.retries))
-
-            step_data = s.fn()
-            step_data["step_name"] = s.name
+            if s.name in self.checkpoints:
+                # passed in an earlier attempt, its outputs are still held by the testcase; its time
+                # was already logged with that attempt
+                step_data = dict(self.checkpoints[s.name], reused=True)
+                step_data["timing"] = {k: 0.0 for k in step_data.get("timing") or {"wall": 0.0}}
+            else:
+                step_data = self.run_step(s, retry_count)
             self.log.append(step_data)
 
             if step_data.get("result") != True:
@@ -134,24 +201,59 @@ class TestCase(object):
 
             count += 1
 
-        self.status_call("%s: Tear down (%d/%d)" % (self.test_id, retry_count + 1, self.retries))
-        self.teardown()
+    def run_step(self, s, retry_count):
+        # update status message in GUI
+        self.status_call("%s: %s (%d/%d)" % (self.test_id, s.name, retry_count + 1, self.retries))
 
-        self.duration = (datetime.datetime.now(datetime.timezone.utc) - self.timestamp).total_seconds()
-        if self.status == TestStatus.PASS:
-            self.error_code = []
-            self.event_logger.debug("Test passed")
-            return True
-        elif self.status == TestStatus.FAIL:
-            self.event_logger.debug("Test failed")
-            return False
-        elif self.status == TestStatus.ERROR:
-            self.event_logger.debug("Error")
-            return False
-        else:
-            # No steps: treat as skipped
-            self.status = TestStatus.SKIP
-            return True
+        self.token.step = s.name
+        self.step_mark = self.token.mark()
+        try:
+            step_data = s.fn()
+        except Exception:
+            if not s.resumable:
+                self.checkpoints = {}
+            raise
+        step_data["step_name"] = s.name
+        # wall time of the step split into sleep, io, subprocess, cpu and other
+        step_data["timing"] = self.token.split(self.step_mark)
+
+        if step_data.get("result") == True:
+            if s.checkpoint:
+                self.checkpoints[s.name] = dict(step_data, attempt=retry_count)
+        elif not s.resumable:
+            self.event_logger.debug("%s: %s failed, retry restarts from the first step" % (self.test_id, s.name))
+            self.checkpoints = {}
+        return step_data
+
+    def finish(self):
+        """
+        Called after the last attempt (passed, or out of retries). Drops the checkpoints;
+        over-ride in children to release what they kept for a retry.
+        """
+        self.checkpoints = {}
+
+    def timed_out(self):
+        """
+        The watchdog cancelled this attempt: log the step and call that were running
+        """
+        dt = (datetime.datetime.now(datetime.timezone.utc).astimezone() - self.timestamp).total_seconds()
+        active = self.token.active or {}
+        self.event_logger.debug("timeout %.2f %.2f step %s call %s" % (
+            self.timeout, dt, active.get("step"), " > ".join(active.get("calls", [])) or "-"))
+        self.log.append({
+            "result": False,
+            "step_name": active.get("step"),
+            "timeout": {"budget": self.timeout, "elapsed": dt, "call": active.get("calls", [])},
+            "timing": self.token.split(self.step_mark),
+        })
+        self.status = TestStatus.ERROR
+        self.log_error(self.ErrorCode.timeout)
+
+    def sleep(self, seconds):
+        """
+        time.sleep() that is cut short when the testcase times out
+        """
+        CancellationToken.current().sleep(seconds)
 
     def is_ready(self):
         """
@@ -167,6 +269,7 @@ class TestCase(object):
         """
         self.log = []
         self.error_code = []
+        self.phases = {}
         self.status = TestStatus.UNTESTED
 
     def skip(self):
@@ -178,14 +281,18 @@ class TestCase(object):
         # FIX: was using TestStep.SKIP (doesn't exist)
         self.status = TestStatus.SKIP
 
-    def append_step(self, name, fn):
+    def append_step(self, name, fn, checkpoint=False, resumable=True):
         """
         Add a function to the list steps to be followed for this test
 
         name : Step name (string)
         fn : Step function (void)
+        checkpoint : idempotent step whose result (and the outputs it leaves on the testcase)
+                     stays valid for a retry; once passed it is not run again
+        resumable : False if a failure of this step invalidates the checkpoints, forcing the
+                    retry to restart from the first step
         """
-        self.steps.append(TestStep(name, fn))
+        self.steps.append(TestStep(name, fn, checkpoint, resumable))
 
     def setup(self):
         """
@@ -235,11 +342,15 @@ class TestCase(object):
         return subs
 
     @staticmethod
-    def create(testcase: str, *args, **kwargs):
+    def find(testcase: str):
         """
-        Instantiate an instance of the named testcase by looking for a matching name in the
-        subclasses of TestCase
+        Return the subclass of TestCase with a case-insensitive name match. Lookups are cached;
+        the subclass tree is only walked again for a name that has not been seen.
         """
+        cls = TestCase._classes.get(testcase.lower())
+        if cls is not None:
+            return cls
+
         # Ensure Jaguar test modules are imported so subclasses are registered.
         # This triggers jaguar/testcase/__init__.py which imports concrete classes (power, analog, etc.)
         try:
@@ -249,7 +360,17 @@ class TestCase(object):
 
         # Scan all subclasses (now populated) for a case-insensitive name match
         for cls in TestCase.all_testcases(TestCase):
-            if cls.__name__.lower() == testcase.lower():
-                return cls(*args, **kwargs)
+            TestCase._classes[cls.__name__.lower()] = cls
+
+        cls = TestCase._classes.get(testcase.lower())
+        if cls is None:
+            raise Exception("Test case %s not found" % testcase)
+        return cls
 
-        raise Exception("Test case %s not found" % testcase)
+    @staticmethod
+    def create(testcase: str, *args, **kwargs):
+        """
+        Instantiate an instance of the named testcase by looking for a matching name in the
+        subclasses of TestCase
+        """
+        return TestCase.find(testcase)(*args, **kwargs)
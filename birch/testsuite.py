@@ -1,3 +1,4 @@
+import collections
 import time
 import sys
 import threading
@@ -12,7 +13,10 @@ import os
 from birch.test_status import TestStatus
 from birch.provision_status import ProvisionStatus
 from birch.database.db_interface import DBInterface
-from birch.testcase.testcase import TestCase
+from birch.testcase.testcase import TestCase, Resource
+from birch.core.arbiter import ResourceArbiter, LeaseTimeout, LeaseDeadlock
+from birch.core.scheduler import TestcaseScheduler
+from birch.suite_plan import SuitePlan
 from birch.peripheral.stm32cube_programmer import STM32CubeProgrammer
 
 class TestSuite(object):
@@ -57,84 +61,44 @@ class TestSuite(object):
         # print("\n\n\n>>> self.job", self.job, self.job.path)
         # self.serial_mgr = SerialManager()
         self.log_info("Loading", {"testsuite_file": filename})
+        start = time.perf_counter()
 
-        # load test suite data
-        with TestSuite.lock:
-            with open(filename, 'r') as f:
-                data = json.load(f)
+        # compiled suite (file, classes, parameters, order) shared by every DUT of this job
+        self.plan = SuitePlan.get(filename, self.config, self.job, self.provision_enable, self.fw, self.board_type)
 
-        self.name = data["name"]
-        if "retries" in data.keys():
-            self.retries = data["retries"]
-        else:
-            # default retries
-            self.retries = 3
+        self.name = self.plan.name
+        self.retries = self.plan.retries
+
+        # run independent testcases concurrently when their resources do not overlap
+        self.parallel = self.plan.parallel
 
         ##connect to a result database
         # self.event_logger.warning("DB disabled")
-        if "db_name" in data:
-            self.db = DBInterface.create(**self.config.result_db,log_upload_enable=self.log_upload_enable, product=self.config.product)
-            self.log_info("Connection to database", {"db_name": data["db_name"]})
-            self.db.set_database(data["db_name"])
+        self.db = self.plan.database(self.log_upload_enable)
+        if self.plan.db_name is not None:
+            self.log_info("Connection to database", {"db_name": self.plan.db_name})
         else:
-            self.db = DBInterface.create(None, product=self.config.product)
             self.log_info("No database defined", {})
-            self.db.disable()
 
         self.status = TestStatus.UNTESTED
 
-        self.preconditions = {}
-        self.testcases = {}
-
         self.card_eui = None
 
-        for c in data["test_cases"]:
-            # print("Test case", c["target"], c)
-            # test cases types have all been imported, create an instance
-
-            # testcase_type = eval(c["target"])
-            param = {}
-
-            param["job"] = self.job
-            param["slot"] = self.slot.index
-            param["test_id"] = c["id"]
-            param["step_callback"] = self.step_callback
-            param["status_callback"] = self.slot.status_msg_cb
-            param["device_list"] = self.device_list
-            param["config"] = self.config
-            param["timeout"] = c["timeout"]
-            if "retries" in c.keys():
-                param["retries"] = c["retries"]
-            else:
-                param["retries"] = self.retries
-
-            # append fixture level parameters
-            if c["id"] in self.config.test_parameters:
-                param.update(self.config.test_parameters[c["id"]])
-
-            param.update({"provision_enable":self.provision_enable})
-            param.update({'fw':self.fw})
-            param.update({'board_type':self.board_type})
-            
-
-            # append test_suite level parameters - these may override the fixture level ones
-            param.update(c["parameters"])
-
-            # append job specific parameters from job.json - these may override the fixture and test_suite level parameters
-            if self.job is not None:
-                if c["id"] in self.job._parameters:
-                    param.update(self.job._parameters[c["id"]])
-
-            # bring in test specific parameters specified in job.json
-            # if c["id"] in self.job.parameters:
-            #    param.update(self.job.parameters[c["id"]])
-
-            instance = TestCase.create(c["target"], **param)
-            steps = instance.get_step_names()
-
-            testname = "%s - %s" % (c["id"], c["name"])
-            self.testcases[c["id"]] = instance
-            self.preconditions[c["id"]] = c["preconditions"]
+        self.testcases = self.plan.instantiate(
+            job=self.job,
+            slot=self.slot.index,
+            step_callback=self.step_callback,
+            status_callback=self.slot.status_msg_cb,
+            device_list=self.device_list,
+            config=self.config,
+        )
+        self.preconditions = self.plan.preconditions
+        self.scheduler = TestcaseScheduler(self.testcases, self.preconditions, order=self.plan.order,
+                                           logger=self.event_logger)
+        # devices shared with other slots are leased per testcase
+        self.arbiter = ResourceArbiter.instance()
+        self.lease_waits = collections.defaultdict(list)
+        self.setup_time = time.perf_counter() - start
 
     def log_info(self, msg, extra={}):
         # print(msg, extra)
@@ -149,22 +113,16 @@ class TestSuite(object):
         """
         Return the next test, None when done
         """
-        start = time.time()
-        for t in self.testcases.values():
-            if t.status == TestStatus.UNTESTED:
-                preconditions_satisfied = True
-                for d in self.preconditions[t.test_id]:
-                    if self.testcases[d].status != TestStatus.PASS:
-                        preconditions_satisfied = False
-
-                if preconditions_satisfied:
-                    return t
-        return None
+        return self.scheduler.next_testcase()
 
     def log_debug(self, *args, **kwargs):
         print(*args, **kwargs)
 
-    def run(self):
+    def run(self, persist=True):
+        """
+        Run the suite and return the result. persist=False leaves storing the result to the caller
+        (see persist()), so the verdict is available without waiting for the log and database.
+        """
         self.event_logger.info("testsuite run()")
         self.test_index = 0
         self.status = TestStatus.PASS
@@ -173,64 +131,31 @@ class TestSuite(object):
         self.label_data = {}
 
         step_log = []
+        self.lease_waits.clear()
         start = datetime.datetime.now(timezone.utc).astimezone()
 
-        t = self.next_testcase()
+        # dead time: previous DUT finished -> this one starts (DUT swap, scan, suite setup)
+        suite_end = getattr(self.slot, "suite_end", None)
+        dead_time = time.monotonic() - suite_end if suite_end is not None else None
+        self.log_info("Suite start", {"setup_time": self.setup_time, "dead_time": dead_time,
+                                      "plan_uses": self.plan.uses})
+
+        interface = self.device_list.get("interface") if self.device_list else None
+        if interface is not None:
+            interface.reset_stats()
+
         self.set_led(TestStatus.INCOMPLETE)
 
+        completed = self.scheduler.run(self.run_testcase, parallel=self.parallel, on_complete=self.testcase_complete)
+        if self.parallel:
+            # keep the log in suite order regardless of which testcase finished first
+            completed.sort(key=lambda c: self.scheduler.order.index(c[0].test_id))
+        for t, attempts in completed:
+            step_log.extend(attempts or [])
 
-        while t is not None:
-
-            for i in range(t.retries):  # retry loop
-                self.log_info("Running test %s (attempt %d/%d)" % (t.test_id, i + 1, t.retries))
-                try:
-                    result = t.execute(retry_count=i)
-                except Exception:
-                    # catching Exceptions here
-                    exc_type, exc_value, exc_trace = sys.exc_info()
-                    self.log_info(
-                        msg="Test suite exception",
-                        extra={
-                            "exception_type": exc_type,
-                            "exception_value": exc_value,
-                            "exception_trace": exc_trace
-                        }
-                    )
-                    t.status = TestStatus.ERROR
-
-                step_log.append({
-                    "test_id": t.test_id,
-                    "result": TestStatus.str(t.status),
-                    "log": t.log,
-                    "error_code": t.error_code,
-                    "timestamp": t.timestamp.isoformat(),
-                    "duration": t.duration,
-                    "retry_count": i,
-                })
-
-                if t.status == TestStatus.PASS or t.status == TestStatus.SKIP:
-                    # if passed, do not retry
-                    break
-
-            self.slot.report_error_codes(t.error_code)
-            self.test_index += 1
-
-            if t.status == TestStatus.FAIL:
-                # if we fail any test, test suite status = FAIL.
-                # skipping has no impact
-                self.status = TestStatus.FAIL
-            elif t.status == TestStatus.ERROR:
-                self.status = TestStatus.ERROR
-
-            
-            if t.provisionStatus == ProvisionStatus.COMPLETE:
-                self.provisionStatus = ProvisionStatus.COMPLETE
-
-            if t.iot is not None:
-                self.iot = t.iot
-
-            t = self.next_testcase()
-        
+        if interface is not None:
+            # testcase teardowns leave the rails to the next testcase; the suite ends with them off
+            interface.flush_rails()
 
         self.set_led(self.status)
 
@@ -238,7 +163,7 @@ class TestSuite(object):
         result_dict = {
             "result": TestStatus.str(self.status),
             "Provisioned": ProvisionStatus.str(self.provisionStatus),
-            "slot": self.slot.index + 1,
+            "slot": self.slot.number,
             "timestamp": start.isoformat(),
             "duration": duration,
             "steps": step_log,
@@ -248,26 +173,161 @@ class TestSuite(object):
             "product": self.config.product,
             "serial": self.slot.barcode,
             "iot": self.iot,
+            "timing": {
+                "setup": self.setup_time,
+                "dead_time": dead_time,
+                "plan": self.plan.key,
+                "plan_build": self.plan.build_time,
+                "plan_uses": self.plan.uses,
+                # device handles reused instead of reopened for this DUT
+                "sessions": self.slot.sessions.delta() if hasattr(self.slot, "sessions") else {},
+                # queue wait for shared resources, per lease
+                "leases": {name: ResourceArbiter.histogram(waits) for name, waits in self.lease_waits.items()},
+                # testcase time by kind: sleep, io, subprocess, cpu, other
+                "breakdown": TestSuite.time_breakdown(step_log),
+            },
         }
+        interface_stats = interface.stats() if interface is not None else {}
+        if interface_stats:
+            result_dict["interface"] = interface_stats
         try:
             result_dict["firmware"] = self.testcases['PROGRAM_PRODUCTION_FIRMWARE'].firmware_list[1]['file'].split('/')[1]
         except:
             pass
         
         self.device_list["target"].set_iot(self.iot)
-        serial = ""
 
+        if persist:
+            self.persist(result_dict)
+
+        return result_dict
+
+    @staticmethod
+    def time_breakdown(step_log):
+        """
+        Sum the step and setup/teardown time splits of all attempts
+        """
+        total = collections.Counter()
+        for attempt in step_log:
+            splits = [s.get("timing") for s in attempt.get("log", [])] + list((attempt.get("timing") or {}).values())
+            for split in splits:
+                total.update(split or {})
+        return {k: round(v, 3) for k, v in total.items()}
+
+    def persist(self, result_dict, target=None):
+        """
+        Write the result to the result log and the database. target is the DUT record to log,
+        by default the current device_list["target"].
+        """
+        if target is None:
+            target = self.device_list["target"]
+        start = time.perf_counter()
         # to file
         self.result_logger.warning(
             msg="log",
             extra=result_dict)
-        
 
         # to db
         self.db.log_result(result_dict)
-        self.db.log_device(self.device_list["target"])
+        self.db.log_device(target)
+        self.log_info("Result stored", {"serial": result_dict.get("serial"),
+                                        "persist_time": time.perf_counter() - start})
 
-        return result_dict
+    def lease_names(self, t):
+        """
+        Arbiter leases for the resources a testcase claims (all of them for resources=None)
+        """
+        resources = Resource.ALL if t.resources is None else t.resources
+        return [self.slot.lease_name(r) for r in resources]
+
+    def run_testcase(self, t):
+        """
+        Lease the testcase resources and run it, return its step log entries (one per attempt)
+        """
+        owner = "%s:%s" % (self.slot.msg_topic, t.test_id)
+        try:
+            with self.arbiter.lease(self.lease_names(t), owner, timeout=t.timeout) as waits:
+                for name, wait in waits.items():
+                    self.lease_waits[name].append(wait)
+                    if wait > 0.1:
+                        self.log_info("Lease wait", {"test_id": t.test_id, "lease": name, "wait": wait})
+                return self.run_attempts(t)
+        except (LeaseTimeout, LeaseDeadlock) as e:
+            self.log_info("Lease failed", {"test_id": t.test_id, "error": str(e)})
+            t.status = TestStatus.ERROR
+            return [{
+                "test_id": t.test_id,
+                "result": TestStatus.str(t.status),
+                "log": [{"step_name": "lease", "result": False, "error": str(e)}],
+                "error_code": t.error_code,
+                "timestamp": datetime.datetime.now(timezone.utc).astimezone().isoformat(),
+                "duration": 0,
+                "retry_count": 0,
+            }]
+
+    def run_attempts(self, t):
+        """
+        Execute a testcase with retries, return its step log entries (one per attempt)
+        """
+        attempts = []
+        for i in range(t.retries):  # retry loop
+            self.log_info("Running test %s (attempt %d/%d)" % (t.test_id, i + 1, t.retries))
+            started = time.time()
+            try:
+                result = t.execute(retry_count=i)
+            except Exception:
+                # catching Exceptions here
+                exc_type, exc_value, exc_trace = sys.exc_info()
+                self.log_info(
+                    msg="Test suite exception",
+                    extra={
+                        "exception_type": exc_type,
+                        "exception_value": exc_value,
+                        "exception_trace": exc_trace
+                    }
+                )
+                t.status = TestStatus.ERROR
+
+            attempts.append({
+                "test_id": t.test_id,
+                "result": TestStatus.str(t.status),
+                "log": t.log,
+                "error_code": t.error_code,
+                "timestamp": t.timestamp.isoformat(),
+                "duration": t.duration,
+                "retry_count": i,
+                "timing": t.phases,
+            })
+            target = self.device_list.get("target") if self.device_list else None
+            if target is not None and t.status not in (TestStatus.PASS, TestStatus.SKIP):
+                # what went over the DUT UART during the failed attempt
+                attempts[-1]["transcript"] = target.transcript(since=started)
+
+            if t.status == TestStatus.PASS or t.status == TestStatus.SKIP:
+                # if passed, do not retry
+                break
+        t.finish()
+        return attempts
+
+    def testcase_complete(self, t, attempts):
+        """
+        Fold a finished testcase into the suite status (called on the suite thread)
+        """
+        self.slot.report_error_codes(t.error_code)
+        self.test_index += 1
+
+        if t.status == TestStatus.FAIL:
+            # if we fail any test, test suite status = FAIL.
+            # skipping has no impact
+            self.status = TestStatus.FAIL
+        elif t.status == TestStatus.ERROR:
+            self.status = TestStatus.ERROR
+
+        if t.provisionStatus == ProvisionStatus.COMPLETE:
+            self.provisionStatus = ProvisionStatus.COMPLETE
+
+        if t.iot is not None:
+            self.iot = t.iot
 
     def set_led(self, led):
         if "interface" in self.device_list:
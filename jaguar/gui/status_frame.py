@@ -9,9 +9,12 @@ from pubsub import pub
 class JaguarStatusFrame(StatusFrame):
     def setup_slots(self):
         pass
-        self.slotgrid = wx.GridSizer(rows=1, cols=self.slot_count, hgap=2, vgap=2)
+        # up to four slots per row
+        cols = min(self.slot_count, 4)
+        self.slotgrid = wx.GridSizer(rows=(self.slot_count + cols - 1) // cols, cols=cols, hgap=2, vgap=2)
+        numbers = [number for number, _ in self.config.slots()]
         for i in range(self.slot_count):
-            self.slotpanel[i] = JaguarSlotSummaryPanel(self.config, i, True, self.panel, wx.ID_ANY)
+            self.slotpanel[i] = JaguarSlotSummaryPanel(self.config, i, True, numbers[i], self.panel, wx.ID_ANY)
             self.slotgrid.Add(self.slotpanel[i], 1, wx.EXPAND)
             self.slotpanel[i].reset_display()
         self.vbox.Add(self.slotgrid, 10, wx.ALL | wx.EXPAND, 5)
@@ -0,0 +1,203 @@
+"""
+Command client for the Jaguar DUT test firmware UART.
+
+The test firmware takes single-character commands with space separated arguments, terminated by
+"\\r". The ones that return a value answer with one "\\n" terminated line, in command order:
+
+    "2 <dac> <value>"       set DAC                 no response
+    "3 1"                   read pulse counter      "...: <count>"
+    "4"                     read ADC                "ADC1: <a>, ADC2: <b>, ADC3: <c>"
+    "5 <port> <pin> <v>"    set GPIO                no response
+    "6 <port> <pin>"        read GPIO               "...: <level>"
+
+DutCommandClient writes each command in one go and returns as soon as its response line is in,
+instead of writing byte by byte and sleeping. Several commands may be outstanding: responses are
+matched to the oldest command still waiting for one they fit (any older ones are then lost), and
+lines that fit none are dropped as noise. The connection is the raw port or the UartReader
+JaguarTargetDUT keeps on it; only its serial.Serial calls are used.
+"""
+import collections
+import logging
+import re
+import threading
+import time
+
+from birch.core.cancellation import CancellationToken, cancellable
+
+
+def _parse_int_after_colon(line):
+    try:
+        return int(line.strip().split(b":")[-1])
+    except ValueError:
+        return None
+
+
+def _parse_adc(line):
+    try:
+        _, a, _, b, _, c = line.replace(b":", b" ").replace(b",", b" ").split()
+        return int(a), int(b), int(c)
+    except ValueError:
+        return None
+
+
+class DutCommand(object):
+    """
+    One test firmware command: the bytes written and, for commands that answer, a regex the response
+    line must match and a parser for it (None when the line cannot be parsed).
+    """
+
+    def __init__(self, text, match=None, parse=None, timeout=1.0):
+        self.text = text
+        self.match = re.compile(match) if match is not None else None
+        self.parse = parse or (lambda line: line)
+        self.timeout = timeout
+
+    def __repr__(self):
+        return "DutCommand(%r)" % self.text.strip()
+
+    # The command strings are the ones the firmware has always been sent, padding included
+
+    @staticmethod
+    def set_dac(channel, value):
+        return DutCommand(b"2 %d %d\r" % (channel, value))
+
+    @staticmethod
+    def read_pulse_count():
+        return DutCommand(b"3 1 \r", rb":\s*-?\d+\s*$", _parse_int_after_colon)
+
+    @staticmethod
+    def read_adc():
+        return DutCommand(b"4\r", rb"ADC", _parse_adc)
+
+    @staticmethod
+    def set_pin(port, pin, value):
+        return DutCommand(b"5 %s %d %d    \r" % (port.upper().encode(), pin, value))
+
+    @staticmethod
+    def read_pin(port, pin):
+        return DutCommand(b"6 %s %d     \r" % (port.upper().encode(), pin), rb"^[^:]*:\s*-?\d+\s*$",
+                          _parse_int_after_colon)
+
+
+class DutReply(object):
+    """
+    Pending response to a submitted DutCommand
+    """
+
+    def __init__(self, client, command):
+        self.client = client
+        self.command = command
+        self.sent = time.monotonic()
+        self.deadline = self.sent + command.timeout
+        self.line = None
+        self.done = command.match is None
+        self.latency = 0.0 if self.done else None
+
+    def set(self, line):
+        self.line = line
+        self.done = True
+        self.latency = time.monotonic() - self.sent
+
+    def result(self):
+        """
+        Wait for the response; the parsed value, None on timeout or an unparsable line. Commands
+        without a response return True once written.
+        """
+        self.client.wait(self)
+        if self.command.match is None:
+            return True
+        if self.line is None:
+            return None
+        return self.command.parse(self.line)
+
+
+class DutCommandClient(object):
+    """
+    Writes test firmware commands and matches their response lines in order.
+
+    At most `depth` commands wait for a response at a time; submit() collects the oldest response
+    first when the pipeline is full. Input left over from before the first outstanding command is
+    discarded, as the byte-by-byte writer did.
+    """
+
+    def __init__(self, connection, depth=4, logger=None):
+        self.logger = logger
+        if self.logger is None:
+            self.logger = logging.getLogger("event_logger")
+
+        self.connection = connection
+        self.depth = depth
+        self.lock = threading.RLock()
+        self.pending = collections.deque()
+        # bytes of a line whose terminator has not arrived yet
+        self.partial = b""
+        self.counters = collections.Counter()
+
+    def submit(self, command) -> DutReply:
+        """
+        Write a command without waiting for its response
+        """
+        with self.lock:
+            if not self.pending:
+                self.connection.reset_input_buffer()
+                self.partial = b""
+            while len(self.pending) >= self.depth:
+                self._receive()
+            self.connection.write(command.text)
+            self.counters["commands"] += 1
+            reply = DutReply(self, command)
+            if not reply.done:
+                self.pending.append(reply)
+            return reply
+
+    def wait(self, reply):
+        with self.lock:
+            while not reply.done:
+                self._receive()
+
+    @cancellable
+    def call(self, command):
+        """
+        Write a command and return its parsed response (see DutReply.result)
+        """
+        return self.submit(command).result()
+
+    @cancellable
+    def call_many(self, commands):
+        """
+        Pipeline a sequence of commands; their results in order
+        """
+        replies = [self.submit(c) for c in commands]
+        return [r.result() for r in replies]
+
+    def _receive(self):
+        """
+        Read one line (or up to the port timeout) and settle the pending reply it answers
+        """
+        CancellationToken.current().check()
+        head = self.pending[0]
+        data = self.connection.readline(1000)
+        if data:
+            self.partial += data
+        if self.partial.endswith(b"\n"):
+            line, self.partial = self.partial, b""
+            for i, reply in enumerate(self.pending):
+                if reply.command.match.search(line.strip()):
+                    # responses come in order: the ones this overtook are lost
+                    for _ in range(i):
+                        self._lost(self.pending.popleft())
+                    self.pending.popleft().set(line)
+                    self.counters["responses"] += 1
+                    return
+            self.counters["discarded"] += 1
+            self.logger.debug("DutCommandClient: discarded %r waiting for %r" % (line, head.command))
+        if time.monotonic() > head.deadline:
+            self._lost(self.pending.popleft())
+
+    def _lost(self, reply):
+        reply.set(None)
+        self.counters["timeouts"] += 1
+        self.logger.warning("DutCommandClient: no response to %r" % reply.command)
+
+    def stats(self) -> dict:
+        return dict(self.counters)
@@ -7,27 +7,128 @@ Key features:
 - Guarded calls that ensure the LL is opened
 - Light logging on rail/LED/GPIO operations
 - Rail guard helpers to ensure mutually exclusive DC/BAT rails with VSYS verification
+- Buffered ADC telemetry: window()/capture() statistics over fixture update packets
+- Adaptive settle: settle() waits for ADC channels to converge instead of a fixed sleep
+- Rail profiles: testcases declare the rail/IO state they need and only the difference is applied
 """
 
+import os
 import time
+import contextlib
 from typing import Optional, List
 
 from birch.peripheral.interface import Interface
-from birch.peripheral.util import find_port
+from birch.peripheral.util import resolve_port
+from birch.core.cancellation import CancellationToken
 from birch.test_status import TestStatus
 
 # Low-level fixture driver + constants
 from .jaguar_interface.jaguar_interface_ll import JaguarInterfaceLL
 from .jaguar_interface.JaguarFixture import JaguarFixtureLED
+from .jaguar_interface.TelemetryBuffer import TelemetryWindow
+
+
+class RailProfile(object):
+    """
+    Fixture rail/IO state a testcase needs. None leaves a line as it is.
+
+    cold=True starts the DUT from a discharged VSYS (power cycle) even if the rails already match.
+    settle_s is waited after the DUT is powered up, and skipped when it was already up.
+    """
+    LINES = ("dc", "bat", "v3", "gpio", "rs232", "jtag", "analog")
+
+    def __init__(self, dc=None, bat=None, v3=None, gpio=None, rs232=None, jtag=None, analog=None,
+                 cold=False, settle_s=0.0):
+        self.dc = dc
+        self.bat = bat
+        self.v3 = v3
+        self.gpio = gpio
+        self.rs232 = rs232
+        self.jtag = jtag
+        self.analog = analog
+        self.cold = cold
+        self.settle_s = settle_s
+
+    def lines(self) -> dict:
+        return {name: bool(getattr(self, name)) for name in self.LINES if getattr(self, name) is not None}
+
+    def __repr__(self):
+        return "RailProfile(%s%s)" % (", ".join("%s=%d" % kv for kv in self.lines().items()),
+                                      ", cold" if self.cold else "")
+
+
+RailProfile.OFF = RailProfile(dc=False, bat=False, v3=False, gpio=False, rs232=False, jtag=False, analog=False)
+
+
+class SettleResult(object):
+    """
+    Outcome of JaguarInterface.settle(): whether the channels converged, how long it took and the
+    trend/spread of the last window. Truthy when settled.
+    """
+
+    def __init__(self, name, settled, elapsed, window, slope, std):
+        self.name = name
+        self.settled = settled
+        self.elapsed = elapsed
+        self.window = window  # the last window examined, usable as the measurement
+        self.slope = slope  # channel -> units/s
+        self.std = std  # channel -> units
+
+    def __bool__(self):
+        return self.settled
+
+    def as_dict(self) -> dict:
+        return {"name": self.name, "settled": self.settled, "time": round(self.elapsed, 4),
+                "slope": {ch: None if v is None else round(v, 6) for ch, v in self.slope.items()},
+                "std": {ch: None if v is None else round(v, 6) for ch, v in self.std.items()}}
+
+    def __repr__(self):
+        return "SettleResult(%s, %s after %.3fs)" % (self.name, "settled" if self.settled else "NOT settled",
+                                                    self.elapsed)
 
 
 class JaguarInterface(Interface):
     VID = "0483"
     PID = "5740"
 
-    def __init__(self, *args, **kwargs):
+    # settle() defaults, channel -> (max |slope| per second, max std) over the sliding window. Set above
+    # the fixture ADC noise; tune from the "settle" entries in the result log.
+    SETTLE_LIMITS = {
+        "battery_voltage": (0.1, 0.02),
+        "dc_voltage": (0.5, 0.1),
+        "sys_voltage": (0.1, 0.02),
+        "modem_voltage": (0.1, 0.02),
+        "battery_current": (0.01, 0.002),
+        "dc_current": (0.01, 0.002),
+        "adc_4_20_ch0": (0.5, 0.1),
+        "adc_4_20_ch1": (0.5, 0.1),
+    }
+
+    def __init__(self, port: Optional[str] = None, leds: Optional[dict] = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.interface: Optional[JaguarInterfaceLL] = None
+        # Explicit serial port (e.g. a JaguarFixtureSimulator pty); else JAGUAR_FIXTURE_PORT, else VID/PID lookup
+        self.port = port
+        # Status LED numbers, overridden per slot by the slot_map "leds" entry
+        self.leds = {
+            "busy": JaguarFixtureLED.LED_BUSY,
+            "pass": JaguarFixtureLED.LED_PASS,
+            "fail": JaguarFixtureLED.LED_FAIL,
+        }
+        self.leds.update({k: JaguarFixtureLED(v) for k, v in (leds or {}).items()})
+
+        # Rail lines released by the last testcase, applied lazily (see release_rails)
+        self._rails_deferred = None
+        # time.monotonic() of the last DUT power-up by apply_rails(), None while the DUT is off
+        self.powered_at = None
+        # Measured cost of a discharge and of a power-up, used to estimate the time saved
+        self._rail_cost = {"discharge": 0.0, "power_up": 0.0}
+        self._rail_stats = {}
+        self._reset_rail_stats()
+        # settle() times per name since reset_stats(): {"times": [...], "timeouts": n}
+        self._settle_stats = {}
+        # fixture update callbacks, registered again when the link is reopened
+        self._update_callbacks = []
 
         # Centralized V3 TP -> GND mapping for measurements/switching
         self.V3_GND_MAP = {
@@ -65,7 +166,7 @@ class JaguarInterface(Interface):
     # ---------- open/close ----------
 
     def open(self) -> bool:
-        port = find_port(vid=self.VID, pid=self.PID)
+        port = resolve_port(self.port or os.environ.get("JAGUAR_FIXTURE_PORT"), vid=self.VID, pid=self.PID)
         if port is None:
             self._log("error", f"JaguarInterface.open: no port for VID={self.VID} PID={self.PID}")
             return False
@@ -74,6 +175,8 @@ class JaguarInterface(Interface):
             self.interface = JaguarInterfaceLL(port)
             # Some LLs need an explicit open(); uncomment if yours does.
             # self.interface.open()
+            for fn in self._update_callbacks:
+                self.interface.session.add_update_callback(fn)
             return True
         except Exception as e:
             self._log("exception", f"JaguarInterface.open failed: {e}")
@@ -89,6 +192,173 @@ class JaguarInterface(Interface):
         finally:
             self.interface = None
 
+    def healthy(self, timeout: float = 0.5) -> bool:
+        """
+        Link check for SessionManager: the fixture streams update packets, so the last one must be
+        recent (or one must arrive within timeout).
+        """
+        if self.interface is None or self.interface.session is None or not self.interface.connected():
+            return False
+        session = self.interface.session
+        if time.monotonic() - session.state.timestamp < timeout:
+            return True
+        return session.wait_for_update(timeout=timeout) is not None
+
+    def reset(self):
+        """
+        Between DUTs: drop deferred rail changes and telemetry/counters of the previous unit.
+        """
+        self.flush_rails()
+        self.reset_stats()
+
+    # ---------- GPIO transactions ----------
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Coalesce GPIO/LED writes: inside the block they are only recorded, and on exit the pins whose
+        level actually changes are sent in a single serial write.
+        """
+        self._ensure_ll()
+        with self.interface.batch():
+            yield self
+
+    def reset_stats(self):
+        self._reset_rail_stats()
+        self._settle_stats = {}
+        if self.interface is not None:
+            self.interface.reset_gpio_stats()
+
+    def stats(self) -> dict:
+        if self.interface is None:
+            return {}
+        d = self.interface.gpio_stats()
+        d.update(self._rail_stats)
+        if self._settle_stats:
+            d["settle"] = {name: {"n": len(s["times"]), "mean": round(sum(s["times"]) / len(s["times"]), 4),
+                                  "max": round(max(s["times"]), 4), "timeouts": s["timeouts"]}
+                           for name, s in self._settle_stats.items()}
+        return d
+
+    # ---------- rail profiles ----------
+
+    def _reset_rail_stats(self):
+        self._rail_stats = {
+            "rail_applies": 0,  # apply_rails() calls
+            "rail_unchanged": 0,  # ... that found every line already at the requested level
+            "rail_power_cycles_skipped": 0,  # ... that kept a powered DUT up instead of cycling it
+            "rail_time_spent": 0.0,  # seconds inside apply_rails()
+            "rail_time_saved": 0.0,  # estimated discharge/power-up/settle seconds not spent
+        }
+
+    def _powered(self) -> bool:
+        return bool(self.interface.rail_level("dc") or self.interface.rail_level("bat"))
+
+    def _discharge(self):
+        start = time.monotonic()
+        self.power_off()
+        self._rail_cost["discharge"] = time.monotonic() - start
+
+    def _rail_targets(self, lines: dict, deferred: Optional[dict] = None) -> dict:
+        """
+        Line -> level to write, one line per fixture output: lines that drive the same output (v3 and
+        gpio share GPIO_EN, see JaguarInterfaceLL.RAIL_OUTPUTS) are resolved together. `lines` override
+        `deferred` (released by the previous testcase) on the same output; within `lines`, a line that
+        enables a shared output wins over one that disables it.
+        """
+        outputs = self.interface.RAIL_OUTPUTS
+        resolved = {}
+        for name, level in (deferred or {}).items():
+            resolved[outputs[name][0]] = (name, level)
+        explicit = {}
+        for name in RailProfile.LINES:
+            if name not in lines:
+                continue
+            out = outputs[name][0]
+            if out not in explicit or (lines[name] and not explicit[out][1]):
+                explicit[out] = (name, lines[name])
+        resolved.update(explicit)
+        return dict(resolved.values())
+
+    def apply_rails(self, profile: RailProfile) -> bool:
+        """
+        Bring the fixture to `profile`, writing only the outputs that differ (plus any lines released by
+        the previous testcase and not set by `profile`). The discharge wait and the power-up settle only
+        happen when the DUT power actually changes. Returns False if the DUT was powered up and VSYS did
+        not rise.
+        """
+        self._ensure_ll()
+        start = time.monotonic()
+        target = self._rail_targets(profile.lines(), self._rails_deferred)
+        self._rails_deferred = None
+
+        was_powered = self._powered()
+        if profile.cold:
+            if was_powered:
+                self._discharge()
+            else:
+                self.wait_vsys_below(thresh=0.1, timeout_s=5.0)
+
+        delta = {name: level for name, level in target.items() if self.interface.rail_level(name) != level}
+        self._log("info", f"JaguarInterface.apply_rails: {profile} -> change {delta or 'none'}")
+        if delta:
+            with self.batch():
+                for name in RailProfile.LINES:
+                    if name in delta:
+                        self.interface.set_rail(name, delta[name])
+            self.wait_for_outputs(timeout=0.5)
+
+        ok = True
+        powered = self._powered()
+        if not powered:
+            self.powered_at = None
+        elif profile.cold or not was_powered:
+            t = self.powered_at = time.monotonic()
+            ok = self.wait_vsys_above(thresh=0.5 if target.get("dc") else 2.5, timeout_s=2.0)
+            if profile.settle_s:
+                time.sleep(profile.settle_s)
+            self._rail_cost["power_up"] = time.monotonic() - t
+        elif powered:
+            # DUT stayed up: a per-testcase off/on would have discharged, powered up and settled again
+            self._rail_stats["rail_power_cycles_skipped"] += 1
+            self._rail_stats["rail_time_saved"] += (self._rail_cost["discharge"] + self._rail_cost["power_up"] +
+                                                    profile.settle_s)
+
+        self._rail_stats["rail_applies"] += 1
+        if not delta:
+            self._rail_stats["rail_unchanged"] += 1
+        self._rail_stats["rail_time_spent"] += time.monotonic() - start
+        return ok
+
+    def release_rails(self, profile: Optional[RailProfile] = None, cold: bool = False):
+        """
+        Testcase teardown: the lines in `profile` (default all off) are applied by the next
+        apply_rails() or flush_rails(), so a following testcase with the same needs keeps the DUT
+        powered. cold=True powers off and discharges now instead (e.g. after a failure).
+        """
+        self._ensure_ll()
+        if cold:
+            self._rails_deferred = None
+            self._discharge()
+            return
+        self._rails_deferred = (profile or RailProfile.OFF).lines()
+
+    def flush_rails(self):
+        """
+        Apply lines left by release_rails(); called at the end of a test suite.
+        """
+        if self.interface is None or not self._rails_deferred:
+            return
+        lines, self._rails_deferred = self._rail_targets(self._rails_deferred), None
+        self._log("info", f"JaguarInterface.flush_rails: {lines}")
+        with self.batch():
+            for name in RailProfile.LINES:
+                if name in lines:
+                    self.interface.set_rail(name, lines[name])
+        self.wait_for_outputs(timeout=0.5)
+        if not self._powered():
+            self.powered_at = None
+
     # ---------- status LEDs ----------
 
     def set_led(self, status, value: int):
@@ -97,22 +367,26 @@ class JaguarInterface(Interface):
         """
         self._ensure_ll()
         self._log("debug", f"JaguarInterface.set_led: status={status} value={value}")
+        with self.batch():
+            self._set_status_leds(status, value)
+
+    def _set_status_leds(self, status, value: int):
         if status == TestStatus.PASS:
-            self.interface.set_led(JaguarFixtureLED.LED_PASS, value)
-            self.interface.set_led(JaguarFixtureLED.LED_FAIL, 0)
-            self.interface.set_led(JaguarFixtureLED.LED_BUSY, 0)
+            self.interface.set_led(self.leds["pass"], value)
+            self.interface.set_led(self.leds["fail"], 0)
+            self.interface.set_led(self.leds["busy"], 0)
         elif status in (TestStatus.FAIL, TestStatus.ERROR):
-            self.interface.set_led(JaguarFixtureLED.LED_PASS, 0)
-            self.interface.set_led(JaguarFixtureLED.LED_BUSY, 0)
-            self.interface.set_led(JaguarFixtureLED.LED_FAIL, value)
+            self.interface.set_led(self.leds["pass"], 0)
+            self.interface.set_led(self.leds["busy"], 0)
+            self.interface.set_led(self.leds["fail"], value)
         elif status == TestStatus.INCOMPLETE:
-            self.interface.set_led(JaguarFixtureLED.LED_BUSY, value)
-            self.interface.set_led(JaguarFixtureLED.LED_PASS, 0)
-            self.interface.set_led(JaguarFixtureLED.LED_FAIL, 0)
+            self.interface.set_led(self.leds["busy"], value)
+            self.interface.set_led(self.leds["pass"], 0)
+            self.interface.set_led(self.leds["fail"], 0)
         elif status == TestStatus.UNTESTED:
-            self.interface.set_led(JaguarFixtureLED.LED_PASS, 0)
-            self.interface.set_led(JaguarFixtureLED.LED_FAIL, 0)
-            self.interface.set_led(JaguarFixtureLED.LED_BUSY, 0)
+            self.interface.set_led(self.leds["pass"], 0)
+            self.interface.set_led(self.leds["fail"], 0)
+            self.interface.set_led(self.leds["busy"], 0)
 
     # ---------- ADC measurements (pass-through) ----------
 
@@ -146,6 +420,165 @@ class JaguarInterface(Interface):
         self._ensure_ll()
         return float(self.interface.sys_voltage())
 
+    # ---------- ADC telemetry (buffered update packets) ----------
+
+    def window(self, channels=None, n: Optional[int] = None, since: Optional[float] = None) -> TelemetryWindow:
+        """
+        Already-received update packets: the last n and/or those at or after time.monotonic() 'since'.
+        Channels: battery_voltage, dc_voltage, sys_voltage, modem_voltage, battery_current, dc_current,
+        adc_4_20_ch0, adc_4_20_ch1 (engineering units).
+        """
+        self._ensure_ll()
+        return self.interface.window(channels, n=n, since=since)
+
+    def capture(self, channels=None, n: int = 10, timeout: Optional[float] = None) -> TelemetryWindow:
+        """
+        Wait for the next n update packets and return them as a TelemetryWindow.
+        """
+        self._ensure_ll()
+        with CancellationToken.current().account("io"):
+            w = self.interface.capture(channels, n=n, timeout=timeout)
+        self._log("debug", f"JaguarInterface.capture(n={n}) -> {len(w)} packets in {w.duration:.3f}s, "
+                           f"missed={w.missed()}")
+        return w
+
+    def settle(self, channels, limits: Optional[dict] = None, level: Optional[dict] = None, n: int = 20,
+               timeout: float = 2.0, name: Optional[str] = None) -> SettleResult:
+        """
+        Adaptive replacement for a fixed sleep before a measurement: wait until the last n update
+        packets of every channel have a trend and spread below their limits (channel -> (max |slope|
+        per second, max std), default SETTLE_LIMITS), and, if given, a mean inside level (channel ->
+        (min, max), None for no bound; every channel of level must be in channels). Gives up after
+        timeout seconds.
+
+        Only packets received after the fixture echoed pending output writes are considered, so a
+        rail or GPIO change made just before the call is never mistaken for a flat signal. The
+        achieved settle time is kept per name (default: the channel names) for stats().
+        """
+        self._ensure_ll()
+        token = CancellationToken.current()
+        if isinstance(channels, str):
+            channels = (channels,)
+        channels = tuple(channels)
+        limits = dict(self.SETTLE_LIMITS, **(limits or {}))
+        level = level or {}
+        missing = [ch for ch in level if ch not in channels]
+        if missing:
+            raise ValueError("settle: level channels %s are not in channels %s" % (missing, channels))
+        name = name or "+".join(channels)
+        n = max(2, int(n))
+
+        start = time.monotonic()
+        self.wait_for_outputs(timeout=timeout)
+        since = time.monotonic()
+        settled = False
+        while True:
+            token.check()
+            w = self.window(channels, n=n, since=since)
+            slope = {ch: w.slope(ch) for ch in channels}
+            std = {ch: w.std(ch) for ch in channels}
+            if len(w) >= n:
+                settled = all(abs(slope[ch]) <= limits[ch][0] and std[ch] <= limits[ch][1] for ch in channels)
+                for ch, (lo, hi) in level.items():
+                    m = w.mean(ch)
+                    settled = settled and (lo is None or m >= lo) and (hi is None or m <= hi)
+            elapsed = time.monotonic() - start
+            if settled or elapsed >= timeout:
+                break
+            self.wait_for_update(timeout=min(0.5, timeout - elapsed))
+
+        stats = self._settle_stats.setdefault(name, {"times": [], "timeouts": 0})
+        stats["times"].append(elapsed)
+        r = SettleResult(name, settled, elapsed, w, slope, std)
+        if not settled:
+            stats["timeouts"] += 1
+            self._log("warning", f"JaguarInterface.settle: {r} slope={slope} std={std}")
+        else:
+            self._log("debug", f"JaguarInterface.settle: {r}")
+        return r
+
+    # ---------- fixture update freshness ----------
+
+    def wait_for_update(self, after_counter: Optional[int] = None, timeout: float = 1.0) -> bool:
+        """
+        Block until the fixture sends an update newer than after_counter (default: the latest one).
+        """
+        self._ensure_ll()
+        with CancellationToken.current().account("io"):
+            return self.interface.wait_for_update(after_counter, timeout) is not None
+
+    def add_update_callback(self, fn):
+        """
+        fn(state) is called on the serial receive thread for every fixture update packet.
+        Callbacks stay registered across close()/open().
+        """
+        if fn not in self._update_callbacks:
+            self._update_callbacks.append(fn)
+        if self.interface is not None:
+            self.interface.session.add_update_callback(fn)
+
+    def remove_update_callback(self, fn):
+        if fn in self._update_callbacks:
+            self._update_callbacks.remove(fn)
+        if self.interface is not None:
+            self.interface.session.remove_update_callback(fn)
+
+    def wait_for_outputs(self, mask: Optional[int] = None, value: Optional[int] = None, timeout: float = 1.0) -> bool:
+        """
+        Block until an update echoes the requested gpio_outputs bits; with no mask, all outputs
+        written since the last confirmation. Replaces fixed sleeps after rail/GPIO changes.
+        """
+        self._ensure_ll()
+        with CancellationToken.current().account("io"):
+            ok = bool(self.interface.wait_for_outputs(mask, value, timeout))
+        if not ok:
+            self._log("warning", f"JaguarInterface.wait_for_outputs: not confirmed within {timeout}s")
+        return ok
+
+    def wait_for_dac(self, index: int, value, timeout: float = 1.0) -> bool:
+        """
+        Block until an update echoes DAC index (1, 2) at value, i.e. the fixture has applied set_dac().
+        """
+        self._ensure_ll()
+        end = time.monotonic() + timeout
+        with CancellationToken.current().account("io"):
+            while True:
+                remaining = end - time.monotonic()
+                state = self.interface.wait_for_update(timeout=remaining) if remaining > 0 else None
+                if state is None:
+                    self._log("warning", f"JaguarInterface.wait_for_dac: DAC{index}={value} not confirmed "
+                                         f"within {timeout}s")
+                    return False
+                if getattr(state, "dac_%d" % index) == int(value):
+                    return True
+
+    # ---------- sweeps (see jaguar.peripheral.sweep) ----------
+
+    def sweep_outputs(self, writes, timeout: float = 1.0) -> bool:
+        """
+        Sweep point fixture writes [(method, index, value)], e.g. ("set_dig_in", 0, True) or
+        ("set_dac", 1, 128), sent as one batch and confirmed by the fixture echo.
+        """
+        self._ensure_ll()
+        with self.batch():
+            for method, index, value in writes:
+                getattr(self, method)(index, value)
+        ok = self.wait_for_outputs(timeout=timeout)
+        for method, index, value in writes:
+            if method == "set_dac":
+                ok = self.wait_for_dac(index, value, timeout=timeout) and ok
+        return ok
+
+    def sweep_inputs(self, reads) -> dict:
+        """
+        Sweep point fixture readbacks ("dig_out" key 0-3) from an update received after the call.
+        Returns {readback: raw value}.
+        """
+        self._ensure_ll()
+        self.wait_for_update(timeout=0.5)
+        dig_out = self.read_dig_out()
+        return {r: dig_out[r.key] for r in reads}
+
     # ---------- V3 power & helpers ----------
 
     def v3_power_en(self, value: bool) -> bool:
@@ -344,45 +777,48 @@ class JaguarInterface(Interface):
         """
         self._ensure_ll()
         self._log("info", "JaguarInterface.power_off: shutting down rails")
+        self._rails_deferred = None
+        self.powered_at = None
 
-        # Best-effort shutdown order with guards
+        # Best-effort shutdown order with guards, sent as one write
         try:
-            if hasattr(self.interface, "rs232_enable"):
-                self.interface.rs232_enable(False)
-            if hasattr(self.interface, "jtag_enable"):
-                self.interface.jtag_enable(False)
-            if hasattr(self.interface, "battery_power_en"):
-                self.interface.battery_power_en(False)
-            if hasattr(self.interface, "dc_power_en"):
-                self.interface.dc_power_en(False)
-            if hasattr(self.interface, "set_cal_switch"):
-                self.interface.set_cal_switch([True] * 5)
-            if hasattr(self.interface, "analog_enable"):
-                self.interface.analog_enable(True)
+            with self.batch():
+                if hasattr(self.interface, "rs232_enable"):
+                    self.interface.rs232_enable(False)
+                if hasattr(self.interface, "jtag_enable"):
+                    self.interface.jtag_enable(False)
+                if hasattr(self.interface, "battery_power_en"):
+                    self.interface.battery_power_en(False)
+                if hasattr(self.interface, "dc_power_en"):
+                    self.interface.dc_power_en(False)
+                if hasattr(self.interface, "set_cal_switch"):
+                    self.interface.set_cal_switch([True] * 5)
+                if hasattr(self.interface, "analog_enable"):
+                    self.interface.analog_enable(True)
         finally:
-            # Wait for discharge with a timeout
-            count = 0
-            max_checks = 40  # 40 * 0.25s = 10s
+            # Wait for discharge with a timeout, re-checking on every fixture update
+            end = time.time() + 10.0
+            self.wait_for_outputs()
             try:
                 v = self.sys_voltage()
             except Exception:
                 v = 999.0
-            while v > 0.1 and count < max_checks:
+            while v > 0.1 and time.time() < end:
                 self._log("debug", f"JaguarInterface.power_off: Vsys={v:.6f} V (waiting)")
-                time.sleep(0.25)
-                count += 1
+                self.wait_for_update(timeout=0.25)
                 try:
                     v = self.sys_voltage()
                 except Exception:
                     v = 999.0
 
-            if count >= max_checks:
+            if v > 0.1:
                 self._log("warning", "JaguarInterface.power_off: timeout waiting for Vsys <= 0.1 V")
 
-            if hasattr(self.interface, "set_cal_switch"):
-                self.interface.set_cal_switch([False] * 5)
-            if hasattr(self.interface, "analog_enable"):
-                self.interface.analog_enable(False)
+            with self.batch():
+                if hasattr(self.interface, "set_cal_switch"):
+                    self.interface.set_cal_switch([False] * 5)
+                if hasattr(self.interface, "analog_enable"):
+                    self.interface.analog_enable(False)
 
     # ---------- misc passthrough ----------
 
@@ -429,7 +865,7 @@ class JaguarInterface(Interface):
                 val = float(fn())
             except Exception:
                 val = None
-            time.sleep(delay)
+            self.wait_for_update(timeout=delay)
         return val
 
     def wait_vsys_above(self, thresh=0.5, timeout_s=3.0):
@@ -443,7 +879,7 @@ class JaguarInterface(Interface):
                     return True
             except Exception:
                 pass
-            time.sleep(0.1)
+            self.wait_for_update(timeout=0.1)
         self._log("warning", f"wait_vsys_above timeout (last={last})")
         return False
 
@@ -458,20 +894,20 @@ class JaguarInterface(Interface):
                     return True
             except Exception:
                 pass
-            time.sleep(0.12)
+            self.wait_for_update(timeout=0.12)
         self._log("warning", f"wait_vsys_below timeout (last={last})")
         return False
 
     def rails_set_dc_only(self, settle_s=0.25) -> bool:
         """
         Ensure BAT=OFF, DC=ON and VSYS rises (retry once if needed).
-        Returns True if VSYS rose above ~0.5 V.
+        Returns True if VSYS rose above ~0.5 V. settle_s bounds each wait for the fixture to echo the rail outputs.
         """
         self._ensure_ll()
         self._log("info", "rails_set_dc_only: BAT=OFF, DC=ON")
         self.battery_power_en(False)
         self.dc_power_en(True)
-        time.sleep(settle_s)
+        self.wait_for_outputs(timeout=settle_s)
 
         if self.wait_vsys_above(thresh=0.5, timeout_s=2.0):
             return True
@@ -479,21 +915,22 @@ class JaguarInterface(Interface):
         # Retry once: toggle DC
         self._log("warning", "VSYS did not rise; retrying DC rail")
         self.dc_power_en(False)
-        time.sleep(0.2)
+        self.wait_for_outputs(timeout=settle_s)
         self.dc_power_en(True)
-        time.sleep(settle_s)
+        self.wait_for_outputs(timeout=settle_s)
         return self.wait_vsys_above(thresh=0.5, timeout_s=2.0)
 
     def rails_set_bat_only(self, settle_s=0.25) -> bool:
         """
         Ensure DC=OFF, BAT=ON and VSYS rises (retry once if needed).
-        Returns True if VSYS rose above ~2.5 V (battery domain).
+        Returns True if VSYS rose above ~2.5 V (battery domain). settle_s bounds each wait for the fixture to
+        echo the rail outputs.
         """
         self._ensure_ll()
         self._log("info", "rails_set_bat_only: DC=OFF, BAT=ON")
         self.dc_power_en(False)
         self.battery_power_en(True)
-        time.sleep(settle_s)
+        self.wait_for_outputs(timeout=settle_s)
 
         if self.wait_vsys_above(thresh=2.5, timeout_s=2.0):
             return True
@@ -501,9 +938,9 @@ class JaguarInterface(Interface):
         # Retry once: toggle BAT
         self._log("warning", "VSYS did not rise on BAT; retrying battery rail")
         self.battery_power_en(False)
-        time.sleep(0.2)
+        self.wait_for_outputs(timeout=settle_s)
         self.battery_power_en(True)
-        time.sleep(settle_s)
+        self.wait_for_outputs(timeout=settle_s)
         return self.wait_vsys_above(thresh=2.5, timeout_s=2.0)
 
     def force_all_off_and_wait(self):
@@ -513,23 +950,26 @@ class JaguarInterface(Interface):
         self._ensure_ll()
         self._log("info", "force_all_off_and_wait")
         try:
-            if hasattr(self.interface, "battery_power_en"):
-                self.interface.battery_power_en(False)
-            if hasattr(self.interface, "dc_power_en"):
-                self.interface.dc_power_en(False)
-            if hasattr(self.interface, "set_cal_switch"):
-                self.interface.set_cal_switch([True] * 5)
-            if hasattr(self.interface, "analog_enable"):
-                self.interface.analog_enable(True)
+            with self.batch():
+                if hasattr(self.interface, "battery_power_en"):
+                    self.interface.battery_power_en(False)
+                if hasattr(self.interface, "dc_power_en"):
+                    self.interface.dc_power_en(False)
+                if hasattr(self.interface, "set_cal_switch"):
+                    self.interface.set_cal_switch([True] * 5)
+                if hasattr(self.interface, "analog_enable"):
+                    self.interface.analog_enable(True)
         except Exception as e:
             self._log("warning", f"force_all_off: {e}")
         finally:
+            self.wait_for_outputs()
             self.wait_vsys_below(thresh=0.2, timeout_s=6.0)
             try:
-                if hasattr(self.interface, "set_cal_switch"):
-                    self.interface.set_cal_switch([False] * 5)
-                if hasattr(self.interface, "analog_enable"):
-                    self.interface.analog_enable(False)
+                with self.batch():
+                    if hasattr(self.interface, "set_cal_switch"):
+                        self.interface.set_cal_switch([False] * 5)
+                    if hasattr(self.interface, "analog_enable"):
+                        self.interface.analog_enable(False)
             except Exception:
                 pass
 
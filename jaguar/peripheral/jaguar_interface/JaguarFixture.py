@@ -8,6 +8,8 @@ import argparse
 import datetime
 import time
 import enum
+import struct
+import threading
 
 from .SerialTransport import *
 from .JaguarLogger import JaguarLogger
@@ -160,6 +162,107 @@ class JaguarFixtureDAC(enum.IntEnum):
     DAC_MAX = 3
 
 
+class JaguarFixtureState(object):
+    """
+    Immutable snapshot of one RX_PACKET_TYPE_UPDATE payload.
+
+    The whole payload is decoded with a single struct.unpack_from; GPIO bits, LEDs and ADC pin
+    voltages are exposed as read-only properties under the names JaguarFixture used to store
+    as attributes (gpio_input_lid_detect, adc_sys_voltage, ...). JaguarFixture swaps in a new
+    snapshot per packet, so readers holding a reference always see one consistent update.
+    """
+
+    # [version uint8][counter uint8][gpio_inputs uint16][gpio_outputs uint32]
+    # [adc1..adc8 uint16][dac1 uint32][dac2 uint32][led uint8]
+    PAYLOAD = struct.Struct("<BBHI8H2IB")
+
+    # Bit order of the gpio_inputs / gpio_outputs bitfields
+    GPIO_INPUT_NAMES = ("dig_out_rtn_0", "dig_out_rtn_1", "dig_out_rtn_2", "dig_out_rtn_3",
+                        "switch_0", "switch_1", "switch_2", "switch_3",
+                        "dut_detect", "lid_detect", "dc_status", "3v8_status", "dig_out_fault")
+    GPIO_OUTPUT_NAMES = ("dig_in_0", "dig_in_1", "fixture_detect", "en_3v8", "dc_en", "usb_en",
+                         "dig_out_pwr", "rs232_en", "jtag_en", "4_20_pwr", "dut_rst", "gpio_en",
+                         "analog_en", "cal_load_0", "cal_load_1", "cal_load_2", "cal_load_3",
+                         "cal_load_4", "mag_0", "mag_1", "lfp_0", "lfp_1")
+    # ADC1..ADC8 in payload order
+    ADC_NAMES = ("batt_current", "dc_current", "batt_voltage", "dc_voltage", "vmdm", "sys_voltage",
+                 "4_20_ch0", "4_20_ch1")
+    LED_NAMES = ("busy", "pass", "fail")
+
+    __slots__ = ("timestamp", "version", "counter", "gpio_inputs", "gpio_outputs", "adc", "dac_1", "dac_2", "led")
+
+    def __init__(self, timestamp=0.0, version=0, counter=0, gpio_inputs=0, gpio_outputs=0, adc=(0,) * 8,
+                 dac_1=0, dac_2=0, led=0):
+        set_slot = object.__setattr__
+        set_slot(self, "timestamp", timestamp)  # host time.monotonic() at decode
+        set_slot(self, "version", version)
+        set_slot(self, "counter", counter)  # fixture update counter (wraps at 256)
+        set_slot(self, "gpio_inputs", gpio_inputs)
+        set_slot(self, "gpio_outputs", gpio_outputs)
+        set_slot(self, "adc", tuple(adc))  # raw 12 bit counts, ADC1..ADC8
+        set_slot(self, "dac_1", dac_1)
+        set_slot(self, "dac_2", dac_2)
+        set_slot(self, "led", led)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    @staticmethod
+    def output_bit(gpio):
+        """gpio_outputs bit for a JaguarFixtureGPIOOutput (GPIO_OUTPUT_DIG_IN_0 is bit 0)."""
+        return 1 << (int(gpio) - 1)
+
+    @classmethod
+    def from_payload(cls, rxPayload, timestamp=None):
+        """
+        Decode an update payload. Older firmware sends shorter payloads (no DACs/LEDs); the missing
+        bytes read as 0, as they did with the per-field int.from_bytes decoding.
+        """
+        if len(rxPayload) < cls.PAYLOAD.size:
+            rxPayload = bytes(rxPayload) + bytes(cls.PAYLOAD.size - len(rxPayload))
+        f = cls.PAYLOAD.unpack_from(rxPayload)
+        return cls(timestamp=time.monotonic() if timestamp is None else timestamp,
+                   version=f[0], counter=f[1], gpio_inputs=f[2], gpio_outputs=f[3], adc=f[4:12],
+                   dac_1=f[12], dac_2=f[13], led=f[14])
+
+    def as_dict(self):
+        d = {"timestamp": self.timestamp, "version": self.version, "counter": self.counter}
+        for name in self.GPIO_INPUT_NAMES:
+            d["gpio_input_" + name] = getattr(self, "gpio_input_" + name)
+        for name in self.GPIO_OUTPUT_NAMES:
+            d["gpio_output_" + name] = getattr(self, "gpio_output_" + name)
+        for name in self.ADC_NAMES:
+            d["adc_" + name] = getattr(self, "adc_" + name)
+        d["dac_1"] = self.dac_1
+        d["dac_2"] = self.dac_2
+        for name in self.LED_NAMES:
+            d["led_" + name] = getattr(self, "led_" + name)
+        return d
+
+    def __repr__(self):
+        return "%s(counter=%d, gpio_inputs=0x%04x, gpio_outputs=0x%06x, adc=%s, dac=(%d, %d), led=0x%02x)" % (
+            self.__class__.__name__, self.counter, self.gpio_inputs, self.gpio_outputs, self.adc,
+            self.dac_1, self.dac_2, self.led)
+
+
+def _bit_property(field, bit):
+    return property(lambda self: bool(getattr(self, field) & (1 << bit)))
+
+
+def _adc_property(index):
+    return property(lambda self: self.adc[index] / 4096 * 3.3)
+
+
+for _bit, _name in enumerate(JaguarFixtureState.GPIO_INPUT_NAMES):
+    setattr(JaguarFixtureState, "gpio_input_" + _name, _bit_property("gpio_inputs", _bit))
+for _bit, _name in enumerate(JaguarFixtureState.GPIO_OUTPUT_NAMES):
+    setattr(JaguarFixtureState, "gpio_output_" + _name, _bit_property("gpio_outputs", _bit))
+for _bit, _name in enumerate(JaguarFixtureState.LED_NAMES):
+    setattr(JaguarFixtureState, "led_" + _name, _bit_property("led", _bit))
+for _index, _name in enumerate(JaguarFixtureState.ADC_NAMES):
+    setattr(JaguarFixtureState, "adc_" + _name, _adc_property(_index))
+
+
 class JaguarFixture(object):
 
     def __init__(self, serObj=None, logger=None):
@@ -188,65 +291,16 @@ class JaguarFixture(object):
 
         # State Variables
         self.fw_version = ""
-        self.version = 0
-
-        # Input GPIOs (true = On)
-        self.gpio_input_dig_out_rtn_0 = False
-        self.gpio_input_dig_out_rtn_1 = False
-        self.gpio_input_dig_out_rtn_2 = False
-        self.gpio_input_dig_out_rtn_3 = False
-        self.gpio_input_switch_0 = False
-        self.gpio_input_switch_1 = False
-        self.gpio_input_switch_2 = False
-        self.gpio_input_switch_3 = False
-        self.gpio_input_dut_detect = False
-        self.gpio_input_lid_detect = False
-        self.gpio_input_dc_status = False
-        self.gpio_input_3v8_status = False
-        self.gpio_input_dig_out_fault = False
-
-        # Output GPIOs (true = High)
-        self.gpio_output_dig_in_0 = False
-        self.gpio_output_dig_in_1 = False
-        self.gpio_output_fixture_detect = False
-        self.gpio_output_en_3v8 = False
-        self.gpio_output_dc_en = False
-        self.gpio_output_usb_en = False
-        self.gpio_output_dig_out_pwr = False
-        self.gpio_output_rs232_en = False
-        self.gpio_output_jtag_en = False
-        self.gpio_output_4_20_pwr = False
-        self.gpio_output_dut_rst = False
-        self.gpio_output_gpio_en = False
-        self.gpio_output_analog_en = False
-        self.gpio_output_cal_load_0 = False
-        self.gpio_output_cal_load_1 = False
-        self.gpio_output_cal_load_2 = False
-        self.gpio_output_cal_load_3 = False
-        self.gpio_output_cal_load_4 = False
-        self.gpio_output_mag_0 = False
-        self.gpio_output_mag_1 = False
-        self.gpio_output_lfp_0 = False
-        self.gpio_output_lfp_1 = False
-
-        # DACs
-        self.dac_1 = 0
-        self.dac_2 = 0
-
-        # ADCs
-        self.adc_batt_current = 0
-        self.adc_dc_current = 0
-        self.adc_batt_voltage = 0
-        self.adc_dc_voltage = 0
-        self.adc_vmdm = 0
-        self.adc_sys_voltage = 0
-        self.adc_4_20_ch0 = 0
-        self.adc_4_20_ch1 = 0
-
-        # LEDs (true = On)
-        self.led_busy = False
-        self.led_pass = False
-        self.led_fail = False
+
+        # Latest fixture update, replaced (never modified) per RX_PACKET_TYPE_UPDATE
+        self.state = JaguarFixtureState()
+
+        # Signalled by rx_type_update; update_count is the number of updates received this session
+        self.update_cv = threading.Condition()
+        self.update_count = 0
+
+        # Called with each new JaguarFixtureState from the serial receive thread
+        self.update_callbacks = []
 
     def set_gpio(self, gpio, value):
         self.logger.debug("=== Setting GPIO Pin ===")
@@ -274,6 +328,48 @@ class JaguarFixture(object):
 
         return True
 
+    def set_gpios(self, outputs, leds=()):
+        """
+        Set several GPIO outputs and LEDs in one serial write; outputs is an ordered list of
+        (JaguarFixtureGPIOOutput, value), leds of (JaguarFixtureLED, value). Returns the number of
+        frames sent, or False on error (nothing is sent then).
+
+        The firmware only knows TX_PACKET_TYPE_GPIO and TX_PACKET_TYPE_LED, so this is one frame per
+        pin and LED, all in the same write. A bitmask packet type would replace the GPIO frames here
+        with a single (mask, value) frame; callers already pass the complete change set.
+        """
+        packets = []
+        mask = value_bits = 0
+        for gpio, value in outputs:
+            if (gpio == JaguarFixtureGPIOOutput.GPIO_OUTPUT_NONE) or (gpio >= JaguarFixtureGPIOOutput.GPIO_OUTPUT_MAX):
+                self.logger.error("%s - %s: Invalid argument" % (self.__class__.__name__, self.set_gpios.__name__))
+                return False
+            bit = JaguarFixtureState.output_bit(gpio)
+            mask |= bit
+            if value:
+                value_bits |= bit
+            packets.append((TXPacketType.TX_PACKET_TYPE_GPIO,
+                            int(gpio).to_bytes(4, byteorder='little') + bool(value).to_bytes(1, byteorder='little')))
+        for led, value in leds:
+            if (led == JaguarFixtureLED.LED_NONE) or (led >= JaguarFixtureLED.LED_MAX):
+                self.logger.error("%s - %s: Invalid argument" % (self.__class__.__name__, self.set_gpios.__name__))
+                return False
+            packets.append((TXPacketType.TX_PACKET_TYPE_LED,
+                            int(led).to_bytes(1, byteorder='little') + int(value).to_bytes(1, byteorder='little')))
+
+        if not packets:
+            return 0
+
+        result = self.serial_transport.transmit_packets(packets)
+        if result == False:
+            self.logger.error("%s - %s: Transmit Packet ERROR" % (self.__class__.__name__, self.set_gpios.__name__))
+            return False
+
+        self.logger.info("%s - %s: mask=0x%06x value=0x%06x leds=%d (%d frames)" % (
+            self.__class__.__name__, self.set_gpios.__name__, mask, value_bits, len(leds), len(packets)))
+
+        return len(packets)
+
     def set_dac(self, dac, value):
 
         self.logger.debug("=== Setting DAC Value ===")
@@ -357,197 +453,74 @@ class JaguarFixture(object):
         pass
 
     def rx_type_update(self, rxPayload):
-        self.logger.debug("%s - %s: %s" % (self.__class__.__name__, self.parse_payload.__name__, rxPayload.hex()))
-
-        # Version
-        self.version = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_VERSION_OFFSET:Transport.RX_PAYLOAD_COUNTER_OFFSET], byteorder='little')
-        self.counter = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_COUNTER_OFFSET:Transport.RX_PAYLOAD_GPIO_INPUTS_OFFSET], byteorder='little')
-
-        # GPIO Inputs
-        gpio_inputs = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_GPIO_INPUTS_OFFSET:Transport.RX_PAYLOAD_GPIO_OUTPUTS_OFFSET],
-            byteorder='little')
-        self.gpio_input_dig_out_rtn_0 = (bool)(gpio_inputs & (1 << 0))
-        self.gpio_input_dig_out_rtn_1 = (bool)(gpio_inputs & (1 << 1))
-        self.gpio_input_dig_out_rtn_2 = (bool)(gpio_inputs & (1 << 2))
-        self.gpio_input_dig_out_rtn_3 = (bool)(gpio_inputs & (1 << 3))
-        self.gpio_input_switch_0 = (bool)(gpio_inputs & (1 << 4))
-        self.gpio_input_switch_1 = (bool)(gpio_inputs & (1 << 5))
-        self.gpio_input_switch_2 = (bool)(gpio_inputs & (1 << 6))
-        self.gpio_input_switch_3 = (bool)(gpio_inputs & (1 << 7))
-        self.gpio_input_dut_detect = (bool)(gpio_inputs & (1 << 8))
-        self.gpio_input_lid_detect = (bool)(gpio_inputs & (1 << 9))
-        self.gpio_input_dc_status = (bool)(gpio_inputs & (1 << 10))
-        self.gpio_input_3v8_status = (bool)(gpio_inputs & (1 << 11))
-        self.gpio_input_dig_out_fault = (bool)(gpio_inputs & (1 << 12))
-
-        # GPIO Outputs
-        gpio_outputs = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_GPIO_OUTPUTS_OFFSET:Transport.RX_PAYLOAD_ADC1_OFFSET], byteorder='little')
-        self.gpio_output_dig_in_0 = (bool)(gpio_outputs & (1 << 0))
-        self.gpio_output_dig_in_1 = (bool)(gpio_outputs & (1 << 1))
-        self.gpio_output_fixture_detect = (bool)(gpio_outputs & (1 << 2))
-        self.gpio_output_en_3v8 = (bool)(gpio_outputs & (1 << 3))
-        self.gpio_output_dc_en = (bool)(gpio_outputs & (1 << 4))
-        self.gpio_output_usb_en = (bool)(gpio_outputs & (1 << 5))
-        self.gpio_output_dig_out_pwr = (bool)(gpio_outputs & (1 << 6))
-        self.gpio_output_rs232_en = (bool)(gpio_outputs & (1 << 7))
-        self.gpio_output_jtag_en = (bool)(gpio_outputs & (1 << 8))
-        self.gpio_output_4_20_pwr = (bool)(gpio_outputs & (1 << 9))
-        self.gpio_output_dut_rst = (bool)(gpio_outputs & (1 << 10))
-        self.gpio_output_gpio_en = (bool)(gpio_outputs & (1 << 11))
-        self.gpio_output_analog_en = (bool)(gpio_outputs & (1 << 12))
-        self.gpio_output_cal_load_0 = (bool)(gpio_outputs & (1 << 13))
-        self.gpio_output_cal_load_1 = (bool)(gpio_outputs & (1 << 14))
-        self.gpio_output_cal_load_2 = (bool)(gpio_outputs & (1 << 15))
-        self.gpio_output_cal_load_3 = (bool)(gpio_outputs & (1 << 16))
-        self.gpio_output_cal_load_4 = (bool)(gpio_outputs & (1 << 17))
-        self.gpio_output_mag_0 = (bool)(gpio_outputs & (1 << 18))
-        self.gpio_output_mag_1 = (bool)(gpio_outputs & (1 << 19))
-        self.gpio_output_lfp_0 = (bool)(gpio_outputs & (1 << 20))
-        self.gpio_output_lfp_1 = (bool)(gpio_outputs & (1 << 21))
-
-        # ADC - convert to pin voltage
-        self.adc_batt_current = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_ADC1_OFFSET:Transport.RX_PAYLOAD_ADC2_OFFSET],
-            byteorder='little') / 4096 * 3.3
-        self.adc_dc_current = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_ADC2_OFFSET:Transport.RX_PAYLOAD_ADC3_OFFSET],
-            byteorder='little') / 4096 * 3.3
-        self.adc_batt_voltage = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_ADC3_OFFSET:Transport.RX_PAYLOAD_ADC4_OFFSET],
-            byteorder='little') / 4096 * 3.3
-        self.adc_dc_voltage = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_ADC4_OFFSET:Transport.RX_PAYLOAD_ADC5_OFFSET],
-            byteorder='little') / 4096 * 3.3
-        self.adc_vmdm = int.from_bytes(rxPayload[Transport.RX_PAYLOAD_ADC5_OFFSET:Transport.RX_PAYLOAD_ADC6_OFFSET],
-                                       byteorder='little') / 4096 * 3.3
-        self.adc_sys_voltage = int.from_bytes(
-            rxPayload[Transport.RX_PAYLOAD_ADC6_OFFSET:Transport.RX_PAYLOAD_ADC7_OFFSET],
-            byteorder='little') / 4096 * 3.3
-        self.adc_4_20_ch0 = int.from_bytes(rxPayload[Transport.RX_PAYLOAD_ADC7_OFFSET:Transport.RX_PAYLOAD_ADC8_OFFSET],
-                                           byteorder='little') / 4096 * 3.3
-        self.adc_4_20_ch1 = int.from_bytes(rxPayload[Transport.RX_PAYLOAD_ADC8_OFFSET:Transport.RX_PAYLOAD_DAC1_OFFSET],
-                                           byteorder='little') / 4096 * 3.3
-
-        # DACs
-        self.dac_1 = int.from_bytes(rxPayload[Transport.RX_PAYLOAD_DAC1_OFFSET:Transport.RX_PAYLOAD_DAC2_OFFSET],
-                                    byteorder='little')
-        self.dac_2 = int.from_bytes(rxPayload[Transport.RX_PAYLOAD_DAC2_OFFSET:Transport.RX_PAYLOAD_LED_OFFSET],
-                                    byteorder='little')
-
-        # LEDs
-        led = int.from_bytes(rxPayload[Transport.RX_PAYLOAD_LED_OFFSET:Transport.RX_PAYLOAD_LED_OFFSET + 1],
-                             byteorder='little')
-        self.led_busy = (bool)(led & (1 << 0))
-        self.led_pass = (bool)(led & (1 << 1))
-        self.led_fail = (bool)(led & (1 << 2))
-        self.print_state()
-
-    def print_state(self):
-
-        self.logger.info("%s - %s: Version                      | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.version))
-
-        self.logger.info("%s - %s: gpio_input_dig_out_rtn_0     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_dig_out_rtn_0))
-        self.logger.info("%s - %s: gpio_input_dig_out_rtn_1     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_dig_out_rtn_1))
-        self.logger.info("%s - %s: gpio_input_dig_out_rtn_2     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_dig_out_rtn_2))
-        self.logger.info("%s - %s: gpio_input_dig_out_rtn_3     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_dig_out_rtn_3))
-        self.logger.info("%s - %s: gpio_input_switch_0          | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_switch_0))
-        self.logger.info("%s - %s: gpio_input_switch_1          | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_switch_1))
-        self.logger.info("%s - %s: gpio_input_switch_2          | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_switch_2))
-        self.logger.info("%s - %s: gpio_input_switch_3          | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_switch_3))
-        self.logger.info("%s - %s: gpio_input_dut_detect        | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_dut_detect))
-        self.logger.info("%s - %s: gpio_input_lid_detect        | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_lid_detect))
-        self.logger.info("%s - %s: gpio_input_dc_status         | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_dc_status))
-        self.logger.info("%s - %s: gpio_input_3v8_status        | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_3v8_status))
-        self.logger.info("%s - %s: gpio_input_dig_out_fault     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_input_dig_out_fault))
-
-        self.logger.info("%s - %s: gpio_output_dig_in_0         | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_dig_in_0))
-        self.logger.info("%s - %s: gpio_output_dig_in_1         | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_dig_in_1))
-        self.logger.info("%s - %s: gpio_output_fixture_detect   | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_fixture_detect))
-        self.logger.info("%s - %s: gpio_output_en_3v8           | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_en_3v8))
-        self.logger.info("%s - %s: gpio_output_dc_en            | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_dc_en))
-        self.logger.info("%s - %s: gpio_output_usb_en           | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_usb_en))
-        self.logger.info("%s - %s: gpio_output_dig_out_pwr      | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_dig_out_pwr))
-        self.logger.info("%s - %s: gpio_output_rs232_en         | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_rs232_en))
-        self.logger.info("%s - %s: gpio_output_jtag_en          | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_jtag_en))
-        self.logger.info("%s - %s: gpio_output_4_20_pwr         | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_4_20_pwr))
-        self.logger.info("%s - %s: gpio_output_dut_rst          | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_dut_rst))
-        self.logger.info("%s - %s: gpio_output_gpio_en          | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_gpio_en))
-        self.logger.info("%s - %s: gpio_output_analog_en        | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_analog_en))
-        self.logger.info("%s - %s: gpio_output_cal_load_0       | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_cal_load_0))
-        self.logger.info("%s - %s: gpio_output_cal_load_1       | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_cal_load_1))
-        self.logger.info("%s - %s: gpio_output_cal_load_2       | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_cal_load_2))
-        self.logger.info("%s - %s: gpio_output_cal_load_3       | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_cal_load_3))
-        self.logger.info("%s - %s: gpio_output_cal_load_4       | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_cal_load_4))
-        self.logger.info("%s - %s: gpio_output_mag_0            | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_mag_0))
-        self.logger.info("%s - %s: gpio_output_mag_1            | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_mag_1))
-        self.logger.info("%s - %s: gpio_output_lfp_0            | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_lfp_0))
-        self.logger.info("%s - %s: gpio_output_lfp_1            | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.gpio_output_lfp_1))
-
-        self.logger.info("%s - %s: adc_batt_current             | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_batt_current))
-        self.logger.info("%s - %s: adc_dc_current               | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_dc_current))
-        self.logger.info("%s - %s: adc_batt_voltage             | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_batt_voltage))
-        self.logger.info("%s - %s: adc_dc_voltage               | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_dc_voltage))
-        self.logger.info("%s - %s: adc_vmdm                     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_vmdm))
-        self.logger.info("%s - %s: adc_sys_voltage              | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_sys_voltage))
-        self.logger.info("%s - %s: adc_4_20_ch0                 | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_4_20_ch0))
-        self.logger.info("%s - %s: adc_4_20_ch1                 | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.adc_4_20_ch1))
-
-        self.logger.info("%s - %s: dac_1                        | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.dac_1))
-        self.logger.info("%s - %s: dac_2                        | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.dac_2))
-
-        self.logger.info("%s - %s: led_busy                     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.led_busy))
-        self.logger.info("%s - %s: led_pass                     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.led_pass))
-        self.logger.info("%s - %s: led_fail                     | %d" % (
-        self.__class__.__name__, self.print_state.__name__, self.led_fail))
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("%s - %s: %s" % (self.__class__.__name__, self.rx_type_update.__name__, rxPayload.hex()))
+
+        state = JaguarFixtureState.from_payload(rxPayload)
+        with self.update_cv:
+            # Single reference swap: readers see either the previous or the new update, never a mix
+            self.state = state
+            self.update_count += 1
+            self.update_cv.notify_all()
+
+        for callback in self.update_callbacks:
+            try:
+                callback(state)
+            except Exception:
+                self.logger.exception("%s - %s: Update callback failed" % (
+                    self.__class__.__name__, self.rx_type_update.__name__))
+
+    def wait_for_update(self, after_counter=None, timeout=1.0):
+        """
+        Wait for an update newer than after_counter (an update_count value; default: now).
+        Returns the new JaguarFixtureState, or None on timeout.
+        """
+        with self.update_cv:
+            if after_counter is None:
+                after_counter = self.update_count
+            if not self.update_cv.wait_for(lambda: self.update_count > after_counter, timeout):
+                return None
+            return self.state
+
+    def wait_for_outputs(self, mask, value=None, timeout=1.0):
+        """
+        Wait for an update received after this call whose echoed gpio_outputs match value on the
+        bits in mask (value defaults to mask, i.e. all high). Returns that JaguarFixtureState, or
+        None on timeout.
+        """
+        if value is None:
+            value = mask
+        with self.update_cv:
+            after_counter = self.update_count
+            if not self.update_cv.wait_for(
+                    lambda: self.update_count > after_counter and (self.state.gpio_outputs & mask) == (value & mask),
+                    timeout):
+                self.logger.warning("%s - %s: Timeout, mask=0x%06x value=0x%06x outputs=0x%06x" % (
+                    self.__class__.__name__, self.wait_for_outputs.__name__, mask, value & mask,
+                    self.state.gpio_outputs))
+                return None
+            return self.state
+
+    def add_update_callback(self, callback):
+        if callback not in self.update_callbacks:
+            self.update_callbacks.append(callback)
+
+    def remove_update_callback(self, callback):
+        if callback in self.update_callbacks:
+            self.update_callbacks.remove(callback)
+
+    def __getattr__(self, name):
+        # Legacy attribute access (self.session.adc_sys_voltage, gpio_input_lid_detect, ...) reads the
+        # latest snapshot. Only called for names not found on the instance itself.
+        if name == "state":
+            raise AttributeError(name)
+        return getattr(self.state, name)
+
+    def print_state(self, level=logging.DEBUG):
+        """
+        Dump the latest fixture update to the log (on demand; not called per packet).
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        lines = ["%-28s | %s" % (k, v) for k, v in self.state.as_dict().items()]
+        self.logger.log(level, "%s - %s:\n%s" % (self.__class__.__name__, self.print_state.__name__, "\n".join(lines)))
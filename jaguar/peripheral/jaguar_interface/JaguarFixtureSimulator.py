@@ -0,0 +1,339 @@
+# Imports
+import logging
+import os
+import sys
+import math
+import time
+import random
+import select
+import struct
+import argparse
+
+from .SerialTransport import *
+from .StoppableThread import StoppableThread
+from .JaguarFixture import JaguarFixtureGPIOOutput, JaguarFixtureState
+
+
+# Class to emulate the Jaguar interface board on a pseudo-terminal
+class JaguarFixtureSimulator(StoppableThread):
+    """
+    Virtual Jaguar fixture. Opens a pty, decodes GPIO/DAC/LED/VERSION/TEST packets written to it and
+    sends RX_PACKET_TYPE_UPDATE packets at update_rate with the current outputs, a counter and ADC
+    readings from a simple rail model:
+
+      * DC_EN on           -> DC input at dc_voltage, VSYS towards vsys_dc
+      * battery enabled    -> battery at battery_voltage, VSYS towards vsys_battery
+                              (EN_3V8 is active low on the rig, see JaguarInterfaceLL.battery_power_en)
+      * VSYS/VMDM settle first-order with time constant tau, the DUT draws load_current once VSYS
+        exceeds 2.5 V, and every ADC channel gets gaussian noise (pin volts).
+
+    Noise and fault injection (drop_rate) use a seeded RNG. With realtime=False no thread runs and
+    the caller advances the model with tick(), which makes packet timing fully reproducible.
+
+    Point the software at it with JaguarInterface(port=sim.port) or JAGUAR_FIXTURE_PORT=<port>.
+    """
+
+    BIT_DC_EN = JaguarFixtureState.output_bit(JaguarFixtureGPIOOutput.GPIO_OUTPUT_DC_EN)
+    BIT_EN_3V8 = JaguarFixtureState.output_bit(JaguarFixtureGPIOOutput.GPIO_OUTPUT_EN_3V8)
+
+    # gpio_inputs bits (JaguarFixtureState.GPIO_INPUT_NAMES order)
+    INPUT_SWITCH_0 = 4
+    INPUT_LID_DETECT = 9
+
+    # Battery current ranges as decoded by JaguarInterfaceLL.battery_current, most sensitive first:
+    # (range switch input bit or None, divider, gain, offset)
+    BATTERY_CURRENT_RANGES = (
+        (None, 100000, 0.687, 620e-9),
+        (0, 10000, 0.6864, 0.0),
+        (1, 1000, 0.68, 0.0),
+        (2, 100, 0.69, 0.0),
+        (3, 100, 0.0797, 0.0),
+    )
+
+    def __init__(self, update_rate=100.0, tau=0.02, noise=0.002, seed=0, dc_voltage=12.0, battery_voltage=3.6,
+                 vsys_dc=3.5, vsys_battery=3.5, vmdm=3.8, load_current=0.01, dut_present=True, drop_rate=0.0,
+                 fw_version=b"SIM-1.0", realtime=True, logger=None):
+
+        super(JaguarFixtureSimulator, self).__init__(daemon=True)
+
+        # Handle self.logger argument defaulting
+        if logger is None:
+            self.logger = logging.getLogger(self.__class__.__name__)
+        elif not hasattr(logger, "getChild"):
+            self.logger = logger
+        else:
+            self.logger = logger.getChild(self.__class__.__name__)
+
+        # Model parameters (may be changed while running, e.g. load_current for a sleep test)
+        self.update_rate = update_rate
+        self.tau = tau
+        self.noise = noise
+        self.dc_voltage = dc_voltage
+        self.battery_voltage = battery_voltage
+        self.vsys_dc = vsys_dc
+        self.vsys_battery = vsys_battery
+        self.vmdm = vmdm
+        self.load_current = load_current
+        self.dut_present = dut_present
+        self.drop_rate = drop_rate
+        self.fw_version = fw_version
+        self.realtime = realtime
+        self.rng = random.Random(seed)
+
+        # Fixture state
+        self.gpio_outputs = 0
+        self.gpio_inputs_extra = 0
+        self.dac = [0, 0]
+        self.led = 0
+        self.counter = 0
+        self.vsys = 0.0
+        self.v_mdm = 0.0
+        self.sim_time = 0.0
+
+        # Statistics
+        self.rx_packets = 0
+        self.tx_updates = 0
+        self.tx_dropped = 0
+
+        self.parser = FrameParser(min_type=TXPacketType.TX_PACKET_TYPE_TEST, max_type=TXPacketType.TX_PACKET_TYPE_MAX)
+        self.rx_map = {
+            TXPacketType.TX_PACKET_TYPE_TEST: self.tx_type_test,
+            TXPacketType.TX_PACKET_TYPE_GPIO: self.tx_type_gpio,
+            TXPacketType.TX_PACKET_TYPE_DAC: self.tx_type_dac,
+            TXPacketType.TX_PACKET_TYPE_LED: self.tx_type_led,
+            TXPacketType.TX_PACKET_TYPE_VERSION: self.tx_type_version,
+        }
+
+        # Raw pty so the line discipline never touches the binary stream
+        self.master, self.slave = os.openpty()
+        try:
+            import tty
+            tty.setraw(self.slave)
+        except ImportError:
+            pass
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+
+        if self.realtime:
+            self.start()
+
+    def close(self):
+        if self.is_alive():
+            self.stop()
+            self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    # ---------- rail model ----------
+
+    def battery_enabled(self):
+        return not (self.gpio_outputs & self.BIT_EN_3V8)
+
+    def dc_enabled(self):
+        return bool(self.gpio_outputs & self.BIT_DC_EN)
+
+    def step(self, dt):
+        """
+        Advance the rail model by dt seconds.
+        """
+        self.sim_time += dt
+        if self.dc_enabled():
+            target = self.vsys_dc
+        elif self.battery_enabled():
+            target = self.vsys_battery
+        else:
+            target = 0.0
+        k = 1.0 - math.exp(-dt / self.tau) if self.tau > 0 else 1.0
+        self.vsys += (target - self.vsys) * k
+        self.v_mdm += ((self.vmdm if target else 0.0) - self.v_mdm) * k
+
+    def _pin(self, volts):
+        # Pin voltage -> 12 bit ADC counts with noise
+        volts += self.rng.gauss(0.0, self.noise) if self.noise else 0.0
+        return max(0, min(4095, int(round(volts / 3.3 * 4096))))
+
+    def update_payload(self):
+        load = self.load_current if self.vsys > 2.5 else 0.0
+        dc_on = self.dc_enabled()
+        bat_on = self.battery_enabled() and not dc_on
+        v_bat = self.battery_voltage if self.battery_enabled() else 0.0
+
+        # Battery current: most sensitive range that keeps the shunt amplifier below 3.0 V
+        i_bat = load if bat_on else 0.0
+        switches = 0
+        adc_batt_current = 0.0
+        if v_bat > 0:
+            for bit, divider, gain, offset in self.BATTERY_CURRENT_RANGES:
+                adc_batt_current = (i_bat + offset) * gain / (v_bat / divider)
+                switches = 0 if bit is None else (1 << (self.INPUT_SWITCH_0 + bit))
+                if adc_batt_current <= 3.0:
+                    break
+
+        gpio_inputs = switches | self.gpio_inputs_extra
+        if not self.dut_present:
+            gpio_inputs |= 1 << self.INPUT_LID_DETECT
+
+        adc = (
+            self._pin(adc_batt_current),
+            self._pin((load if dc_on else 0.0) * 0.15 * 20 + 0.002),
+            self._pin(v_bat / 11),
+            self._pin((self.dc_voltage if dc_on else 0.0) / 11),
+            self._pin(self.v_mdm / 3.1),
+            self._pin(self.vsys / 3.1),
+            self._pin(0.0),
+            self._pin(0.0),
+        )
+        self.counter = (self.counter + 1) & 0xFF
+        return JaguarFixtureState.PAYLOAD.pack(1, self.counter, gpio_inputs, self.gpio_outputs, *adc,
+                                               self.dac[0], self.dac[1], self.led)
+
+    # ---------- protocol ----------
+
+    def send(self, packetType, payload):
+        packet = Transport.PACKET_HEADER.pack(Transport.PACKET_DELIMITER, len(payload), packetType,
+                                              crc16_ccitt(payload)) + payload
+        try:
+            os.write(self.master, packet)
+            return True
+        except (BlockingIOError, OSError):
+            # Nobody reading the slave side; behave like a UART with no listener
+            return False
+
+    def receive(self):
+        """
+        Decode and apply everything the host has written so far.
+        """
+        while True:
+            try:
+                data = os.read(self.master, 4096)
+            except (BlockingIOError, OSError):
+                return
+            if not data:
+                return
+            for packetType, payload in self.parser.feed(data):
+                self.rx_packets += 1
+                self.rx_map[packetType](payload)
+
+    def tick(self, dt=None):
+        """
+        One update period: apply host packets, advance the model and send an UPDATE packet.
+        """
+        self.receive()
+        self.step(dt if dt is not None else 1.0 / self.update_rate)
+        payload = self.update_payload()
+        if self.drop_rate and self.rng.random() < self.drop_rate:
+            self.tx_dropped += 1
+            return
+        if self.send(RXPacketType.RX_PACKET_TYPE_UPDATE, payload):
+            self.tx_updates += 1
+        else:
+            self.tx_dropped += 1
+
+    def tx_type_test(self, payload):
+        self.send(RXPacketType.RX_PACKET_TYPE_TEST, payload)
+
+    def tx_type_gpio(self, payload):
+        gpio, value = struct.unpack_from("<IB", payload)
+        bit = JaguarFixtureState.output_bit(gpio)
+        if value:
+            self.gpio_outputs |= bit
+        else:
+            self.gpio_outputs &= ~bit
+
+    def tx_type_dac(self, payload):
+        dac, value = struct.unpack_from("<BI", payload)
+        if 1 <= dac <= 2:
+            self.dac[dac - 1] = value
+
+    def tx_type_led(self, payload):
+        led, value = struct.unpack_from("<BB", payload)
+        if value:
+            self.led |= 1 << (led - 1)
+        else:
+            self.led &= ~(1 << (led - 1))
+
+    def tx_type_version(self, payload):
+        self.send(RXPacketType.RX_PACKET_TYPE_VERSION, self.fw_version)
+
+    # ---------- thread ----------
+
+    def run(self):
+        period = 1.0 / self.update_rate
+        next_tick = time.monotonic()
+        while not self.stopped():
+            now = time.monotonic()
+            if now >= next_tick:
+                self.tick(period)
+                next_tick += period
+                if next_tick < now:
+                    # Fell behind (debugger, loaded box): skip rather than burst
+                    next_tick = now + period
+                continue
+            # Apply host packets as they arrive, between updates
+            readable, _, _ = select.select([self.master], [], [], next_tick - now)
+            if readable:
+                self.receive()
+
+    def stats(self):
+        return {"rx_packets": self.rx_packets, "tx_updates": self.tx_updates, "tx_dropped": self.tx_dropped,
+                "parser": {"frames": self.parser.frames, "crc_errors": self.parser.crc_errors,
+                           "header_errors": self.parser.header_errors, "discarded": self.parser.discarded}}
+
+
+def benchmark(sim, seconds):
+    """
+    Run a JaguarFixtureSession against the simulator and report transport throughput and CPU cost.
+    """
+    from .JaguarFixtureSession import JaguarFixtureSession
+
+    session = JaguarFixtureSession(sim.port)
+    fx = session.jaguarFixture
+    count0 = fx.update_count
+    cpu0, t0 = time.process_time(), time.monotonic()
+    time.sleep(seconds)
+    cpu1, t1 = time.process_time(), time.monotonic()
+    updates = fx.update_count - count0
+    serial_stats = session.jaguarCom.stats()
+    session.close()
+    print("updates received: %d in %.2fs (%.0f/s, simulator sent %d)" % (updates, t1 - t0, updates / (t1 - t0),
+                                                                           sim.tx_updates))
+    print("process CPU, simulator included: %.3fs (%.1f%%, %.1f us/update)" % (cpu1 - cpu0, 100 * (cpu1 - cpu0) / (t1 - t0),
+                                                            1e6 * (cpu1 - cpu0) / max(1, updates)))
+    print("serial: %s" % serial_stats)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.INFO,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Virtual Jaguar fixture on a pseudo-terminal")
+    parser.add_argument('-r', '--rate', type=float, default=100.0, help="UPDATE packets per second")
+    parser.add_argument('--tau', type=float, default=0.02, help="rail settling time constant (s)")
+    parser.add_argument('--noise', type=float, default=0.002, help="ADC noise sigma (pin volts)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--drop', type=float, default=0.0, help="fraction of UPDATE packets to drop")
+    parser.add_argument('--link', help="also expose the pty under this path (symlink)")
+    parser.add_argument('--benchmark', type=float, metavar="SECONDS",
+                        help="connect a JaguarFixtureSession, report throughput/CPU and exit")
+    args = parser.parse_args()
+
+    sim = JaguarFixtureSimulator(update_rate=args.rate, tau=args.tau, noise=args.noise, seed=args.seed,
+                                 drop_rate=args.drop)
+    if args.link:
+        if os.path.lexists(args.link):
+            os.remove(args.link)
+        os.symlink(sim.port, args.link)
+
+    if args.benchmark:
+        benchmark(sim, args.benchmark)
+        sim.close()
+        sys.exit()
+
+    logging.info("Simulated fixture on %s%s (JAGUAR_FIXTURE_PORT=%s)" % (
+        sim.port, " -> %s" % args.link if args.link else "", args.link or sim.port))
+    try:
+        while True:
+            time.sleep(5)
+            logging.info("%s" % sim.stats())
+    except KeyboardInterrupt:
+        sim.close()
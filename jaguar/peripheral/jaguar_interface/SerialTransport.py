@@ -5,7 +5,7 @@ import threading
 import time
 import traceback
 import binascii
-from PyCRC.CRCCCITT import CRCCCITT
+import struct
 
 
 class RXPacketType(enum.IntEnum):
@@ -44,13 +44,11 @@ class TXPacketType(enum.IntEnum):
     TX_PACKET_TYPE_MAX = 6
 
 
-class RXPacketState(enum.IntEnum):
-    PACKET_STATE_WAIT_FOR_SOF = 1
-    PACKET_STATE_WAIT_FOR_DELIMITER = 2
-    PACKET_STATE_WAIT_FOR_LENGTH = 3
-    PACKET_STATE_WAIT_FOR_PACKET_TYPE = 4
-    PACKET_STATE_WAIT_FOR_CRC = 5
-    PACKET_STATE_WAIT_FOR_PAYLOAD = 6
+def crc16_ccitt(data, crc=0xFFFF):
+    """
+    CRC-16/CCITT (poly 0x1021, init 0xFFFF), same as PyCRC CRCCCITT(version="FFFF"), computed in C.
+    """
+    return binascii.crc_hqx(data, crc)
 
 
 class Transport(object):
@@ -65,6 +63,10 @@ class Transport(object):
     MAX_PACKET_LEN = 0xFF
     PACKET_SOF = 0x78
     PACKET_DELIMITER = 0x12345678
+    PACKET_DELIMITER_BYTES = PACKET_DELIMITER.to_bytes(4, byteorder='little')  # starts with PACKET_SOF
+
+    # [delimiter uint32][length uint8][packet-type uint8][crc uint16], little endian
+    PACKET_HEADER = struct.Struct("<IBBH")
 
     # RX Packet Offsets
     RX_PAYLOAD_VERSION_OFFSET = 0  # uint8_t  1 bytes
@@ -88,6 +90,79 @@ class Transport(object):
     RX_PAYLOAD_LED_OFFSET = 32  # uint8_t   1 byte
 
 
+class FrameParser(Transport):
+    """
+    Incremental frame parser.
+
+    Bytes are appended to a bytearray; each feed() extracts every complete, CRC-valid frame in the
+    buffer and returns them as a list of (packetType, payload) tuples. Anything that is not a valid
+    frame is skipped by searching for the next delimiter, so the parser resyncs after garbage,
+    truncated frames and CRC errors without losing the frames that follow.
+    """
+
+    def __init__(self, min_type=RXPacketType.RX_PACKET_TYPE_NONE + 1, max_type=RXPacketType.RX_PACKET_TYPE_MAX):
+        # valid packet types are min_type <= type < max_type
+        self.min_type = int(min_type)
+        self.max_type = int(max_type)
+        self.max_payload = self.MAX_PACKET_LEN - self.PACKET_LEN_HEADER
+        self.buf = bytearray()
+
+        # Statistics
+        self.frames = 0
+        self.crc_errors = 0
+        self.header_errors = 0
+        self.discarded = 0
+
+    def reset(self):
+        self.buf.clear()
+
+    def feed(self, data):
+        buf = self.buf
+        buf += data
+        frames = []
+        pos = 0
+        end_of_buf = len(buf)
+
+        while True:
+            start = buf.find(self.PACKET_DELIMITER_BYTES, pos)
+            if start < 0:
+                # keep a possible partial delimiter at the end of the buffer
+                keep = max(pos, end_of_buf - (len(self.PACKET_DELIMITER_BYTES) - 1))
+                self.discarded += keep - pos
+                pos = keep
+                break
+
+            self.discarded += start - pos
+            pos = start
+            if end_of_buf - pos < self.PACKET_LEN_HEADER:
+                break
+
+            _, length, packetType, packetCRC = self.PACKET_HEADER.unpack_from(buf, pos)
+            if not (0 < length <= self.max_payload) or not (self.min_type <= packetType < self.max_type):
+                # not a real header, look for the next delimiter
+                self.header_errors += 1
+                pos += 1
+                continue
+
+            frame_end = pos + self.PACKET_LEN_HEADER + length
+            if frame_end > end_of_buf:
+                # wait for the rest of the frame
+                break
+
+            payload = bytes(buf[pos + self.PACKET_PAYLOAD_OFFSET:frame_end])
+            if crc16_ccitt(payload) != packetCRC:
+                self.crc_errors += 1
+                pos += 1
+                continue
+
+            frames.append((packetType, payload))
+            self.frames += 1
+            pos = frame_end
+
+        del buf[:pos]
+        return frames
+
+
 class SerialTransport(Transport):
 
     def __init__(self, serObj=None, rx_callback=None, logger=None):
@@ -111,9 +186,7 @@ class SerialTransport(Transport):
 
         # Set up variables
         self.cv = threading.Condition()
-        self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_SOF
-        self.packet_rx_len = 0
-        self.packet_rx_buf = bytes()
+        self.parser = FrameParser()
 
     def generate_header(self, packetType, bytePayload):
 
@@ -127,13 +200,8 @@ class SerialTransport(Transport):
         # [crc]                         - uint16_t, 2 bytes
         # [payload]                     - sequence of data bytes, number == [length]
 
-        # Generate hex strings for different components of header
-        strDelimiter = self.PACKET_DELIMITER.to_bytes(4, byteorder='little')
-        strLength = len(bytePayload).to_bytes(1, byteorder='little')
-        strType = packetType.to_bytes(1, byteorder='little')
-        strCRC = (CRCCCITT(version="FFFF").calculate(bytePayload)).to_bytes(2, byteorder='little')
-
-        strHeader = strDelimiter + strLength + strType + strCRC
+        strHeader = self.PACKET_HEADER.pack(self.PACKET_DELIMITER, len(bytePayload), packetType,
+                                            crc16_ccitt(bytePayload))
         self.logger.debug(
             "%s - %s: header = %s" % (self.__class__.__name__, self.generate_header.__name__, strHeader.hex()))
 
@@ -146,11 +214,11 @@ class SerialTransport(Transport):
 
         # Check arguments
         if (packetType == TXPacketType.TX_PACKET_TYPE_NONE) or (packetType >= TXPacketType.TX_PACKET_TYPE_MAX):
-            logger.error("%s - %s: Packet type ERROR" % (self.__class__.__name__, self.transmit_packet.__name__))
+            self.logger.error("%s - %s: Packet type ERROR" % (self.__class__.__name__, self.transmit_packet.__name__))
             return False
 
         if (len(bytePayload) >= self.MAX_PACKET_LEN):
-            logger.error("%s - %s: Payload length ERROR" % (self.__class__.__name__, self.transmit_packet.__name__))
+            self.logger.error("%s - %s: Payload length ERROR" % (self.__class__.__name__, self.transmit_packet.__name__))
             return False
 
         # Generate the packet
@@ -162,89 +230,45 @@ class SerialTransport(Transport):
 
         return True
 
+    def transmit_packets(self, packets):
+        """
+        Send several (packetType, bytePayload) frames back to back in a single serial write.
+        """
+        txPackets = bytearray()
+        for packetType, bytePayload in packets:
+            if (packetType == TXPacketType.TX_PACKET_TYPE_NONE) or (packetType >= TXPacketType.TX_PACKET_TYPE_MAX):
+                self.logger.error("%s - %s: Packet type ERROR" % (self.__class__.__name__, self.transmit_packets.__name__))
+                return False
+
+            if (len(bytePayload) >= self.MAX_PACKET_LEN):
+                self.logger.error("%s - %s: Payload length ERROR" % (self.__class__.__name__, self.transmit_packets.__name__))
+                return False
+
+            txPackets += self.generate_header(packetType, bytePayload)
+            txPackets += bytePayload
+
+        if not txPackets:
+            return True
+
+        self.logger.info("%s - %s: %d packets, txPackets = %s" % (
+            self.__class__.__name__, self.transmit_packets.__name__, len(packets), bytes(txPackets)))
+        self.serObj.write(bytes(txPackets))
+
+        return True
+
     def receive_cb(self, data):
 
         self.logger.debug("%s - %s: data = %s" % (self.__class__.__name__, self.receive_cb.__name__, data.hex()))
 
-        # Move data to local buffer
-        self.packet_rx_buf += data
-        self.packet_rx_len += len(data)
-
-        if self.packet_state == RXPacketState.PACKET_STATE_WAIT_FOR_SOF:
-            self.packetType = RXPacketType.RX_PACKET_TYPE_NONE
-            if (self.packet_rx_len >= 1):
-
-                packetSOF = self.packet_rx_buf[0]
-
-                if (packetSOF == self.PACKET_SOF):
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_DELIMITER
-                else:
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_SOF
-                    self.packet_rx_buf = bytes()
-                    self.packet_rx_len = 0
-
-        if self.packet_state == RXPacketState.PACKET_STATE_WAIT_FOR_DELIMITER:
-            if (self.packet_rx_len >= 4):
-
-                packetDelimiter = (self.packet_rx_buf[3] << 24) | (self.packet_rx_buf[2] << 16) | (
-                            self.packet_rx_buf[1] << 8) | self.packet_rx_buf[0]
-
-                if (packetDelimiter == self.PACKET_DELIMITER):
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_LENGTH
-                else:
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_SOF
-                    self.packet_rx_buf = bytes()
-                    self.packet_rx_len = 0
-
-        if self.packet_state == RXPacketState.PACKET_STATE_WAIT_FOR_LENGTH:
-            if (self.packet_rx_len >= 5):
-
-                packetLength = self.packet_rx_buf[4]
-
-                if (packetLength > 0 and packetLength <= (self.MAX_PACKET_LEN - self.PACKET_LEN_HEADER)):
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_PACKET_TYPE
-                else:
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_SOF
-                    self.packet_rx_buf = bytes()
-                    self.packet_rx_len = 0
-
-        if self.packet_state == RXPacketState.PACKET_STATE_WAIT_FOR_PACKET_TYPE:
-            if (self.packet_rx_len >= 6):
-
-                self.packetType = self.packet_rx_buf[5]
-
-                if (
-                        self.packetType > RXPacketType.RX_PACKET_TYPE_NONE and self.packetType < RXPacketType.RX_PACKET_TYPE_MAX):
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_CRC
-                else:
-                    self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_SOF
-                    self.packet_rx_buf = bytes()
-                    self.packet_rx_len = 0
-
-        if self.packet_state == RXPacketState.PACKET_STATE_WAIT_FOR_CRC:
-            if (self.packet_rx_len >= 8):
-                self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_PAYLOAD
-
-        if self.packet_state == RXPacketState.PACKET_STATE_WAIT_FOR_PAYLOAD:
-            packetLength = self.packet_rx_buf[4]
-
-            if (self.packet_rx_len >= (self.PACKET_LEN_HEADER + packetLength)):
-
-                result = self.decode_header(self.packet_rx_buf)
-                if result == True:
-                    # If required, use self.PACKET_type to determine next method call
-                    # Fire RX callback to update Jaguar Fixture instance
-                    try:
-                        self.rx_callback(self.packetType, self.packet_rx_buf[self.PACKET_PAYLOAD_OFFSET:])
-                    except:
-                        exc_type, exc_value, exc_trace = sys.exc_info()
-                        self.logger.error("%s: Exception %s %s Traceback : %s" % (
-                        self.__class__.__name__, exc_type, exc_value, repr(traceback.extract_tb(exc_trace))))
-
-                # Reset state to receive next packet
-                self.packet_state = RXPacketState.PACKET_STATE_WAIT_FOR_SOF
-                self.packet_rx_buf = bytes()
-                self.packet_rx_len = 0
+        for packetType, payload in self.parser.feed(data):
+            # If required, use packetType to determine next method call
+            # Fire RX callback to update Jaguar Fixture instance
+            try:
+                self.rx_callback(packetType, payload)
+            except:
+                exc_type, exc_value, exc_trace = sys.exc_info()
+                self.logger.error("%s: Exception %s %s Traceback : %s" % (
+                self.__class__.__name__, exc_type, exc_value, repr(traceback.extract_tb(exc_trace))))
 
         with self.cv:
             self.cv.notify_all()
@@ -253,7 +277,6 @@ class SerialTransport(Transport):
 
         self.logger.debug("%s - %s: rxPacket = %s, rxPacket length = %d" % (
         self.__class__.__name__, self.decode_header.__name__, rxPacket.hex(), len(rxPacket)))
-        # print(binascii.hexlify(rxPacket))
         # Validate that we received a full header
         if len(rxPacket) < self.PACKET_PAYLOAD_OFFSET:
             self.logger.error("%s - %s: Header length ERROR" % (self.__class__.__name__, self.decode_header.__name__))
@@ -266,10 +289,7 @@ class SerialTransport(Transport):
         # [crc]                         - uint16_t, 2 bytes
         # [payload]                     - sequence of data bytes, number == [length]
 
-        packetDelimiter = (rxPacket[3] << 24) | (rxPacket[2] << 16) | (rxPacket[1] << 8) | rxPacket[0]
-        packetLength = rxPacket[4]
-        packetType = rxPacket[5]
-        packetCRC = (rxPacket[7] << 8) | rxPacket[6]
+        packetDelimiter, packetLength, packetType, packetCRC = self.PACKET_HEADER.unpack_from(rxPacket, 0)
         packetPayload = rxPacket[self.PACKET_PAYLOAD_OFFSET:]
 
         # Validate delimiter, length, packet type and CRC
@@ -278,8 +298,7 @@ class SerialTransport(Transport):
             return False
 
         expectLen = len(packetPayload)
-        if (packetLength != expectLen) or (packetLength < 0) or (
-                packetLength > (self.MAX_PACKET_LEN - self.PACKET_LEN_HEADER)):
+        if (packetLength != expectLen) or (packetLength > (self.MAX_PACKET_LEN - self.PACKET_LEN_HEADER)):
             self.logger.error(
                 "%s - %s: Frame payload length ERROR" % (self.__class__.__name__, self.decode_header.__name__))
             return False
@@ -288,8 +307,7 @@ class SerialTransport(Transport):
             self.logger.error("%s - %s: Frame type ERROR" % (self.__class__.__name__, self.decode_header.__name__))
             return False
 
-        expectCrc = CRCCCITT(version="FFFF").calculate(packetPayload)
-        if (packetCRC != expectCrc):
+        if (packetCRC != crc16_ccitt(packetPayload)):
             self.logger.error("%s - %s: Frame CRC ERROR" % (self.__class__.__name__, self.decode_header.__name__))
             return False
 
@@ -0,0 +1,159 @@
+# Imports
+import logging
+import threading
+import time
+
+import numpy as np
+
+
+class TelemetryWindow(object):
+    """
+    A slice of fixture telemetry: one row per update packet, oldest first.
+
+    Channel arrays are copies and safe to keep after the buffer moves on. The statistics
+    helpers return None for an empty window instead of NaN.
+    """
+
+    def __init__(self, channels, timestamp, counter, data):
+        self.channels = tuple(channels)
+        self.timestamp = timestamp  # host time.monotonic() per packet
+        self.counter = counter  # fixture update counter (wraps at 256)
+        self.data = data  # shape (n, len(channels))
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, channel):
+        return self.data[:, self.channels.index(channel)]
+
+    @property
+    def duration(self):
+        if len(self) < 2:
+            return 0.0
+        return float(self.timestamp[-1] - self.timestamp[0])
+
+    def missed(self):
+        """Number of update packets lost inside the window, from gaps in the fixture counter."""
+        if len(self) < 2:
+            return 0
+        return int(np.sum((np.diff(self.counter.astype(np.int16)) - 1) % 256))
+
+    def _reduce(self, fn, channel, *args):
+        if not len(self):
+            return None
+        return float(fn(self[channel], *args))
+
+    def mean(self, channel):
+        return self._reduce(np.mean, channel)
+
+    def min(self, channel):
+        return self._reduce(np.min, channel)
+
+    def max(self, channel):
+        return self._reduce(np.max, channel)
+
+    def std(self, channel):
+        return self._reduce(np.std, channel)
+
+    def percentile(self, channel, q):
+        return self._reduce(np.percentile, channel, q)
+
+    def slope(self, channel):
+        """Least-squares trend of the channel in units per second, None with fewer than two packets."""
+        if self.duration <= 0:
+            return None
+        return float(np.polyfit(self.timestamp - self.timestamp[0], self[channel], 1)[0])
+
+    def stats(self, channel):
+        return {"n": len(self), "mean": self.mean(channel), "min": self.min(channel), "max": self.max(channel),
+                "std": self.std(channel)}
+
+
+class TelemetryBuffer(object):
+    """
+    Fixed-size ring buffer of decoded fixture updates.
+
+    append() is called from the serial receive thread once per RX_PACKET_TYPE_UPDATE with the
+    channel values already in engineering units; window() and capture() hand out copies.
+    """
+
+    def __init__(self, channels, capacity=4096, logger=None):
+
+        # Handle self.logger argument defaulting
+        if logger is None:
+            self.logger = logging.getLogger(self.__class__.__name__)
+        elif not hasattr(logger, "getChild"):
+            self.logger = logger
+        else:
+            self.logger = logger.getChild(self.__class__.__name__)
+
+        self.channels = tuple(channels)
+        self.capacity = capacity
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.counter = np.zeros(capacity, dtype=np.uint8)
+        self.data = np.zeros((capacity, len(self.channels)), dtype=np.float64)
+
+        # Total packets appended; the next row written is seq % capacity
+        self.seq = 0
+        self.cv = threading.Condition()
+
+    def append(self, timestamp, counter, values):
+        with self.cv:
+            i = self.seq % self.capacity
+            self.timestamp[i] = timestamp
+            self.counter[i] = counter
+            self.data[i] = values
+            self.seq += 1
+            self.cv.notify_all()
+
+    def clear(self):
+        with self.cv:
+            self.seq = 0
+
+    def _columns(self, channels):
+        if channels is None:
+            return self.channels, slice(None)
+        if isinstance(channels, str):
+            channels = (channels,)
+        return tuple(channels), [self.channels.index(ch) for ch in channels]
+
+    def _slice(self, start, stop, channels):
+        # Rows [start, stop) in sequence numbers; caller holds the lock
+        names, cols = self._columns(channels)
+        idx = np.arange(start, stop) % self.capacity
+        return TelemetryWindow(names, self.timestamp[idx], self.counter[idx], self.data[idx][:, cols])
+
+    def window(self, channels=None, n=None, since=None):
+        """
+        Most recent packets: the last n, and/or those received at or after monotonic time since.
+        """
+        with self.cv:
+            stop = self.seq
+            start = max(0, stop - self.capacity)
+            if n is not None:
+                start = max(start, stop - int(n))
+            w = self._slice(start, stop, channels)
+        if since is not None:
+            keep = w.timestamp >= since
+            w = TelemetryWindow(w.channels, w.timestamp[keep], w.counter[keep], w.data[keep])
+        return w
+
+    def capture(self, channels=None, n=10, timeout=None):
+        """
+        Block until n packets newer than the call have arrived and return them. On timeout the
+        packets received so far are returned (possibly none).
+        """
+        n = min(int(n), self.capacity)
+        if timeout is None:
+            timeout = 5.0
+        end = time.monotonic() + timeout
+        with self.cv:
+            start = self.seq
+            while self.seq - start < n:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    self.logger.warning("%s - %s: Timeout, %d of %d packets" % (
+                        self.__class__.__name__, self.capture.__name__, self.seq - start, n))
+                    break
+                self.cv.wait(remaining)
+            return self._slice(start, min(self.seq, start + n), channels)
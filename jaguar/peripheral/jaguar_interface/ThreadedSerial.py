@@ -3,13 +3,19 @@ import serial
 import logging
 import traceback
 import sys
+import time
 from .StoppableThread import StoppableThread
 
+# Reader modes for SerialMonitorThread
+READ_MODE_BYTE = "byte"  # legacy: one read(1) and one callback round per byte
+READ_MODE_BULK = "bulk"  # drain in_waiting (or block for a chunk) and pass memoryview chunks
+
 
 class ThreadedSerial(object):
 
     def __init__(self, port, baudrate=115200, bytesize=8, parity='N', stopbits=1,
-                 read_timeout=0.01, write_timeout=0.05, logger=None, name=""):
+                 read_timeout=0.01, write_timeout=0.05, logger=None, name="",
+                 read_mode=READ_MODE_BULK, chunk_size=256, inter_byte_timeout=0.002):
 
         # Serial port object
         self.ser = serial.Serial()
@@ -21,6 +27,11 @@ class ThreadedSerial(object):
         self.ser.parity = parity
         self.ser.stopbits = stopbits
         self.threadObj_name = name
+
+        # Reader configuration
+        self.read_mode = read_mode
+        self.chunk_size = chunk_size
+        self.inter_byte_timeout = inter_byte_timeout
         #
         # Handle self.logger argument defaulting
         #
@@ -49,7 +60,9 @@ class ThreadedSerial(object):
         self.ser.flushOutput()
 
         # Start thread
-        self.threadObj = SerialMonitorThread(self.ser, self.callback_list, self.logger)
+        self.threadObj = SerialMonitorThread(self.ser, self.callback_list, self.logger,
+                                             read_mode=self.read_mode, chunk_size=self.chunk_size,
+                                             inter_byte_timeout=self.inter_byte_timeout)
         self.threadObj.daemon = True
         if self.threadObj_name != "":
             self.threadObj.name = self.threadObj_name
@@ -87,16 +100,35 @@ class ThreadedSerial(object):
             if fp in self.callback_list:
                 self.callback_list.remove(fp)
 
+    def stats(self):
+        """
+        Return reader throughput counters (bytes/sec, callbacks/sec) since the port was opened,
+        or None if the monitor thread is not running.
+        """
+        if self.threadObj is None:
+            return None
+        return self.threadObj.stats()
+
 
 class SerialMonitorThread(StoppableThread):
 
-    def __init__(self, ser, callback_list, logger):
+    def __init__(self, ser, callback_list, logger, read_mode=READ_MODE_BULK, chunk_size=256,
+                 inter_byte_timeout=0.002):
 
         super(SerialMonitorThread, self).__init__()
 
         self.serObj = ser
         self.callback_list = callback_list
         self.logger = logger
+        self.read_mode = read_mode
+        self.chunk_size = chunk_size
+        self.inter_byte_timeout = inter_byte_timeout
+
+        # Throughput counters
+        self.bytes_rx = 0
+        self.reads = 0
+        self.callbacks = 0
+        self.start_time = time.monotonic()
 
     def read(self, *args, **kwargs):
 
@@ -106,18 +138,84 @@ class SerialMonitorThread(StoppableThread):
         else:
             return None
 
+    def read_chunk(self):
+        """
+        Bulk read: drain everything already buffered by the driver in one call. If nothing is
+        waiting, block (up to the port read timeout) for the first byte and then keep reading
+        until the line goes quiet for inter_byte_timeout or chunk_size bytes have arrived.
+        """
+        if self.serObj is None:
+            return None
+
+        waiting = self.serObj.in_waiting
+        if waiting > 0:
+            return self.serObj.read(waiting)
+
+        rd = self.serObj.read(1)
+        if len(rd) == 0:
+            return rd
+
+        buf = bytearray(rd)
+        deadline = time.monotonic() + self.inter_byte_timeout
+        while len(buf) < self.chunk_size:
+            waiting = self.serObj.in_waiting
+            if waiting > 0:
+                buf += self.serObj.read(min(waiting, self.chunk_size - len(buf)))
+                deadline = time.monotonic() + self.inter_byte_timeout
+            elif time.monotonic() >= deadline:
+                break
+            else:
+                time.sleep(self.inter_byte_timeout / 4)
+        return buf
+
+    def stats(self):
+        """
+        Return throughput counters since the thread started.
+        """
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return {
+            "read_mode": self.read_mode,
+            "elapsed": elapsed,
+            "bytes": self.bytes_rx,
+            "reads": self.reads,
+            "callbacks": self.callbacks,
+            "bytes_per_sec": self.bytes_rx / elapsed,
+            "reads_per_sec": self.reads / elapsed,
+            "callbacks_per_sec": self.callbacks / elapsed,
+        }
+
     def run(self):
 
-        self.logger.info("%s - %s: Started serial monitor thread..." % (self.__class__.__name__, self.run.__name__))
+        self.logger.info("%s - %s: Started serial monitor thread (%s mode)..." % (
+            self.__class__.__name__, self.run.__name__, self.read_mode))
+        self.start_time = time.monotonic()
 
         while not self.stopped():
             # Read from serial
-            x = self.read(1)
+            try:
+                if self.read_mode == READ_MODE_BULK:
+                    x = self.read_chunk()
+                else:
+                    x = self.read(1)
+            except (serial.SerialException, OSError, TypeError) as e:
+                # port gone (USB disconnect) or closed under us
+                if not self.stopped():
+                    self.logger.warning("%s - %s: Serial read failed: %s" % (
+                        self.__class__.__name__, self.run.__name__, e))
+                break
             if x is not None and len(x) > 0:
 
+                self.bytes_rx += len(x)
+                self.reads += 1
+
+                # Callbacks get a read-only view of the chunk, no per-callback copies
+                if self.read_mode == READ_MODE_BULK:
+                    x = memoryview(x).toreadonly()
+
                 # Post callbacks
                 for fp in self.callback_list:
                     if fp is not None:
+                        self.callbacks += 1
                         try:
                             fp(x)
                         except:
@@ -1,17 +1,46 @@
 import time
 import logging
+import threading
+import contextlib
 
 from .JaguarFixtureSession import JaguarFixtureSession
 from .JaguarFixture import *
+from .TelemetryBuffer import TelemetryBuffer
 
 
 class JaguarInterfaceLL():
     event_logger = logging.getLogger("event_logger")
 
-    def __init__(self, port):
+    # Engineering-unit channels recorded per update packet (see _on_update)
+    TELEMETRY_CHANNELS = ("battery_voltage", "dc_voltage", "sys_voltage", "modem_voltage",
+                          "battery_current", "dc_current", "adc_4_20_ch0", "adc_4_20_ch1")
+
+    # Rail profile line -> (output, active low); v3 shares GPIO_EN until the VSYS gate is wired, see v3_power_en
+    RAIL_OUTPUTS = {
+        "dc": (JaguarFixtureGPIOOutput.GPIO_OUTPUT_DC_EN, False),
+        "bat": (JaguarFixtureGPIOOutput.GPIO_OUTPUT_EN_3V8, True),
+        "v3": (JaguarFixtureGPIOOutput.GPIO_OUTPUT_GPIO_EN, False),
+        "gpio": (JaguarFixtureGPIOOutput.GPIO_OUTPUT_GPIO_EN, False),
+        "rs232": (JaguarFixtureGPIOOutput.GPIO_OUTPUT_RS232_EN, False),
+        "jtag": (JaguarFixtureGPIOOutput.GPIO_OUTPUT_JTAG_EN, False),
+        "analog": (JaguarFixtureGPIOOutput.GPIO_OUTPUT_ANALOG_EN, False),
+    }
+
+    def __init__(self, port, telemetry_capacity=4096):
         self.port = port
         self.fixture_session = None
         self.session = None
+        self.telemetry = TelemetryBuffer(self.TELEMETRY_CHANNELS, capacity=telemetry_capacity)
+        # Output levels written through _gpio, and the bits not yet confirmed by a fixture update
+        self._outputs_desired = 0
+        self._outputs_pending = 0
+        # Last value sent per output / LED; writes collected inside batch() are kept per thread
+        self._outputs_sent = {}
+        self._leds_sent = {}
+        self._batch_local = threading.local()
+        # GPIO/LED frames sent and frames avoided by batch(); see gpio_stats()
+        self.packets_sent = 0
+        self.packets_saved = 0
         # lightweight tracer; shows every GPIO write and snapshots
         self._trace = logging.getLogger("ll_pins").info
         self.open()
@@ -20,11 +49,38 @@ class JaguarInterfaceLL():
         self.fixture_session = JaguarFixtureSession(self.port)
         self.event_logger.info("JaguarInterfaceLL: Setup complete, waiting for input...")
         self.session = self.fixture_session.jaguarFixture
+        self.session.add_update_callback(self._on_update)
 
     def close(self):
+        self.session.remove_update_callback(self._on_update)
         self.fixture_session.close()
         self.session = None
 
+    def connected(self):
+        """Serial port open and its reader thread running (the thread ends on a USB disconnect)."""
+        com = self.fixture_session.jaguarCom
+        return com.ser.is_open and com.threadObj is not None and com.threadObj.is_alive()
+
+    # ---------------- Telemetry ----------------
+
+    def _on_update(self, state):
+        # Serial receive thread: one row per update packet, same conversions as the readers below
+        self.telemetry.append(state.timestamp, state.counter, (
+            self.battery_voltage(state),
+            self.dc_voltage(state),
+            self.sys_voltage(state),
+            self.modem_voltage(state),
+            self.battery_current(state),
+            self.dc_current(state),
+            state.adc_4_20_ch0,
+            state.adc_4_20_ch1))
+
+    def window(self, channels=None, n=None, since=None):
+        return self.telemetry.window(channels, n=n, since=since)
+
+    def capture(self, channels=None, n=10, timeout=None):
+        return self.telemetry.capture(channels, n=n, timeout=timeout)
+
     # ---------------- GPIO wrapper & helpers ----------------
 
     def _gpio(self, out_enum, val: bool):
@@ -34,7 +90,116 @@ class JaguarInterfaceLL():
         except Exception:
             name = str(out_enum)
         self._trace(f"GPIO {name} <- {int(bool(val))}")
-        return self.session.set_gpio(out_enum, bool(val))
+        bit = JaguarFixtureState.output_bit(out_enum)
+        if val:
+            self._outputs_desired |= bit
+        else:
+            self._outputs_desired &= ~bit
+        batch = self._batch_state()
+        if batch.depth:
+            batch.requests += 1
+            batch.outputs[out_enum] = bool(val)
+            return True
+        self.packets_sent += 1
+        result = self.session.set_gpio(out_enum, bool(val))
+        if result:
+            self._outputs_pending |= bit
+            self._outputs_sent[out_enum] = bool(val)
+        return result
+
+    def _output_level(self, out_enum):
+        """Best known level of an output: the fixture echo once confirmed, else the last value sent."""
+        bit = JaguarFixtureState.output_bit(out_enum)
+        if not (self._outputs_pending & bit) and self.session.update_count:
+            return bool(self.session.state.gpio_outputs & bit)
+        return self._outputs_sent.get(out_enum)
+
+    def rail_level(self, name):
+        """Logical level (True = enabled) of a rail profile line, None if never written or echoed."""
+        out, active_low = self.RAIL_OUTPUTS[name]
+        level = self._output_level(out)
+        if level is None:
+            return None
+        return level != active_low
+
+    def set_rail(self, name, enable):
+        out, active_low = self.RAIL_OUTPUTS[name]
+        return self._gpio(out, bool(enable) != active_low)
+
+    def _batch_state(self):
+        """batch() nesting depth and collected writes of the calling thread."""
+        batch = self._batch_local
+        if not hasattr(batch, "depth"):
+            batch.depth, batch.outputs, batch.leds, batch.requests = 0, {}, {}, 0
+        return batch
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collect GPIO and LED writes and send them on exit as one serial write, skipping pins and
+        LEDs that already have the requested level. Nested batches flush with the outermost one;
+        each thread batches its own writes.
+        """
+        batch = self._batch_state()
+        batch.depth += 1
+        try:
+            yield self
+        finally:
+            batch.depth -= 1
+            if not batch.depth:
+                self._flush_batch(batch)
+
+    def _flush_batch(self, batch):
+        outputs, leds, requests = batch.outputs, batch.leds, batch.requests
+        batch.outputs, batch.leds, batch.requests = {}, {}, 0
+
+        changed = [(out, val) for out, val in outputs.items() if self._output_level(out) != val]
+        changed_leds = [(led, val) for led, val in leds.items() if self._leds_sent.get(led) != val]
+        if not changed and not changed_leds:
+            self.packets_saved += requests
+            self._trace(f"BATCH {requests} writes -> 0 frames")
+            return True
+
+        sent = self.session.set_gpios(changed, changed_leds)
+        if sent is False:
+            # Nothing went out: keep the caches so the next write of these pins is not skipped
+            self._trace(f"BATCH {requests} writes -> failed")
+            return False
+        for out, val in changed:
+            self._outputs_pending |= JaguarFixtureState.output_bit(out)
+            self._outputs_sent[out] = val
+        for led, val in changed_leds:
+            self._leds_sent[led] = val
+
+        self.packets_sent += sent
+        self.packets_saved += requests - sent
+        self._trace(f"BATCH {requests} writes -> {sent} frames")
+        return True
+
+    def gpio_stats(self):
+        return {"gpio_packets_sent": self.packets_sent, "gpio_packets_saved": self.packets_saved}
+
+    def reset_gpio_stats(self):
+        self.packets_sent = 0
+        self.packets_saved = 0
+
+    def wait_for_update(self, after_counter=None, timeout=1.0):
+        return self.session.wait_for_update(after_counter, timeout)
+
+    def wait_for_outputs(self, mask=None, value=None, timeout=1.0):
+        """
+        Wait until the fixture echoes the requested output levels. Without a mask, waits for every
+        output written through _gpio since the last confirmation. Returns True once confirmed.
+        """
+        if mask is None:
+            mask, value = self._outputs_pending, self._outputs_desired
+            if not mask:
+                return True
+        state = self.session.wait_for_outputs(mask, value, timeout)
+        if state is None:
+            return False
+        self._outputs_pending &= ~mask
+        return True
 
     def _read_voltages_snapshot(self):
         """Take a one-line voltage snapshot and trace it: VDC/VBAT/VSYS."""
@@ -133,7 +298,14 @@ class JaguarInterfaceLL():
 
     def set_led(self, led, value):
         # Fixture LED API is inverted (value==0 means ON); leave as-is
-        self.session.set_led(led, value == 0)
+        batch = self._batch_state()
+        if batch.depth:
+            batch.requests += 1
+            batch.leds[led] = value == 0
+            return
+        self.packets_sent += 1
+        if self.session.set_led(led, value == 0):
+            self._leds_sent[led] = value == 0
 
     def set_dac(self, dac, value):
         if value > 255:
@@ -160,36 +332,44 @@ class JaguarInterfaceLL():
         return self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_GPIO_EN, bool(val))
         # ↑ TEMP: using GPIO_EN as a harmless default; update after find_vsys_gate_candidate()
 
-    def battery_voltage(self):
+    def snapshot(self):
+        """Latest JaguarFixtureState; pass it to the readers below to derive several values from one update."""
+        return self.session.state
+
+    def battery_voltage(self, state=None):
         # Scaled in fixture: 10:1 divider (10 + 1)/1
-        return self.session.adc_batt_voltage * (10 + 1) / 1
+        s = state or self.session.state
+        return s.adc_batt_voltage * (10 + 1) / 1
 
-    def dc_voltage(self):
-        return self.session.adc_dc_voltage * (10 + 1) / 1
+    def dc_voltage(self, state=None):
+        s = state or self.session.state
+        return s.adc_dc_voltage * (10 + 1) / 1
 
-    def input_switch(self):
+    def input_switch(self, state=None):
+        s = state or self.session.state
         return "%d%d%d%d" % (
-            self.session.gpio_input_switch_0,
-            self.session.gpio_input_switch_1,
-            self.session.gpio_input_switch_2,
-            self.session.gpio_input_switch_3)
+            s.gpio_input_switch_0,
+            s.gpio_input_switch_1,
+            s.gpio_input_switch_2,
+            s.gpio_input_switch_3)
 
     def fixture_detect(self, level):
         """Active low (board)."""
         self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_FIXTURE_DETECT, level)
 
-    def battery_current(self):
-        # (unchanged) — left as-is
-        if self.session.gpio_input_switch_3:
-            return (self.battery_voltage() / 100) / 0.0797 * self.session.adc_batt_current
-        elif self.session.gpio_input_switch_2:
-            return (self.battery_voltage() / 100) / 0.69 * self.session.adc_batt_current
-        elif self.session.gpio_input_switch_1:
-            return (self.battery_voltage() / 1000) / 0.68 * self.session.adc_batt_current
-        elif self.session.gpio_input_switch_0:
-            return (self.battery_voltage() / 10000) / 0.6864 * self.session.adc_batt_current
+    def battery_current(self, state=None):
+        # Range switches, battery voltage and shunt reading must come from the same update
+        s = state or self.session.state
+        if s.gpio_input_switch_3:
+            return (self.battery_voltage(s) / 100) / 0.0797 * s.adc_batt_current
+        elif s.gpio_input_switch_2:
+            return (self.battery_voltage(s) / 100) / 0.69 * s.adc_batt_current
+        elif s.gpio_input_switch_1:
+            return (self.battery_voltage(s) / 1000) / 0.68 * s.adc_batt_current
+        elif s.gpio_input_switch_0:
+            return (self.battery_voltage(s) / 10000) / 0.6864 * s.adc_batt_current
         else:
-            ret = (self.battery_voltage() / 100000) / 0.687 * self.session.adc_batt_current - 620e-9
+            ret = (self.battery_voltage(s) / 100000) / 0.687 * s.adc_batt_current - 620e-9
             if ret < 0:
                 ret = 0
             return ret
@@ -206,34 +386,40 @@ class JaguarInterfaceLL():
         elif index == 1:
             return self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_MAG_1, value == False)
 
-    def dc_current(self):
-        return (self.session.adc_dc_current - 0.002) / 0.15 / 20
+    def dc_current(self, state=None):
+        s = state or self.session.state
+        return (s.adc_dc_current - 0.002) / 0.15 / 20
 
-    def sys_voltage(self):
+    def sys_voltage(self, state=None):
         # Scale 31/10 (20k//1k with 10k to GND)
-        return (self.session.adc_sys_voltage * (31 / 10.))
+        s = state or self.session.state
+        return (s.adc_sys_voltage * (31 / 10.))
 
-    def modem_voltage(self):
-        return (self.session.adc_vmdm * (31 / 10.))
+    def modem_voltage(self, state=None):
+        s = state or self.session.state
+        return (s.adc_vmdm * (31 / 10.))
 
     def set_cal_switch(self, val):
-        self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_0, val[0])
-        self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_1, val[1])
-        self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_2, val[2])
-        self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_3, val[3])
-        self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_4, val[4])
+        with self.batch():
+            self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_0, val[0])
+            self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_1, val[1])
+            self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_2, val[2])
+            self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_3, val[3])
+            self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_CAL_LOAD_4, val[4])
 
     def pulse(self, channel, val):
         if channel == 1:
             self._gpio(JaguarFixtureGPIOOutput.GPIO_OUTPUT_LFP_0, val)
 
-    def dut_present(self):
-        return self.session.gpio_input_lid_detect == 0
+    def dut_present(self, state=None):
+        s = state or self.session.state
+        return s.gpio_input_lid_detect == 0
 
-    def read_dig_out(self):
+    def read_dig_out(self, state=None):
+        s = state or self.session.state
         return (
-            self.session.gpio_input_dig_out_rtn_3,
-            self.session.gpio_input_dig_out_rtn_2,
-            self.session.gpio_input_dig_out_rtn_1,
-            self.session.gpio_input_dig_out_rtn_0,
+            s.gpio_input_dig_out_rtn_3,
+            s.gpio_input_dig_out_rtn_2,
+            s.gpio_input_dig_out_rtn_1,
+            s.gpio_input_dig_out_rtn_0,
         )
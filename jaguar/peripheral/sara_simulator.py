@@ -0,0 +1,384 @@
+# Imports
+import argparse
+import hashlib
+import heapq
+import logging
+import os
+import re
+import select
+import sys
+import time
+
+from .jaguar_interface.StoppableThread import StoppableThread
+
+_COMMAND = re.compile(rb"^AT([+&]?[A-Z]+\d*)(\?|=\?|=)?(.*)$")
+_FINAL = re.compile(rb"^(OK|ERROR|\+CM[ES] ERROR:.*|>)$")
+
+
+# Class to emulate a u-blox SARA-R4 LTE modem
+class UBloxSaraSimulator(StoppableThread):
+    """
+    Scripted u-blox SARA-R4 modem. Answers AT commands (echo on, verbose result codes, +CMEE) and
+    models network registration over time: searching from power-on (or AT+CFUN=1), registered
+    register_after seconds later (never if None or without a SIM), PDP context active context_after
+    seconds after that. Changes are reported as +CEREG/+CREG URCs once enabled with AT+CEREG=<n>,
+    AT+CREG=<n>, and as "+CGEV: ME PDN ACT 1" after AT+CGEREP=1.
+
+    script replaces or adds commands by their exact text: {b"AT+CSQ": [b"+CSQ: 5,99"],
+    b"AT+CGMI": [b"ERROR"]}, or a callable(cmd) returning the lines; OK is appended unless the last
+    line is a final result code. delays adds response time by command name, {b"+COPS": 1.5}.
+    urc() sends any line, now or later.
+
+    Standalone (realtime=True) it answers on a pty:
+        UBloxSara(UartReader(TimedSerial(sim.port, 115200, timeout=0.1)).start())
+    Embedded (realtime=False) another simulator passes it the bytes with input() and sends what
+    poll() returns, see JaguarTargetDUTSimulator(modem=...) in LTE passthrough mode.
+    """
+
+    INFO = {
+        b"+CGMI": [b"u-blox"],
+        b"+CGMM": [b"SARA-R410M-02B"],
+        b"+GMR": [b"L0.0.00.00.05.06 [Feb 03 2018 13:00:41]"],
+        b"I0": [b"SARA-R410M-02B"],
+        b"I9": [b"L0.0.00.00.05.06,A.02.00"],
+    }
+    # +CME ERROR codes
+    ERRORS = {4: b"operation not supported", 10: b"SIM not inserted"}
+
+    def __init__(self, latency=0.01, register_after=2.0, context_after=0.5, roaming=False, sim=True,
+                 imei=b"356726100955202", iccid=b"89011703278101223592", operator=b"AT&T", rssi=18,
+                 script=None, delays=None, realtime=True, logger=None):
+
+        super(UBloxSaraSimulator, self).__init__(daemon=True)
+
+        # Handle self.logger argument defaulting
+        if logger is None:
+            self.logger = logging.getLogger(self.__class__.__name__)
+        elif not hasattr(logger, "getChild"):
+            self.logger = logger
+        else:
+            self.logger = logger.getChild(self.__class__.__name__)
+
+        self.latency = latency
+        self.register_after = register_after
+        self.context_after = context_after
+        self.roaming = roaming
+        self.sim = sim
+        self.imei = imei
+        self.iccid = iccid
+        self.operator = operator
+        self.rssi = rssi
+        self.script = script or {}
+        self.delays = delays or {}
+        self.realtime = realtime
+
+        # Modem state
+        self.echo = True
+        self.cmee = 0
+        self.cereg_n = 0
+        self.creg_n = 0
+        self.cgerep = 0
+        self.cfun = 1
+        self.powered = time.monotonic()
+        self.files = {}
+        self.reported_stat = None
+        self.reported_context = False
+
+        # Statistics
+        self.commands = 0
+        self.errors = 0
+        self.urcs = 0
+
+        self.rx_buffer = b""
+        # (name, type, remaining bytes, data) while taking a certificate after the ">" prompt
+        self.upload = None
+        # (due, seq, bytes) queued for output
+        self.outbox = []
+        self.seq = 0
+        self.busy_until = 0.0
+
+        self.master = self.slave = None
+        self.port = None
+        if self.realtime:
+            # Raw pty so the line discipline never touches the stream
+            self.master, self.slave = os.openpty()
+            try:
+                import tty
+                tty.setraw(self.slave)
+            except ImportError:
+                pass
+            os.set_blocking(self.master, False)
+            self.port = os.ttyname(self.slave)
+            self.start()
+
+    def close(self):
+        if self.is_alive():
+            self.stop()
+            self.join()
+        if self.master is not None:
+            os.close(self.master)
+            os.close(self.slave)
+
+    # ---------- network model ----------
+
+    def power_on(self):
+        """
+        Restart the search for the network, as at power-on or AT+CFUN=1
+        """
+        self.cfun = 1
+        self.powered = time.monotonic()
+
+    def registered_at(self):
+        if self.cfun != 1 or not self.sim or self.register_after is None:
+            return None
+        return self.powered + self.register_after
+
+    def stat(self, now):
+        """
+        <stat> of +CEREG/+CREG: 0 not searching, 2 searching, 1 home, 5 roaming
+        """
+        if self.cfun != 1 or not self.sim:
+            return 0
+        registered = self.registered_at()
+        if registered is None or now < registered:
+            return 2
+        return 5 if self.roaming else 1
+
+    def context(self, now):
+        registered = self.registered_at()
+        return registered is not None and now >= registered + self.context_after
+
+    def registration(self, n, stat, lac=b'"1A2B"'):
+        if n >= 2 and stat in (1, 5):
+            return b"%d,%s,\"01A2D001\",7" % (stat, lac)
+        return b"%d" % stat
+
+    # ---------- I/O ----------
+
+    def queue(self, data, due):
+        heapq.heappush(self.outbox, (due, self.seq, data))
+        self.seq += 1
+
+    def urc(self, line, delay=0.0):
+        """
+        Send an unsolicited line after delay seconds
+        """
+        self.urcs += 1
+        self.queue(b"\r\n" + line + b"\r\n", time.monotonic() + delay)
+
+    def input(self, data):
+        """
+        Bytes from the host: commands terminated by "\\r", or certificate data after a ">" prompt
+        """
+        now = time.monotonic()
+        self.rx_buffer += data
+        while self.rx_buffer:
+            if self.upload is not None:
+                name, kind, remaining, content = self.upload
+                chunk, self.rx_buffer = self.rx_buffer[:remaining], self.rx_buffer[remaining:]
+                content += chunk
+                remaining -= len(chunk)
+                self.upload = (name, kind, remaining, content)
+                if remaining > 0:
+                    break
+                self.upload = None
+                self.files[name] = content
+                md5 = hashlib.md5(content).hexdigest().upper().encode()
+                self.respond([b'+USECMNG: 0,%d,"%s","%s"' % (kind, name, md5)], now, 0.1)
+                continue
+            if b"\r" not in self.rx_buffer:
+                break
+            line, self.rx_buffer = self.rx_buffer.split(b"\r", 1)
+            self.rx_buffer = self.rx_buffer.lstrip(b"\n")
+            line = line.strip()
+            if not line:
+                continue
+            if self.echo:
+                self.queue(line + b"\r\n", max(now, self.busy_until))
+            self.commands += 1
+            m = _COMMAND.match(line.upper())
+            delay = self.delays.get(m.group(1), 0.0) if m else 0.0
+            self.respond(self.execute(line, now), now, delay)
+
+    def respond(self, lines, now, delay=0.0):
+        if not lines or not _FINAL.match(lines[-1]):
+            lines = list(lines) + [b"OK"]
+        if lines[-1] not in (b"OK", b">"):
+            self.errors += 1
+        self.busy_until = max(now, self.busy_until) + self.latency + delay
+        data = b"".join(b"\r\n" + line + b"\r\n" for line in lines[:-1])
+        data += b">" if lines[-1] == b">" else b"\r\n" + lines[-1] + b"\r\n"
+        self.queue(data, self.busy_until)
+
+    def poll(self):
+        """
+        Registration URCs due by now, then the output due by now
+        """
+        now = time.monotonic()
+        stat = self.stat(now)
+        if stat != self.reported_stat:
+            if self.reported_stat is not None:
+                if self.cereg_n:
+                    self.urc(b"+CEREG: " + self.registration(self.cereg_n, stat))
+                if self.creg_n:
+                    self.urc(b"+CREG: " + self.registration(self.creg_n, stat))
+            self.reported_stat = stat
+        context = self.context(now)
+        if context != self.reported_context:
+            if self.cgerep:
+                self.urc(b"+CGEV: ME PDN %s 1" % (b"ACT" if context else b"DEACT"))
+            self.reported_context = context
+        data = b""
+        while self.outbox and self.outbox[0][0] <= now:
+            data += heapq.heappop(self.outbox)[2]
+        return data
+
+    def next_due(self):
+        """
+        Monotonic time of the next output or registration change, None if nothing is pending
+        """
+        times = [self.outbox[0][0]] if self.outbox else []
+        registered = self.registered_at()
+        if registered is not None:
+            times += [t for t in (registered, registered + self.context_after) if t > time.monotonic()]
+        return min(times) if times else None
+
+    # ---------- commands ----------
+
+    def error(self, code=4):
+        if self.cmee == 1:
+            return [b"+CME ERROR: %d" % code]
+        if self.cmee == 2:
+            return [b"+CME ERROR: " + self.ERRORS.get(code, b"unknown")]
+        return [b"ERROR"]
+
+    def execute(self, cmd, now):
+        """
+        Response lines (with or without the final result code) to one command
+        """
+        if cmd in self.script:
+            lines = self.script[cmd]
+            return list(lines(cmd) if callable(lines) else lines)
+        m = _COMMAND.match(cmd.upper())
+        if cmd.upper() == b"AT":
+            return []
+        if m is None:
+            return self.error()
+        name, op, args = m.group(1), m.group(2) or b"", cmd[m.start(3):]
+        values = [int(v) if v.isdigit() else v.strip(b'"') for v in args.split(b",")] if args else []
+
+        if name in self.INFO and not op:
+            return self.INFO[name]
+        if name in (b"E0", b"E1"):
+            self.echo = name == b"E1"
+            return []
+        if name == b"+GSN":
+            return [self.imei]
+        if name == b"+CMEE" and op == b"=":
+            self.cmee = values[0]
+            return []
+        if name in (b"+CCID", b"+CPIN", b"+CLCK"):
+            if not self.sim:
+                return self.error(10)
+            return {b"+CCID": [b"+CCID: " + self.iccid], b"+CPIN": [b"+CPIN: READY"],
+                    b"+CLCK": [b"+CLCK: 0"]}[name]
+        if name == b"+ULSTFILE":
+            return [b"+ULSTFILE: " + b",".join(b'"%s"' % f for f in self.files)]
+        if name == b"+USECMNG" and op == b"=" and len(values) >= 4:
+            self.upload = (values[2], values[1], values[3], b"")
+            return [b">"]
+        if name in (b"+CEREG", b"+CREG", b"+CGREG"):
+            attr = "cereg_n" if name == b"+CEREG" else "creg_n"
+            if op == b"=":
+                setattr(self, attr, values[0])
+                return []
+            if op == b"?":
+                n = getattr(self, attr)
+                return [name + b": %d," % n + self.registration(n, self.stat(now))]
+        if name == b"+CGEREP":
+            if op == b"=":
+                self.cgerep = values[0]
+                return []
+            return [b"+CGEREP: %d,0" % self.cgerep]
+        if name == b"+CFUN":
+            if op == b"?":
+                return [b"+CFUN: %d,0" % self.cfun]
+            if values and values[0] in (1, 15):
+                self.power_on()
+            elif values:
+                self.cfun = values[0]
+            return []
+        if name == b"+COPS":
+            if op == b"?":
+                if self.stat(now) in (1, 5):
+                    return [b'+COPS: 0,0,"%s",7' % self.operator]
+                return [b"+COPS: 0"]
+            return []
+        if name == b"+CSQ":
+            return [b"+CSQ: %d,99" % (self.rssi if self.cfun == 1 else 99)]
+        if name == b"+CGATT" and op == b"?":
+            return [b"+CGATT: %d" % (self.stat(now) in (1, 5))]
+        if name == b"+CGACT" and op == b"?":
+            return [b"+CGACT: 1,%d" % self.context(now)]
+        if name == b"+CGDCONT":
+            if op == b"?":
+                address = b"10.160.1.2" if self.context(now) else b""
+                return [b'+CGDCONT: 1,"IP","broadband","%s",0,0' % address]
+            return []
+        return self.error()
+
+    # ---------- thread ----------
+
+    def run(self):
+        while not self.stopped():
+            timeout = 0.1
+            due = self.next_due()
+            if due is not None:
+                timeout = min(timeout, max(0.0, due - time.monotonic()))
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self.master, 4096)
+                except (BlockingIOError, OSError):
+                    data = b""
+                if data:
+                    self.input(data)
+            data = self.poll()
+            if data:
+                try:
+                    os.write(self.master, data)
+                except (BlockingIOError, OSError):
+                    # Nobody reading the slave side
+                    pass
+
+    def stats(self):
+        return {"commands": self.commands, "errors": self.errors, "urcs": self.urcs}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.INFO,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Virtual u-blox SARA-R4 modem on a pseudo-terminal")
+    parser.add_argument('--latency', type=float, default=0.01, help="response time per command (s)")
+    parser.add_argument('--register-after', type=float, default=2.0, help="network registration time (s)")
+    parser.add_argument('--context-after', type=float, default=0.5, help="data context activation time (s)")
+    parser.add_argument('--no-sim', action='store_true')
+    parser.add_argument('--link', help="also expose the pty under this path (symlink)")
+    args = parser.parse_args()
+
+    sim = UBloxSaraSimulator(latency=args.latency, register_after=args.register_after,
+                             context_after=args.context_after, sim=not args.no_sim)
+    if args.link:
+        if os.path.lexists(args.link):
+            os.remove(args.link)
+        os.symlink(sim.port, args.link)
+
+    logging.info("Simulated SARA modem on %s%s" % (sim.port, " -> %s" % args.link if args.link else ""))
+    try:
+        while True:
+            time.sleep(5)
+            logging.info("%s" % sim.stats())
+    except KeyboardInterrupt:
+        sim.close()
+        sys.exit()
@@ -0,0 +1,201 @@
+"""
+Pin and ADC sweeps across the fixture and the DUT test firmware.
+
+A SweepPlan is a list of SweepPoints. Each point is run as one exchange per link: its fixture
+writes go out as one batch and are confirmed by the fixture echo, then its DUT pin writes and DUT
+readbacks are pipelined as one command sequence, then its fixture readbacks are taken from an
+update received after that. Readbacks outside their limits are read again until the point's
+settle time has passed, as a fixed sleep of that length would have allowed.
+
+    plan = SweepPlan([
+        SweepPoint("DIGIN1 set", fixture=[("set_dig_in", 0, True)],
+                   read=[Readback("pin", ("B", 4), expect=1, error=ErrorCode.digin1_set_failed)]),
+        SweepPoint("DAC1=128", fixture=[("set_dac", 1, 128)],
+                   read=[Readback("adc", 0, lo=0.5, hi=0.6, convert=adc_to_v, error=...)]),
+    ])
+    result = plan.run(interface, target)
+    result.errors(), result.log()
+"""
+import time
+
+from birch.core.cancellation import CancellationToken
+from .dut_commands import DutCommand
+
+
+class Readback(object):
+    """
+    One value read at a sweep point and its limits.
+
+    source "pin" (DUT GPIO, key (port, pin)), "adc" (DUT ADC, key channel 0-2) or "dig_out" (fixture
+    DIG_OUT return, key 0-3). convert() maps the raw value before the checks; expect and/or lo/hi
+    are the limits. error is logged for any failure unless a more specific error_lo, error_hi or
+    error_missing (no value read) is given.
+    """
+
+    DUT_SOURCES = ("pin", "adc")
+
+    def __init__(self, source, key, expect=None, lo=None, hi=None, convert=None, error=None, error_lo=None,
+                 error_hi=None, error_missing=None, label=None):
+        self.source = source
+        self.key = key
+        self.expect = expect
+        self.lo = lo
+        self.hi = hi
+        self.convert = convert
+        self.error = error
+        self.error_lo = error_lo or error
+        self.error_hi = error_hi or error
+        self.error_missing = error_missing or error
+        if label is None:
+            label = {"pin": lambda k: "%s%d" % k, "adc": lambda k: "ADC%d" % (k + 1),
+                     "dig_out": lambda k: "DIG_OUT%d" % (k + 1)}[source](key)
+        self.label = label
+
+    @property
+    def on_dut(self):
+        return self.source in self.DUT_SOURCES
+
+    def command(self):
+        if self.source == "pin":
+            return DutCommand.read_pin(*self.key)
+        return DutCommand.read_adc()
+
+    def value(self, raw):
+        """
+        Raw readback -> checked value; None when nothing could be read
+        """
+        if self.source == "adc" and raw is not None:
+            raw = raw[self.key]
+        if raw is None or raw == -1:
+            return None
+        return self.convert(raw) if self.convert else raw
+
+    def check(self, value):
+        """
+        The error for value, None when it is within limits
+        """
+        if value is None:
+            return self.error_missing
+        if self.expect is not None and value != self.expect:
+            return self.error
+        if self.lo is not None and value < self.lo:
+            return self.error_lo
+        if self.hi is not None and value > self.hi:
+            return self.error_hi
+        return None
+
+
+class SweepPoint(object):
+    """
+    Fixture writes [(interface method, index, value)], e.g. ("set_dig_in", 0, True), ("set_dac", 1, 128),
+    ("set_electromagnet", 0, False); DUT pin writes [(port, pin, value)]; readbacks; and the longest
+    time the readbacks may take to come within limits.
+    """
+
+    def __init__(self, name, fixture=(), dut=(), read=(), settle=0.2):
+        self.name = name
+        self.fixture = list(fixture)
+        self.dut = list(dut)
+        self.read = list(read)
+        self.settle = settle
+
+
+class PointResult(object):
+
+    def __init__(self, point, values, errors, settle):
+        self.point = point
+        self.values = values  # readback label -> value
+        self.errors = errors  # readback label -> error code (failures only)
+        self.settle = settle  # seconds until the accepted readback started
+
+    @property
+    def passed(self):
+        return not self.errors
+
+    def log(self) -> dict:
+        d = {"point": self.point.name, "result": self.passed, "values": self.values, "settle": round(self.settle, 4)}
+        if self.errors:
+            d["errors"] = {label: getattr(e, "name", str(e)) for label, e in self.errors.items()}
+        return d
+
+
+class SweepResult(object):
+    """
+    Result matrix of a sweep: one PointResult per point, in plan order
+    """
+
+    def __init__(self, points):
+        self.points = points
+
+    @property
+    def passed(self):
+        return all(p.passed for p in self.points)
+
+    def __getitem__(self, name):
+        for p in self.points:
+            if p.point.name == name:
+                return p
+        raise KeyError(name)
+
+    def errors(self):
+        """
+        Distinct error codes in the order they first occurred
+        """
+        seen = []
+        for p in self.points:
+            for e in p.errors.values():
+                if e is not None and e not in seen:
+                    seen.append(e)
+        return seen
+
+    def log(self):
+        """
+        Per-point entries for the step log
+        """
+        return [p.log() for p in self.points]
+
+
+class SweepPlan(object):
+    """
+    An ordered list of SweepPoints, run with run(interface, target)
+    """
+
+    def __init__(self, points):
+        self.points = list(points)
+
+    def run(self, interface, target) -> SweepResult:
+        token = CancellationToken.current()
+        results = []
+        for point in self.points:
+            token.check()
+            results.append(self.run_point(point, interface, target))
+        return SweepResult(results)
+
+    @staticmethod
+    def run_point(point, interface, target) -> PointResult:
+        start = time.monotonic()
+        if point.fixture:
+            interface.sweep_outputs(point.fixture, timeout=max(point.settle, 0.5))
+        writes = point.dut
+        while True:
+            t = time.monotonic() - start
+            raw = {}
+            dut_reads = [r for r in point.read if r.on_dut]
+            fixture_reads = [r for r in point.read if not r.on_dut]
+            if writes or dut_reads:
+                # a fixture readback after DUT writes needs the firmware to have executed them: any
+                # response behind them in the pipeline shows it did
+                fence = writes[-1][:2] if writes and fixture_reads and not dut_reads else None
+                raw.update(target.sweep_io(writes, dut_reads, fence=fence))
+            if fixture_reads:
+                raw.update(interface.sweep_inputs(fixture_reads))
+            values = {r.label: r.value(raw[r]) for r in point.read}
+            errors = {r.label: r.check(values[r.label]) for r in point.read}
+            errors = {label: e for label, e in errors.items() if e is not None}
+            if not errors or t >= point.settle:
+                return PointResult(point, values, errors, t)
+            # re-read only: the writes are in place
+            writes = []
+            CancellationToken.current().check()
+            if not dut_reads:
+                interface.wait_for_update(timeout=max(0.0, point.settle - (time.monotonic() - start)))
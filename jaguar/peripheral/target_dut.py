@@ -5,7 +5,10 @@ import serial
 import logging
 
 from birch.peripheral.target_dut import TargetDUT
-from birch.peripheral.util import find_port
+from birch.peripheral.util import resolve_port, TimedSerial
+from birch.peripheral.uart_reader import UartReader
+from birch.core.cancellation import CancellationToken, cancellable
+from .dut_commands import DutCommand, DutCommandClient
 
 
 @attr.s
@@ -20,18 +23,25 @@ class JaguarTargetDUT(TargetDUT):
     sim = attr.ib(default="")
     timestamp = datetime.datetime.now(datetime.timezone.utc).astimezone().isoformat()
 
+    # UartReader on the DUT UART: serial.Serial calls, URC routing and the transcript
     connection = None
+    # test firmware commands (read/set pin, ADC, DAC, pulse counter) over the connection
+    commands = None
     comms_retry = 3
 
     def open(self):
         """
         Open serial connection to target dut 
         """
-        port = find_port(vid=self.VID, pid=self.PID)
+        if self.connection is not None and self.connection.is_open:
+            return True
+        port = resolve_port(self.port, vid=self.VID, pid=self.PID)
         if port is None:
             return False
         try:
-            self.connection = serial.Serial(port, 115200, write_timeout=0.1, timeout=0.1)
+            self.connection = UartReader(TimedSerial(port, 115200, write_timeout=0.1, timeout=0.1), name="dut",
+                                         logger=self.event_logger).start()
+            self.commands = DutCommandClient(self.connection, logger=self.event_logger)
             return True
         except:
             return False
@@ -41,26 +51,57 @@ class JaguarTargetDUT(TargetDUT):
         """
         Close serial connection to target dut
         """
-        self.connection.close()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+            self.commands = None
+
+    def transcript(self, since=None):
+        """
+        UART lines sent and received (from since, a time.time()) for the log of a failed testcase
+        """
+        if self.connection is None:
+            return []
+        return self.connection.transcript(since)
+
+    def healthy(self):
+        """
+        Port still present (a USB disconnect makes any access fail)
+        """
+        if self.connection is None or not self.connection.is_open:
+            return False
+        try:
+            self.connection.in_waiting
+        except (serial.SerialException, OSError):
+            return False
+        return True
+
+    def reset(self):
+        """
+        Drop bytes left over from the previous DUT and forget the host-side LTE passthrough flag.
+        The firmware itself stays in passthrough mode until it is power cycled.
+        """
+        self.connection.reset_input_buffer()
+        self.connection.reset_output_buffer()
+        self._lte_passthrough = False
 
+    @cancellable
     def uart_write(self, data, resp=False):
-        self.connection.read(1024)
+        token = CancellationToken.current()
+        self.connection.reset_input_buffer()
         for d in data:
             self.connection.write(bytes([d]))
-        time.sleep(0.1)
+        token.sleep(0.1)
         if resp == False:
             return None
         else:
             for j in range(10):
-                time.sleep(0.1)
+                token.sleep(0.1)
                 s = self.connection.readline(1000)
                 if len(s) > 0:
                     return s
         return None
 
-    def reset(self):
-        pass
-
     def enable_ble_passthrough(self, value):
         if value:
             cmd = "b \r\n"
@@ -69,18 +110,14 @@ class JaguarTargetDUT(TargetDUT):
         else:
             pass  # raise Exception("Not implemented")
 
+    @cancellable
     def enable_lte_passthrough(self, value):
         if value:
             self._lte_passthrough = True
-            self.connection.read(1024)
-            cmd = "m \r\n"
-            self.uart_write(bytes(cmd, "utf-8"), resp=False)
-            for i in range(12):
-                resp = self.connection.readline()
-                if b"MODEM TO" in resp:
-                    return True
-                time.sleep(1)
-            return False
+            self.connection.reset_input_buffer()
+            self.connection.write(b"m \r\n")
+            # returns as soon as the firmware acknowledges, a timeout cancels the wait
+            return self.connection.wait_for(rb"MODEM TO", timeout=12) is not None
         else:
             self._lte_passthrough = False
             return True
@@ -99,35 +136,57 @@ class JaguarTargetDUT(TargetDUT):
 
         Returns -1 for error, 0 for low, 1 for high
         """
-        cmd = "6 %s %d     \r" % (port.upper(), pin)
-        resp = self.uart_write(bytes(cmd, "utf-8"), resp=True)
-        try:
-            value = int(resp.strip().split(b":")[1])
-        except Exception as e:
-            self.event_logger.info("JaguarTargetDUT read invalid value %s" % str(resp))
-            return -1
-        return value
+        return self.read_pins([(port, pin)])[0]
+
+    def read_pins(self, pins):
+        """
+        Read several GPIO levels [(port, pin), ...] in one pipelined exchange; -1 for an error
+        """
+        values = self.commands.call_many([DutCommand.read_pin(port, pin) for port, pin in pins])
+        for (port, pin), value in zip(pins, values):
+            if value is None:
+                self.event_logger.info("JaguarTargetDUT read invalid value %s%d" % (port, pin))
+        return [-1 if value is None else value for value in values]
 
     def set_pin(self, port: str, pin: int, value: bool):
-        cmd = "5 %s %d %d    \r" % (port.upper(), pin, value)
-        resp = self.uart_write(bytes(cmd, "utf-8"), resp=False)
+        self.set_pins([(port, pin, value)])
+
+    def set_pins(self, pins):
+        """
+        Set several GPIOs [(port, pin, value), ...] back to back
+        """
+        self.commands.call_many([DutCommand.set_pin(port, pin, value) for port, pin, value in pins])
+
+    def sweep_io(self, writes, reads, fence=None):
+        """
+        One sweep point on the DUT (see jaguar.peripheral.sweep): pin writes [(port, pin, value)] and
+        readbacks sent as one pipelined command sequence. Returns {readback: raw value}; fence
+        (port, pin) adds a read of that pin behind the writes to wait until they are executed.
+        """
+        commands = [DutCommand.set_pin(port, pin, value) for port, pin, value in writes]
+        # readbacks sharing a command (the ADC channels) share its response
+        position = {}
+        slot = {}
+        for r in reads:
+            c = r.command()
+            if c.text not in position:
+                position[c.text] = len(commands)
+                commands.append(c)
+            slot[r] = position[c.text]
+        if fence is not None:
+            commands.append(DutCommand.read_pin(*fence))
+        results = self.commands.call_many(commands)
+        return {r: results[slot[r]] for r in reads}
 
     def read_adc(self):
         """
         Returns 12bit ADC values
         """
         for i in range(self.comms_retry):
-            resp = self.uart_write(b"4\r", resp=True)
-            if resp is None:
-                time.sleep(0.5)
-                continue
-            if b"ADC" in resp:
-                resp = resp.replace(b":", b" ")
-                resp = resp.replace(b",", b" ")
-                _, a, _, b, _, c = (resp.split())
-                print(int(a), int(b), int(c))
-                return (int(a), int(b), int(c))
-            time.sleep(1)
+            values = self.commands.call(DutCommand.read_adc())
+            if values is not None:
+                return values
+            CancellationToken.current().sleep(0.5)
         return -1, -1, -1
 
     def set_dac(self, channel, value):
@@ -144,17 +203,13 @@ class JaguarTargetDUT(TargetDUT):
             self.event_logger.info("JaguarTargetDUT set_dac invalid value")
             return False
 
-        cmd = "2 %d %d\r" % (channel, value)
-        resp = self.uart_write(bytes(cmd, "utf-8"), resp=False)
+        self.commands.call(DutCommand.set_dac(channel, value))
         return True
 
     def read_pulse_count(self):
-        cmd = "3 1 \r"
-        resp = self.uart_write(bytes(cmd, "utf-8"), resp=True)
-        try:
-            count = int(resp.strip().split(b":")[-1])
-        except Exception as e:
-            self.event_logger.info("JaguarTargetDUT read_pulse_count failed %s" % str(e))
+        count = self.commands.call(DutCommand.read_pulse_count())
+        if count is None:
+            self.event_logger.info("JaguarTargetDUT read_pulse_count failed")
             return -1
         return count
 
@@ -0,0 +1,244 @@
+# Imports
+import logging
+import os
+import sys
+import time
+import select
+import argparse
+
+from .jaguar_interface.StoppableThread import StoppableThread
+
+
+# Class to emulate the Jaguar test firmware UART on a pseudo-terminal
+class JaguarTargetDUTSimulator(StoppableThread):
+    """
+    Virtual Jaguar test firmware. Opens a pty and answers the single-character commands of
+    JaguarTargetDUT (see dut_commands) in order, one "\\r" terminated command at a time:
+
+      * "2 <dac> <value>"     stores dac[dac - 1]
+      * "3 1"                 "PULSE COUNT: <n>", then clears the counter
+      * "4"                   "ADC1: <a>, ADC2: <b>, ADC3: <c>" from adc
+      * "5 <port> <pin> <v>"  stores pins[(port, pin)]
+      * "6 <port> <pin>"      "<port><pin>: <level>" from pins (0 if never set)
+      * "p", "b", "m"         sleep / BLE and LTE passthrough acknowledgements; with a modem
+                              (UBloxSaraSimulator(realtime=False)) everything after "m" goes to it
+
+    Each command costs `latency` seconds of firmware time plus the UART byte time at baudrate in
+    both directions. latency_timer > 0 models a USB-serial bridge (FTDI latency timer): responses
+    are held until the timer expires or a USB packet (62 bytes) is full. Tests change pins, adc and
+    pulse_count directly to stand in for the fixture.
+
+    Point the software at it with JaguarTargetDUT(port=sim.port).
+    """
+
+    USB_PACKET = 62
+
+    def __init__(self, latency=0.002, baudrate=115200, latency_timer=0.0, modem=None, realtime=True, logger=None):
+
+        super(JaguarTargetDUTSimulator, self).__init__(daemon=True)
+
+        # Handle self.logger argument defaulting
+        if logger is None:
+            self.logger = logging.getLogger(self.__class__.__name__)
+        elif not hasattr(logger, "getChild"):
+            self.logger = logger
+        else:
+            self.logger = logger.getChild(self.__class__.__name__)
+
+        self.latency = latency
+        self.baudrate = baudrate
+        self.latency_timer = latency_timer
+        self.modem = modem
+        self.realtime = realtime
+
+        # Firmware state
+        self.pins = {}
+        self.adc = [0, 0, 0]
+        self.dac = [0, 0]
+        self.pulse_count = 0
+        self.passthrough = False
+
+        # Statistics
+        self.commands = 0
+        self.responses = 0
+        self.unknown = 0
+
+        self.rx_buffer = b""
+        self.tx_buffer = b""
+        self.tx_since = None
+        self.handlers = {
+            b"2": self.cmd_set_dac,
+            b"3": self.cmd_read_pulse_count,
+            b"4": self.cmd_read_adc,
+            b"5": self.cmd_set_pin,
+            b"6": self.cmd_read_pin,
+            b"p": lambda args: b"SLEEP",
+            b"b": lambda args: b"BLE PASSTHROUGH",
+            b"m": self.cmd_modem,
+        }
+
+        # Raw pty so the line discipline never touches the stream
+        self.master, self.slave = os.openpty()
+        try:
+            import tty
+            tty.setraw(self.slave)
+        except ImportError:
+            pass
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+
+        if self.realtime:
+            self.start()
+
+    def close(self):
+        if self.is_alive():
+            self.stop()
+            self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    # ---------- commands ----------
+
+    def cmd_set_dac(self, args):
+        dac, value = int(args[0]), int(args[1])
+        if 1 <= dac <= 2:
+            self.dac[dac - 1] = value
+
+    def cmd_read_pulse_count(self, args):
+        count, self.pulse_count = self.pulse_count, 0
+        return b"PULSE COUNT: %d" % count
+
+    def cmd_read_adc(self, args):
+        return b"ADC1: %d, ADC2: %d, ADC3: %d" % tuple(self.adc)
+
+    def cmd_set_pin(self, args):
+        self.pins[(args[0].decode(), int(args[1]))] = int(args[2])
+
+    def cmd_read_pin(self, args):
+        port, pin = args[0].decode(), int(args[1])
+        return b"%s%d: %d" % (port.encode(), pin, self.pins.get((port, pin), 0))
+
+    def cmd_modem(self, args):
+        self.passthrough = self.modem is not None
+        return b"MODEM TO PC"
+
+    def handle(self, command):
+        """
+        Execute one command (without its terminator); the response line or None
+        """
+        fields = command.split()
+        if not fields:
+            return None
+        self.commands += 1
+        handler = self.handlers.get(fields[0])
+        if handler is None:
+            self.unknown += 1
+            self.logger.debug("%s - %s: unknown command %r" % (self.__class__.__name__, self.handle.__name__,
+                                                                command))
+            return None
+        try:
+            return handler(fields[1:])
+        except (IndexError, ValueError):
+            self.unknown += 1
+            return None
+
+    def byte_time(self, n):
+        return n * 10.0 / self.baudrate
+
+    def receive(self):
+        """
+        Execute every complete command written so far and send the responses
+        """
+        while True:
+            try:
+                data = os.read(self.master, 4096)
+            except (BlockingIOError, OSError):
+                break
+            if not data:
+                break
+            self.rx_buffer += data
+        while b"\r" in self.rx_buffer and not self.passthrough:
+            command, self.rx_buffer = self.rx_buffer.split(b"\r", 1)
+            time.sleep(self.latency + self.byte_time(len(command) + 1))
+            response = self.handle(command)
+            if response is not None:
+                response += b"\r\n"
+                time.sleep(self.byte_time(len(response)))
+                self.responses += 1
+                self.send(response)
+        if self.passthrough and self.rx_buffer:
+            self.modem.input(self.rx_buffer.lstrip(b"\n"))
+            self.rx_buffer = b""
+
+    def send(self, data):
+        if self.latency_timer > 0:
+            if not self.tx_buffer:
+                self.tx_since = time.monotonic()
+            self.tx_buffer += data
+            while len(self.tx_buffer) >= self.USB_PACKET:
+                self.write(self.tx_buffer[:self.USB_PACKET])
+                self.tx_buffer = self.tx_buffer[self.USB_PACKET:]
+                self.tx_since = time.monotonic()
+            return True
+        return self.write(data)
+
+    def flush(self):
+        if self.tx_buffer and time.monotonic() - self.tx_since >= self.latency_timer:
+            self.write(self.tx_buffer)
+            self.tx_buffer = b""
+
+    def write(self, data):
+        try:
+            os.write(self.master, data)
+            return True
+        except (BlockingIOError, OSError):
+            # Nobody reading the slave side; behave like a UART with no listener
+            return False
+
+    # ---------- thread ----------
+
+    def run(self):
+        while not self.stopped():
+            timeout = 0.1
+            if self.tx_buffer:
+                timeout = max(0.0, self.tx_since + self.latency_timer - time.monotonic())
+            if self.passthrough and self.modem.next_due() is not None:
+                timeout = min(timeout, max(0.0, self.modem.next_due() - time.monotonic()))
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                self.receive()
+            if self.passthrough:
+                data = self.modem.poll()
+                if data:
+                    self.send(data)
+            self.flush()
+
+    def stats(self):
+        return {"commands": self.commands, "responses": self.responses, "unknown": self.unknown}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.INFO,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Virtual Jaguar test firmware on a pseudo-terminal")
+    parser.add_argument('--latency', type=float, default=0.002, help="firmware time per command (s)")
+    parser.add_argument('--baud', type=int, default=115200)
+    parser.add_argument('--latency-timer', type=float, default=0.0, help="USB-serial latency timer (s), e.g. 0.016")
+    parser.add_argument('--link', help="also expose the pty under this path (symlink)")
+    args = parser.parse_args()
+
+    sim = JaguarTargetDUTSimulator(latency=args.latency, baudrate=args.baud, latency_timer=args.latency_timer)
+    if args.link:
+        if os.path.lexists(args.link):
+            os.remove(args.link)
+        os.symlink(sim.port, args.link)
+
+    logging.info("Simulated test firmware on %s%s" % (sim.port, " -> %s" % args.link if args.link else ""))
+    try:
+        while True:
+            time.sleep(5)
+            logging.info("%s" % sim.stats())
+    except KeyboardInterrupt:
+        sim.close()
+        sys.exit()
@@ -11,18 +11,29 @@ class JaguarSlot(SlotSingle):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._dut_present = None
 
     def state_init_enter(self):
-        self.interface = JaguarInterface()
+        c = self.slot_config
+        self.interface = JaguarInterface(port=c.get("interface_port"), leds=c.get("leds"))
         self.device_list["interface"] = self.interface
-        self.programmer = STM32CubeProgrammer()
+        self.programmer = STM32CubeProgrammer(serial_number=c.get("programmer_sn"))
         self.device_list["programmer"] = self.programmer
-        self.ble = BLE()
+        self.ble = BLE(port=c.get("ble_port"), keep_open=True)
         self.device_list["ble"] = self.ble
 
         self.open_detected = False
+        # registered with the interface, survives a reopen of the fixture link
+        self.interface.add_update_callback(self._fixture_update)
         super().state_init_enter()
 
+    def _fixture_update(self, state):
+        # Serial receive thread: wake the slot as soon as the DUT detect input changes
+        present = self.interface.interface.dut_present(state)
+        if present != self._dut_present:
+            self._dut_present = present
+            self.wake()
+
     def state_empty_run(self):
         if self.job.is_complete():
             self.state_transition(SlotState.COMPLETE)
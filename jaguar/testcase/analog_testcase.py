@@ -1,6 +1,9 @@
 import time
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from jaguar.peripheral.sweep import SweepPlan, SweepPoint, Readback
+from birch.testcase.testcase import Resource
 
 
 class AnalogTestCase(JaguarTestCase):
@@ -19,15 +22,23 @@ class AnalogTestCase(JaguarTestCase):
                  else safe fallback
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET)
+
     def __init__(self,
                  vlow_min=0, vlow_max=0.05,
                  vmid_min=0.5, vmid_max=0.6,
                  vhigh_min=1.0, vhigh_max=1.2,
                  vsys_min=1.7, vsys_max=1.8,
                  board_type='V1',
+                 dac_settle=0.2,
                  *args, **kwargs):
+        """
+        dac_settle: longest wait for a DAC level to settle before its DUT readback is final; a readback
+        inside the threshold band is taken as soon as the fixture has applied the level (see SweepPlan)
+        """
         super().__init__(*args, **kwargs)
         self.board_type = board_type
+        self.dac_settle = dac_settle
         self.vsys_min = vsys_min
         self.vsys_max = vsys_max
         self._used_v3_power = False
@@ -52,66 +63,14 @@ class AnalogTestCase(JaguarTestCase):
     # -------------------- Power Setup --------------------
 
     def _setup_power_v3(self):
-        print("Setup[V3]: ensuring battery power path...")
-        # DC OFF
-        try:
-            self.interface.dc_power_en(False)
-            print("  DC power -> OFF")
-        except Exception:
-            pass
-
-        # Optional dedicated V3 rail
-        try:
-            if hasattr(self.interface, "v3_power_en"):
-                self.interface.v3_power_en(True)
-                self._used_v3_power = True
-                print("  V3 power -> ON")
-        except Exception:
-            self._used_v3_power = False
-
-        # Battery ON + helpful rails
-        for fn_name, desc in [
-            ("battery_power_en", "Battery -> ON"),
-            ("gpio_enable", "GPIO -> ON"),
-            ("rs232_enable", "RS232 -> ON"),
-        ]:
-            try:
-                getattr(self.interface, fn_name)(True)
-                print(f"  {desc}")
-            except Exception:
-                pass
-
-        # Analog measurement path ON
-        self.interface.analog_enable(True)
-        print("  Analog path -> ENABLED")
-        time.sleep(0.5)
+        print("Setup[V3]: battery power path, DC OFF, V3/GPIO/RS232/analog ON")
+        self._used_v3_power = hasattr(self.interface, "v3_power_en")
+        self.apply_rails(RailProfile(dc=False, bat=True, v3=self._used_v3_power or None, gpio=True, rs232=True,
+                                     analog=True))
 
     def _setup_power_legacy(self):
-        print("Setup[Legacy]: enabling DC power path...")
-        try:
-            self.interface.gpio_enable(True)
-            print("  GPIO -> ON")
-        except Exception:
-            pass
-        try:
-            self.interface.rs232_enable(True)
-            print("  RS232 -> ON")
-        except Exception:
-            pass
-        try:
-            self.interface.dc_power_en(True)
-            print("  DC power -> ON")
-        except Exception:
-            pass
-        try:
-            self.interface.battery_power_en(False)
-            print("  Battery -> OFF")
-        except Exception:
-            pass
-
-        self.interface.analog_enable(True)
-        print("  Analog path -> ENABLED")
-        time.sleep(0.5)
+        print("Setup[Legacy]: DC power path, battery OFF, GPIO/RS232/analog ON")
+        self.apply_rails(RailProfile(dc=True, bat=False, gpio=True, rs232=True, analog=True))
 
     def setup(self):
         print("\n=== ANALOG_TEST ===")
@@ -130,7 +89,6 @@ class AnalogTestCase(JaguarTestCase):
         V1 only: Apply voltages to analog inputs, read back over serial port.
         Uses same math and error codes as legacy implementation.
         """
-        result = True
         values = [[-1, -1], [-1, -1], [-1, -1]]
 
         sys_voltage = self.interface.sys_voltage()
@@ -138,29 +96,24 @@ class AnalogTestCase(JaguarTestCase):
         def adc_to_v(a):
             return a / 4096 * sys_voltage
 
+        levels = [0, 128, 255]
+        points = []
         for dac_index, dac in enumerate([1, 2]):
-            for level, input_val in enumerate([0, 128, 255]):
-                try:
-                    self.interface.set_dac(dac, input_val)
-                except Exception:
-                    pass
-                time.sleep(0.2)
-                readback = self.target.read_adc()[dac_index]
-                if readback == -1:
-                    result = False
-                    self.log_error(self.ErrorCode.adc_not_read)
-                v_dut = adc_to_v(readback)
-
-                values[level][dac_index] = v_dut
-
+            for level, input_val in enumerate(levels):
                 th_min, th_max = self.thresholds[level]
-                if th_min > v_dut:
-                    result = False
-                    self.log_error(self.ErrorCode.adc_vmin_exceeded)
-                if th_max < v_dut:
-                    result = False
-                    self.log_error(self.ErrorCode.adc_vmax_exceeded)
-        return {"result": result, "values": values, "vsys": sys_voltage}
+                points.append(SweepPoint("DAC%d=%d" % (dac, input_val), fixture=[("set_dac", dac, input_val)],
+                                         read=[Readback("adc", dac_index, lo=th_min, hi=th_max, convert=adc_to_v,
+                                                        error_lo=self.ErrorCode.adc_vmin_exceeded,
+                                                        error_hi=self.ErrorCode.adc_vmax_exceeded,
+                                                        error_missing=self.ErrorCode.adc_not_read)],
+                                         settle=self.dac_settle))
+        sweep = self.run_sweep(SweepPlan(points))
+
+        for dac_index, dac in enumerate([1, 2]):
+            for level, input_val in enumerate(levels):
+                v_dut = sweep["DAC%d=%d" % (dac, input_val)].values["ADC%d" % (dac_index + 1)]
+                values[level][dac_index] = -1 if v_dut is None else v_dut
+        return {"result": sweep.passed, "values": values, "vsys": sys_voltage, "points": sweep.log()}
 
     def analog_vsys_level(self):
         """
@@ -241,51 +194,5 @@ class AnalogTestCase(JaguarTestCase):
         except Exception:
             pass
 
-        # Disable helper rails if present
-        for fn_name, desc in [
-            ("gpio_enable", "GPIO -> OFF"),
-            ("rs232_enable", "RS232 -> OFF"),
-        ]:
-            try:
-                getattr(self.interface, fn_name)(False)
-                print(f"  {desc}")
-            except Exception:
-                pass
-
-        # Analog path off
-        try:
-            self.interface.analog_enable(False)
-            print("  Analog path -> DISABLED")
-        except Exception:
-            pass
-
-        # Power rails off (handle both legacy and V3 paths)
-        if self.board_type == 'V3':
-            try:
-                self.interface.battery_power_en(False)
-                print("  Battery -> OFF")
-            except Exception:
-                pass
-            if self._used_v3_power:
-                try:
-                    self.interface.v3_power_en(False)
-                    print("  V3 power -> OFF")
-                except Exception:
-                    pass
-            try:
-                self.interface.dc_power_en(False)
-                print("  DC power -> OFF")
-            except Exception:
-                pass
-        else:
-            # Legacy leaves DC ON during test; turn it off on exit
-            try:
-                self.interface.dc_power_en(False)
-                print("  DC power -> OFF")
-            except Exception:
-                pass
-            try:
-                self.interface.battery_power_en(False)
-                print("  Battery -> OFF")
-            except Exception:
-                pass
+        # Rails, helper lines and analog path are left for the next testcase
+        self.release_rails()
@@ -1,8 +1,9 @@
 import time
-from statistics import mean
 import re
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from birch.testcase.testcase import Resource
 from birch.peripheral.ble_module import UBloxNina
 
 
@@ -16,6 +17,10 @@ class BLETestCase(JaguarTestCase):
             Current prefers battery rail reader if available, else falls back to dc_current().
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET, Resource.BLE)
+    # leaves the DUT firmware in passthrough mode
+    release_cold = True
+
     def __init__(self,
                  scan_duration=10,
                  min_rssi=-50,
@@ -56,9 +61,11 @@ class BLETestCase(JaguarTestCase):
         self.board_type = board_type
         self._used_v3_power = False
 
+        # passthrough and the NINA link are set up again on every attempt; module info (MAC) and
+        # the scan result stay valid for a retry
         self.append_step("Acquire NINA", self.configure)
-        self.append_step("Read BLE info", self.read_info)
-        self.append_step("Scanning", self.scan)
+        self.append_step("Read BLE info", self.read_info, checkpoint=True)
+        self.append_step("Scanning", self.scan, checkpoint=True)
         self.append_step("Connect", self.connect)
         self.append_step("Measure current", self.ble_current)
         self.append_step("Disconnect", self.disconnect)
@@ -67,59 +74,16 @@ class BLETestCase(JaguarTestCase):
 
     def _setup_power_v1_v2(self):
         """
-        Legacy path (matches original V2 behavior):
-          DC OFF -> Battery OFF -> small delay -> DC ON -> RS232 ON
+        Legacy path: DC ON, Battery OFF, RS232 ON
         """
-        try:
-            self.interface.dc_power_en(False)
-        except Exception:
-            pass
-        try:
-            self.interface.battery_power_en(False)
-        except Exception:
-            pass
-        time.sleep(0.1)
-        try:
-            self.interface.dc_power_en(True)
-        except Exception:
-            pass
-        try:
-            self.interface.rs232_enable(True)
-        except Exception:
-            pass
+        self.apply_rails(RailProfile(dc=True, bat=False, rs232=True))
 
     def _setup_power_v3(self):
         """
-        V3 path (battery power):
-          DC OFF -> Battery OFF (brief) -> v3_power_en(True) if available -> Battery ON -> RS232 ON
+        V3 path (battery power): DC OFF, v3_power_en(True) if available, Battery ON, RS232 ON
         """
-        try:
-            self.interface.dc_power_en(False)
-        except Exception:
-            pass
-        # ensure clean start on battery rail
-        try:
-            self.interface.battery_power_en(False)
-        except Exception:
-            pass
-        time.sleep(0.1)
-
-        # Optional dedicated V3 rail
-        try:
-            if hasattr(self.interface, "v3_power_en"):
-                self.interface.v3_power_en(True)
-                self._used_v3_power = True
-        except Exception:
-            self._used_v3_power = False
-
-        try:
-            self.interface.battery_power_en(True)
-        except Exception:
-            pass
-        try:
-            self.interface.rs232_enable(True)
-        except Exception:
-            pass
+        self._used_v3_power = hasattr(self.interface, "v3_power_en")
+        self.apply_rails(RailProfile(dc=False, bat=True, v3=self._used_v3_power or None, rs232=True))
 
     def setup(self):
         """
@@ -138,7 +102,7 @@ class BLETestCase(JaguarTestCase):
             self._setup_power_v3()
 
         # Give rails / module time to come up
-        time.sleep(1)
+        self.sleep(1)
 
     # ---------------------- Steps ----------------------
 
@@ -148,7 +112,7 @@ class BLETestCase(JaguarTestCase):
         # now we should have a nina
         self.nina = UBloxNina(self.target.connection)
         # check if we have communication
-        time.sleep(0.5)
+        self.sleep(0.5)
         result = False
         for _ in range(3):
             try:
@@ -157,7 +121,7 @@ class BLETestCase(JaguarTestCase):
                 result = False
             if result:
                 break
-            time.sleep(1)
+            self.sleep(1)
         if not result:
             self.log_error(self.ErrorCode.ble_communication_failed)
         return {"result": result}
@@ -250,6 +214,8 @@ class BLETestCase(JaguarTestCase):
     def connect(self):
         if getattr(self.target, "ble_mac", "") == "":
             return {"result": False}
+        # the module may report the connection before ble.connect() returns
+        since = time.time()
         try:
             result = self.ble.connect(self.target.ble_mac)
         except Exception:
@@ -259,43 +225,22 @@ class BLETestCase(JaguarTestCase):
             self.log_error(self.ErrorCode.ble_connect_from_host_failed)
             return {"result": result}
 
-        result, host_mac = self.nina.wait_for_connect(2)
+        result, host_mac = self.nina.wait_for_connect(2, since=since)
         if not result:
             self.log_error(self.ErrorCode.ble_connect_to_module_failed)
             return {"result": result}
 
         return {"result": result, "host_mac": host_mac}
 
-    def _read_current_once(self):
-        """
-        Single-sample current read according to board_type.
-        V3 prefers a battery rail reader if available, else dc_current.
-        """
-        if self.board_type == "V3":
-            # Try common battery current reader names
-            for name in ("bat_current", "battery_current", "current_batt", "vbatt_current"):
-                if hasattr(self.interface, name):
-                    try:
-                        return float(getattr(self.interface, name)())
-                    except Exception:
-                        pass
-        # Fallback / legacy
-        try:
-            return float(self.interface.dc_current())
-        except Exception:
-            return 0.0
-
     def ble_current(self):
         result = True
-        samples = []
-        for _ in range(self.samples):
-            time.sleep(0.1)
-            try:
-                samples.append(self._read_current_once())
-            except Exception:
-                samples.append(0.0)
-
-        avg_i = mean(samples) if samples else 0.0
+        # V3 is powered from the battery rail, legacy boards from DC
+        channel = "battery_current" if self.board_type == "V3" else "dc_current"
+        try:
+            w = self.interface.capture(channel, n=self.samples)
+            avg_i = w.mean(channel) if len(w) else 0.0
+        except Exception:
+            avg_i = 0.0
 
         if avg_i < self.i_min:
             self.log_error(self.ErrorCode.ble_current_min)
@@ -318,35 +263,5 @@ class BLETestCase(JaguarTestCase):
         except Exception:
             pass
 
-        # Power down safely for both paths
-        if self.board_type == "V3":
-            try:
-                self.interface.rs232_enable(False)
-            except Exception:
-                pass
-            try:
-                self.interface.battery_power_en(False)
-            except Exception:
-                pass
-            if self._used_v3_power:
-                try:
-                    self.interface.v3_power_en(False)
-                except Exception:
-                    pass
-            try:
-                self.interface.dc_power_en(False)
-            except Exception:
-                pass
-        else:
-            try:
-                self.interface.rs232_enable(False)
-            except Exception:
-                pass
-            try:
-                self.interface.dc_power_en(False)
-            except Exception:
-                pass
-            try:
-                self.interface.battery_power_en(False)
-            except Exception:
-                pass
+        # Rails are left for the next testcase
+        self.release_rails()
@@ -1,6 +1,9 @@
 import time
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from jaguar.peripheral.sweep import SweepPlan, SweepPoint, Readback
+from birch.testcase.testcase import Resource
 
 
 class DigitalTestCase(JaguarTestCase):
@@ -13,6 +16,8 @@ class DigitalTestCase(JaguarTestCase):
       - V3: DC OFF, Battery ON (and v3_power_en(True) if available), GPIO/RS232 ON
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET)
+
     def __init__(self, board_type='V1', *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.board_type = board_type
@@ -30,74 +35,16 @@ class DigitalTestCase(JaguarTestCase):
 
     def _setup_v1(self):
         # Legacy V1: DC on, Battery off, GPIO/RS232 on
-        try:
-            self.interface.dc_power_en(True)
-        except Exception:
-            pass
-        try:
-            self.interface.gpio_enable(True)
-        except Exception:
-            pass
-        try:
-            self.interface.rs232_enable(True)
-        except Exception:
-            pass
-        try:
-            self.interface.battery_power_en(False)
-        except Exception:
-            pass
-        time.sleep(0.5)
+        self.apply_rails(RailProfile(dc=True, bat=False, gpio=True, rs232=True))
 
     def _setup_v2(self):
-        # V2: same as legacy, but WITHOUT any redundant re-enables
-        try:
-            self.interface.dc_power_en(True)
-        except Exception:
-            pass
-        try:
-            self.interface.gpio_enable(True)
-        except Exception:
-            pass
-        try:
-            self.interface.rs232_enable(True)
-        except Exception:
-            pass
-        try:
-            self.interface.battery_power_en(False)
-        except Exception:
-            pass
-        time.sleep(0.5)
+        # V2: same as legacy
+        self.apply_rails(RailProfile(dc=True, bat=False, gpio=True, rs232=True))
 
     def _setup_v3(self):
         # V3: battery-powered path; DC OFF, optional v3 rail ON
-        try:
-            self.interface.dc_power_en(False)
-        except Exception:
-            pass
-        # ensure battery was off, then bring it up cleanly
-        try:
-            self.interface.battery_power_en(False)
-        except Exception:
-            pass
-        time.sleep(0.1)
-        try:
-            if hasattr(self.interface, "v3_power_en"):
-                self.interface.v3_power_en(True)
-        except Exception:
-            pass
-        try:
-            self.interface.battery_power_en(True)
-        except Exception:
-            pass
-        try:
-            self.interface.gpio_enable(True)
-        except Exception:
-            pass
-        try:
-            self.interface.rs232_enable(True)
-        except Exception:
-            pass
-        time.sleep(0.5)
+        self.apply_rails(RailProfile(dc=False, bat=True, v3=hasattr(self.interface, "v3_power_en") or None,
+                                     gpio=True, rs232=True))
 
     def setup(self):
         if 'V3' in self.board_type:
@@ -108,40 +55,8 @@ class DigitalTestCase(JaguarTestCase):
             self._setup_v1()
 
     def teardown(self):
-        # Common shutdown
-        try:
-            self.interface.gpio_enable(False)
-        except Exception:
-            pass
-        try:
-            self.interface.rs232_enable(False)
-        except Exception:
-            pass
-
-        # Power down rails safely
-        if 'V3' in self.board_type:
-            try:
-                self.interface.battery_power_en(False)
-            except Exception:
-                pass
-            try:
-                if hasattr(self.interface, "v3_power_en"):
-                    self.interface.v3_power_en(False)
-            except Exception:
-                pass
-            try:
-                self.interface.dc_power_en(False)
-            except Exception:
-                pass
-        else:
-            try:
-                self.interface.dc_power_en(False)
-            except Exception:
-                pass
-            try:
-                self.interface.battery_power_en(False)
-            except Exception:
-                pass
+        # Rails and GPIO/RS232 are left for the next testcase
+        self.release_rails()
 
     # --------------------- Test steps ---------------------
 
@@ -149,45 +64,24 @@ class DigitalTestCase(JaguarTestCase):
         """
         DIGIN1, DIGIN2 to jaguar, read back via serial
         """
-        result = True
         delay = 0.2
 
-        # DIGIN1 = B4
-        self.interface.set_dig_in(0, False)
-        time.sleep(delay)
-        self.interface.set_dig_in(1, False)
-        time.sleep(delay)
-        resp = self.target.read_pin("B", 4)
-        if resp != 0:
-            self.log_error(self.ErrorCode.digin1_clear_failed)
-            result = False
-
-        self.interface.set_dig_in(0, True)
-        time.sleep(delay)
-        resp = self.target.read_pin("B", 4)
-        if resp != 1:
-            self.log_error(self.ErrorCode.digin1_set_failed)
-            result = False
-
-        resp = self.target.read_pin("B", 3)
-        time.sleep(delay)
-        if resp != 0:
-            self.log_error(self.ErrorCode.digin2_clear_failed)
-            result = False
-
-        self.interface.set_dig_in(1, True)
-        time.sleep(delay)
-        resp = self.target.read_pin("B", 3)
-        if resp != 1:
-            self.log_error(self.ErrorCode.digin2_set_failed)
-            result = False
-
-        self.interface.set_dig_in(0, False)
-        time.sleep(delay)
-        self.interface.set_dig_in(1, False)
-        time.sleep(delay)
-
-        return {"result": result}
+        def pin(port, number, level, error):
+            return [Readback("pin", (port, number), expect=level, error=error)]
+
+        sweep = self.run_sweep(SweepPlan([
+            # DIGIN1 = B4
+            SweepPoint("DIGIN1 clear", fixture=[("set_dig_in", 0, False), ("set_dig_in", 1, False)],
+                       read=pin("B", 4, 0, self.ErrorCode.digin1_clear_failed), settle=delay),
+            SweepPoint("DIGIN1 set", fixture=[("set_dig_in", 0, True)],
+                       read=pin("B", 4, 1, self.ErrorCode.digin1_set_failed), settle=delay),
+            # DIGIN2 = B3
+            SweepPoint("DIGIN2 clear", read=pin("B", 3, 0, self.ErrorCode.digin2_clear_failed), settle=delay),
+            SweepPoint("DIGIN2 set", fixture=[("set_dig_in", 1, True)],
+                       read=pin("B", 3, 1, self.ErrorCode.digin2_set_failed), settle=delay),
+            SweepPoint("release", fixture=[("set_dig_in", 0, False), ("set_dig_in", 1, False)], settle=delay),
+        ]))
+        return {"result": sweep.passed, "points": sweep.log()}
 
     def digital_out(self):
         """
@@ -205,84 +99,40 @@ class DigitalTestCase(JaguarTestCase):
             - set high
             - compare
         """
-        result = True
         d = 0.2
-        self.interface.dig_out_power_enable(True)
-        self.target.set_pin("A", 15, 0)
-        time.sleep(d)
-        self.target.set_pin("C", 0, 0)
-        time.sleep(d)
-        self.target.set_pin("C", 11, 0)
-        time.sleep(d)
-        self.target.set_pin("C", 12, 0)
-        time.sleep(d)
-
-        # all clear
-        dig_out = self.interface.read_dig_out()
-        if dig_out != (True, True, True, True):
-            self.log_error(self.ErrorCode.digout_clear_failed)
-            result = False
-
-        # DIG_OUT1
-        self.target.set_pin("A", 15, 1)
-        time.sleep(d)
-        dig_out = self.interface.read_dig_out()
-        if dig_out[0] is not False:
-            self.log_error(self.ErrorCode.digout1_set_failed)
-            result = False
-        self.target.set_pin("A", 15, 0)
-
-        # C0
-        self.target.set_pin("C", 0, 1)
-        time.sleep(d)
-        dig_out = self.interface.read_dig_out()
-        if dig_out[1] is not False:
-            self.log_error(self.ErrorCode.digout2_set_failed)
-            result = False
-        self.target.set_pin("C", 0, 0)
-
-        # C11
-        self.target.set_pin("C", 11, 1)
-        time.sleep(d)
-        dig_out = self.interface.read_dig_out()
-        if dig_out[2] is not False:
-            self.log_error(self.ErrorCode.digout3_set_failed)
-            result = False
-        self.target.set_pin("C", 11, 0)
-
-        # C12
-        self.target.set_pin("C", 12, 1)
-        time.sleep(d)
-        dig_out = self.interface.read_dig_out()
-        if dig_out[3] is not False:
-            self.log_error(self.ErrorCode.digout4_set_failed)
-            result = False
-        self.target.set_pin("C", 12, 0)
+        pins = [("A", 15), ("C", 0), ("C", 11), ("C", 12)]
+        errors = [self.ErrorCode.digout1_set_failed, self.ErrorCode.digout2_set_failed,
+                  self.ErrorCode.digout3_set_failed, self.ErrorCode.digout4_set_failed]
+
+        # all clear, then each output high on its own (the previous one back low)
+        points = [SweepPoint("clear", dut=[(port, pin, 0) for port, pin in pins],
+                             read=[Readback("dig_out", i, expect=True, error=self.ErrorCode.digout_clear_failed)
+                                   for i in range(4)], settle=d)]
+        for i, (port, pin) in enumerate(pins):
+            writes = ([pins[i - 1] + (0,)] if i else []) + [(port, pin, 1)]
+            points.append(SweepPoint("DIG_OUT%d" % (i + 1), dut=writes,
+                                     read=[Readback("dig_out", i, expect=False, error=errors[i])], settle=d))
+        points.append(SweepPoint("release", dut=[pins[-1] + (0,)], settle=d))
 
+        self.interface.dig_out_power_enable(True)
+        sweep = self.run_sweep(SweepPlan(points))
         self.interface.dig_out_power_enable(False)
-        return {"result": result}
+        return {"result": sweep.passed, "points": sweep.log()}
 
     def magnetic_switch(self):
         """
         Enable, disable electromagnet, read back pin.
         """
-        result = True
         d = 1
-
-        self.interface.set_electromagnet(0, False)
-        time.sleep(d)
-        readback = self.target.read_pin("A", 0)
-        if readback != 1:
-            result = False
-            self.log_error(self.ErrorCode.mag_sense)
-        self.interface.set_electromagnet(0, True)
-        time.sleep(d)
-        readback = self.target.read_pin("A", 0)
-        if readback != 0:
-            result = False
-            self.log_error(self.ErrorCode.mag_sense)
+        sweep = self.run_sweep(SweepPlan([
+            SweepPoint("magnet off", fixture=[("set_electromagnet", 0, False)],
+                       read=[Readback("pin", ("A", 0), expect=1, error=self.ErrorCode.mag_sense)], settle=d),
+            SweepPoint("magnet on", fixture=[("set_electromagnet", 0, True)],
+                       read=[Readback("pin", ("A", 0), expect=0, error=self.ErrorCode.mag_sense)], settle=d),
+        ]))
+        # informational: a failed readback is logged but does not fail the step
         result = True
-        return {"result": result}
+        return {"result": result, "points": sweep.log()}
 
     def pulse_input(self):
         """
@@ -310,10 +160,10 @@ class DigitalTestCase(JaguarTestCase):
                 try:
                     self.interface.pulse(1, 0)
                     print(f"[PULSE] Toggle {j+1}/{i} -> LOW")
-                    time.sleep(d)
+                    self.sleep(d)
                     self.interface.pulse(1, 1)
                     print(f"[PULSE] Toggle {j+1}/{i} -> HIGH")
-                    time.sleep(d)
+                    self.sleep(d)
                 except Exception as e:
                     print(f"[PULSE][ERROR] Toggle {j+1} failed: {e}")
                     self.log_error(self.ErrorCode.pulse_count_mismatch)
@@ -2,6 +2,7 @@ import time
 import socket
 
 from .jaguar_testcase import JaguarTestCase
+from birch.testcase.testcase import Resource
 
 
 class InternetConnectionTestCase(JaguarTestCase):
@@ -16,6 +17,8 @@ class InternetConnectionTestCase(JaguarTestCase):
       • Log concise diagnostics; raise no_internet_connection on total fail
     """
 
+    resources = (Resource.NETWORK,)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.internet_connection = False
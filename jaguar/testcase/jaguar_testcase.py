@@ -1,4 +1,5 @@
 from birch.testcase.testcase import TestCase
+from birch.test_status import TestStatus
 
 
 class JaguarTestCase(TestCase):
@@ -6,6 +7,10 @@ class JaguarTestCase(TestCase):
     Parent class of all jaguar test cases
     """
 
+    # The DUT firmware only leaves the LTE/BLE passthrough modes on a power cycle; testcases that
+    # switch it into one power off in teardown even after a PASS
+    release_cold = False
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -13,3 +18,28 @@ class JaguarTestCase(TestCase):
         self.interface = self.device_list["interface"]
         self.ble = self.device_list["ble"]
         self.programmer = self.device_list["programmer"]
+
+    def apply_rails(self, profile):
+        """
+        Setup: bring the fixture to the rail profile this testcase needs (see JaguarInterface.apply_rails)
+        """
+        return self.interface.apply_rails(profile)
+
+    def release_rails(self):
+        """
+        Teardown: leave the rails for the next testcase to reuse. After a failure, or when the
+        testcase changed the firmware mode (release_cold), the DUT is powered off and discharged
+        straight away, so the next testcase or retry starts from a cold boot.
+        """
+        self.interface.release_rails(cold=self.release_cold or self.status != TestStatus.PASS)
+
+    def run_sweep(self, plan):
+        """
+        Run a SweepPlan on the fixture and the DUT and log the errors of every failed point.
+        Returns the SweepResult; its log() gives the per-point entries for the step data.
+        """
+        result = plan.run(self.interface, self.target)
+        for p in result.points:
+            for error in dict.fromkeys(p.errors.values()):
+                self.log_error(error)
+        return result
@@ -2,9 +2,10 @@ import time
 import re
 import logging
 import contextlib
-from statistics import mean
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from birch.testcase.testcase import Resource
 from birch.peripheral.lte_module import UBloxSara
 
 
@@ -56,8 +57,17 @@ class _ReadableLogMixin:
 class LTETestCase(_ReadableLogMixin, JaguarTestCase):
     """
     Read information from LTE module, including network & signal strength
+
+    Network registration is followed from the modem's +CEREG/+CREG/+CGEV notifications from
+    acquire on, so the module and network information reads run while it registers. The
+    "Network registration" step waits up to register_time / context_time seconds (None: no wait,
+    no requirement) and records time_to_register and time_to_data_context, from modem power-up.
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET)
+    # leaves the DUT firmware in passthrough mode
+    release_cold = True
+
     def __init__(self,
                  detect_time=10,
                  samples=10,
@@ -75,6 +85,8 @@ class LTETestCase(_ReadableLogMixin, JaguarTestCase):
                  creg=None,
                  csq_power=None,
                  csq_quality=None,
+                 register_time=None,
+                 context_time=None,
                  *args, **kwargs):
 
         super().__init__(*args, **kwargs)
@@ -99,10 +111,16 @@ class LTETestCase(_ReadableLogMixin, JaguarTestCase):
         self.csq_power = csq_power
         self.csq_quality = csq_quality
 
+        # network registration / data context waits (s), None: not required
+        self.register_time = register_time
+        self.context_time = context_time
+
         self.sara = None
+        self.powered = None
         self.append_step("Acquire SARA", self.acquire)
-        self.append_step("Read module information", self.read_info)
+        self.append_step("Read module information", self.read_info, checkpoint=True)
         self.append_step("Read network information", self.read_network_info)
+        self.append_step("Network registration", self.network_registration)
         self.append_step("Measure power", self.lte_power)
 
     # -------------------------------------------------------------------------
@@ -111,23 +129,18 @@ class LTETestCase(_ReadableLogMixin, JaguarTestCase):
 
     def setup(self):
         with self._step("LTE test setup"):
-            self.interface.dc_power_en(False)
-            self.interface.battery_power_en(False)
-            time.sleep(1)
-            self.interface.battery_power_en(True)
-            self.interface.rs232_enable(True)
-            time.sleep(0.5)
-            self.interface.analog_enable(True)
+            self.apply_rails(RailProfile(dc=False, bat=True, rs232=True, analog=True))
+            # registration times count from modem power-up, which may be an earlier testcase's when
+            # the rails were kept up
+            self.powered = getattr(self.interface, "powered_at", None) or time.monotonic()
 
     def teardown(self):
         with self._step("LTE test teardown"):
             self.target.enable_ble_passthrough(False)
-            self.interface.dc_power_en(False)
-            self.interface.battery_power_en(False)
-            self.interface.analog_enable(False)
+            self.release_rails()
 
     # -------------------------------------------------------------------------
-    # Acquire SARA (passthrough + ping loop)
+    # Acquire SARA (passthrough + ping until it answers, then follow registration)
     # -------------------------------------------------------------------------
 
     def acquire(self):
@@ -142,17 +155,17 @@ class LTETestCase(_ReadableLogMixin, JaguarTestCase):
         self.sara = UBloxSara(self.target.connection)
 
         with self._step("Detect SARA module", timeout_s=self.detect_time):
-            t0 = time.time()
-            tries = 0
-            while time.time() - t0 < self.detect_time:
-                time.sleep(1)
-                tries += 1
-                if self.sara.ping():
-                    self._info("SARA responded to AT ping", tries=tries, elapsed_s=round(time.time() - t0, 3))
-                    return {"result": True}
-            self._error("No response from SARA within detect_time", tries=tries, elapsed_s=round(time.time() - t0, 3))
-            self.log_error(self.ErrorCode.lte_communication_failed)
-            return {"result": False}
+            result, tries, elapsed = self.sara.wait_ready(self.detect_time)
+            if not result:
+                self._error("No response from SARA within detect_time", tries=tries, elapsed_s=round(elapsed, 3))
+                self.log_error(self.ErrorCode.lte_communication_failed)
+                return {"result": False}
+            self._info("SARA responded to AT ping", tries=tries, elapsed_s=round(elapsed, 3))
+
+        # registration goes on while the information is read
+        registration = self.sara.watch_registration(start=self.powered)
+        self._info("Network registration state", **registration.as_dict())
+        return {"result": True, "detect_s": round(elapsed, 3)}
 
     # -------------------------------------------------------------------------
     # Module information
@@ -311,6 +324,37 @@ class LTETestCase(_ReadableLogMixin, JaguarTestCase):
             # Include parsed numbers in return for convenience
             return {"result": result, "csq_power_val": csq_power, "csq_quality_val": csq_qual, **info}
 
+    # -------------------------------------------------------------------------
+    # Network registration (+CEREG/+CREG/+CGEV notifications)
+    # -------------------------------------------------------------------------
+
+    def network_registration(self):
+        """
+        Wait for registration and the data context (if required), record how long they took
+        """
+        registration = self.sara.registration if self.sara is not None else None
+        if registration is None:
+            self._warn("Skipping network_registration: SARA not available")
+            return {"result": False}
+
+        with self._step("Network registration", register_time=self.register_time, context_time=self.context_time):
+            result = True
+            if self.register_time is not None and not registration.wait_registered(self.register_time):
+                result = False
+                self._error("Not registered within register_time", register_time=self.register_time)
+                self.log_error(self.ErrorCode.lte_network_registration_timeout)
+            elif self.context_time is not None and not registration.wait_data_context(self.context_time):
+                result = False
+                self._error("No data context within context_time", context_time=self.context_time)
+                self.log_error(self.ErrorCode.lte_data_context_timeout)
+
+            state = registration.as_dict()
+            self._info("Network registration",
+                       time_to_register=state["time_to_register"],
+                       time_to_data_context=state["time_to_data_context"],
+                       stat=state["stat"])
+            return {"result": result, **state}
+
     # -------------------------------------------------------------------------
     # Power measurement (current/voltage)
     # -------------------------------------------------------------------------
@@ -324,32 +368,23 @@ class LTETestCase(_ReadableLogMixin, JaguarTestCase):
                         samples=self.samples, i_min=self.i_min, i_max=self.i_max,
                         v_min=self.v_min, v_max=self.v_max):
             result = True
-            v_mdm = []
-            i_lte = []
-
-            for _ in range(self.samples):
-                try:
-                    v_mdm.append(self.interface.modem_voltage())
-                    i_lte.append(self.interface.battery_current())
-                except Exception as e:
-                    self._warn("Sample read failed", err=str(e))
-                time.sleep(0.1)
-
-            # Snapshot arrays (truncated)
-            def _short(arr, n=10):
-                return arr[:n] + (["..."] if len(arr) > n else [])
-
-            self._info("Samples snapshot",
-                       i_len=len(i_lte), v_len=len(v_mdm),
-                       i_first=_short(i_lte), v_first=_short(v_mdm))
-
             try:
-                i_mean = mean(i_lte)
-                v_mean = mean(v_mdm)
+                w = self.interface.capture(["modem_voltage", "battery_current"], n=self.samples)
             except Exception as e:
-                self._error("Mean calculation failed", err=str(e))
+                self._error("Telemetry capture failed", err=str(e))
+                return {"result": False}
+
+            if not len(w):
+                self._error("No fixture telemetry received", samples=self.samples)
                 return {"result": False}
 
+            self._info("Samples",
+                       n=len(w), duration_s=round(w.duration, 3), missed=w.missed(),
+                       i_std=w.std("battery_current"), v_std=w.std("modem_voltage"))
+
+            i_mean = w.mean("battery_current")
+            v_mean = w.mean("modem_voltage")
+
             self._info("Averages", i_mean=i_mean, v_mean=v_mean)
 
             if i_mean < self.i_min:
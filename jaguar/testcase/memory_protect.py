@@ -1,7 +1,8 @@
-import time
 import re
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from birch.testcase.testcase import Resource
 
 
 class MemoryProtectTestcase(JaguarTestCase):
@@ -15,6 +16,8 @@ class MemoryProtectTestcase(JaguarTestCase):
       4) teardown(): rails & interfaces off
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET, Resource.PROGRAMMER)
+
     def __init__(self, rdp_level=1, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if rdp_level not in (0, 1, 2):
@@ -29,34 +32,13 @@ class MemoryProtectTestcase(JaguarTestCase):
         """
         V3: DC OFF; enable battery + V3 rails; enable analog and JTAG.
         """
-        try:
-            self.interface.dc_power_en(False)
-        except Exception:
-            pass
-
-        self.interface.v3_power_en(True)
-        self.interface.battery_power_en(True)
-
-        self.interface.analog_enable(True)
-        self.interface.jtag_enable(True)
-        time.sleep(1)
+        self.apply_rails(RailProfile(dc=False, bat=True, v3=True, analog=True, jtag=True, settle_s=1.0))
 
     def teardown(self):
         """
-        Best-effort shutdown of rails and interfaces.
+        Release rails and interfaces to the next testcase (or the end of the suite).
         """
-        for fn in (
-            lambda: self.interface.dc_power_en(False),
-            lambda: self.interface.battery_power_en(False),
-            lambda: self.interface.analog_enable(False),
-            lambda: self.interface.rs232_enable(False),
-            lambda: self.interface.jtag_enable(False),
-        ):
-            try:
-                fn()
-            except Exception:
-                pass
-        time.sleep(1)
+        self.release_rails()
 
     # -------- steps --------
 
@@ -2,6 +2,8 @@ import time
 from statistics import mean
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from birch.testcase.testcase import Resource
 class PowerTestCase(JaguarTestCase):
     """
     Simple power test base for V3 hardware.
@@ -10,6 +12,8 @@ class PowerTestCase(JaguarTestCase):
     - If *all* checks are skipped, we mark the test as informational PASS.
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET)
+
     def __init__(
         self,
         v_min=None,            # Lower bound for Vsys (None = skip)
@@ -17,8 +21,8 @@ class PowerTestCase(JaguarTestCase):
         i_min=None,            # Lower bound for current (None = skip)
         i_max=None,            # Upper bound for current (None = skip)
         samples=10,            # Number of samples to take
-        delay=1.0,             # Settle time after enabling rails
-        sample_interval=0.1,   # Delay between samples
+        delay=1.0,             # Longest settle time after enabling rails (see JaguarInterface.settle)
+        sample_interval=0.1,   # Unused: capture is paced by fixture update packets
         *args, **kwargs
     ):
         super().__init__(*args, **kwargs)
@@ -32,56 +36,40 @@ class PowerTestCase(JaguarTestCase):
 
         print(f"[PowerTestCase] init  v_min={v_min} v_max={v_max}  "
               f"i_min={i_min} i_max={i_max}  samples={samples} "
-              f"delay={delay}s interval={sample_interval}s")
+              f"delay={delay}s")
 
     # ---- lifecycle ----
     def setup(self):
-        print("[PowerTestCase] setup: power_off, analog_enable(True)")
-        self.interface.power_off()
-        self.interface.analog_enable(True)
-        time.sleep(0.2)
+        # Measures the DUT from a cold start, so the rails are cycled even if already in this state
+        print("[PowerTestCase] setup: rails off (cold), analog_enable(True)")
+        self.apply_rails(RailProfile(dc=False, bat=False, rs232=False, jtag=False, analog=True, cold=True))
 
     def teardown(self):
-        print("[PowerTestCase] teardown: power_off, analog_enable(False)")
-        self.interface.power_off()
-        self.interface.analog_enable(False)
-        time.sleep(0.2)
+        print("[PowerTestCase] teardown: release rails")
+        self.release_rails()
 
     # ---- sampling ----
     def capture(self):
-        """Capture a small window of measurements."""
-        print(f"[capture] {self.samples} samples @ {self.sample_interval}s")
-        v_dc, v_bat, v_sys, i_dc, i_bat = [], [], [], [], []
-        for _ in range(self.samples):
-            time.sleep(self.sample_interval)
-            v_dc.append(self.interface.dc_voltage())
-            v_bat.append(self.interface.battery_voltage())
-            v_sys.append(self.interface.sys_voltage())
-            i_dc.append(self.interface.dc_current())
-            i_bat.append(self.interface.battery_current())
-
-        def stats(name, arr):
-            if not arr:
+        """Capture a small window of measurements: the next `samples` fixture update packets."""
+        print(f"[capture] {self.samples} packets")
+        w = self.interface.capture(["dc_voltage", "battery_voltage", "sys_voltage", "dc_current", "battery_current"],
+                                   n=self.samples)
+
+        def stats(name, channel):
+            if not len(w):
                 print(f"  {name}: no data")
-                return None, None, None
-            m = mean(arr)
-            mn, mx = min(arr), max(arr)
-            print(f"  {name}: mean={m:.6f}  min={mn:.6f}  max={mx:.6f}  (n={len(arr)})")
-            return m, mn, mx
-
-        print("→ summary:")
-        vdc_mean, vdc_min, vdc_max = stats("VDC", v_dc)
-        vbat_mean, vbat_min, vbat_max = stats("VBAT", v_bat)
-        vsys_mean, vsys_min, vsys_max = stats("VSYS", v_sys)
-        idc_mean, idc_min, idc_max = stats("IDC", i_dc)
-        ibat_mean, ibat_min, ibat_max = stats("IBAT", i_bat)
+                return None, None, None, []
+            m, mn, mx = w.mean(channel), w.min(channel), w.max(channel)
+            print(f"  {name}: mean={m:.6f}  min={mn:.6f}  max={mx:.6f}  std={w.std(channel):.6f}  (n={len(w)})")
+            return m, mn, mx, w[channel].tolist()
 
+        print(f"→ summary ({w.duration:.3f}s, missed={w.missed()}):")
         return (
-            (vdc_mean, vdc_min, vdc_max, v_dc),
-            (vbat_mean, vbat_min, vbat_max, v_bat),
-            (vsys_mean, vsys_min, vsys_max, v_sys),
-            (idc_mean, idc_min, idc_max, i_dc),
-            (ibat_mean, ibat_min, ibat_max, i_bat),
+            stats("VDC", "dc_voltage"),
+            stats("VBAT", "battery_voltage"),
+            stats("VSYS", "sys_voltage"),
+            stats("IDC", "dc_current"),
+            stats("IBAT", "battery_current"),
         )
 
     # ---- bound checking (simple prints) ----
@@ -157,8 +145,9 @@ class DCPowerTestCase(PowerTestCase):
         print("Set rails: BAT=OFF, DC=ON")
         self.interface.battery_power_en(False)
         self.interface.dc_power_en(True)
-        print(f"Settling {self.delay}s...")
-        time.sleep(self.delay)
+        print(f"Settling (up to {self.delay}s)...")
+        settle = self.interface.settle(["sys_voltage", "dc_current"], timeout=self.delay, name="dc_power")
+        print(f"  {settle}")
 
         vdc, vbat, vsys, idc, ibat = self.capture()
 
@@ -182,6 +171,7 @@ class DCPowerTestCase(PowerTestCase):
             "v_sys_max": vsys[2],
             "i_dc_min": idc[1],
             "i_dc_max": idc[2],
+            "settle": settle.as_dict(),
             **meta,
         }
         print(f"[DC_POWER] payload: {payload}\n")
@@ -203,8 +193,9 @@ class BatPowerTestCase(PowerTestCase):
         print("Set rails: DC=OFF, BAT=ON")
         self.interface.dc_power_en(False)
         self.interface.battery_power_en(True)
-        print(f"Settling {self.delay}s...")
-        time.sleep(self.delay)
+        print(f"Settling (up to {self.delay}s)...")
+        settle = self.interface.settle(["sys_voltage", "battery_current"], timeout=self.delay, name="bat_power")
+        print(f"  {settle}")
 
         vdc, vbat, vsys, idc, ibat = self.capture()
 
@@ -228,6 +219,7 @@ class BatPowerTestCase(PowerTestCase):
             "v_sys_max": vsys[2],
             "i_bat_min": ibat[1],
             "i_bat_max": ibat[2],
+            "settle": settle.as_dict(),
             **meta,
         }
         print(f"[BAT_POWER] payload: {payload}\n")
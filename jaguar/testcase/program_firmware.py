@@ -3,6 +3,8 @@ import hashlib
 from pathlib import Path
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from birch.testcase.testcase import Resource
 
 
 class ProgramFirmwareTestCase(JaguarTestCase):
@@ -12,6 +14,8 @@ class ProgramFirmwareTestCase(JaguarTestCase):
     Adds detailed debug so we can see *why* a run failed.
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET, Resource.PROGRAMMER)
+
     # Conservative SWD speed (kHz) if your programmer wrapper supports it
     SWD_SAFE_FREQ_KHZ = 100
 
@@ -25,8 +29,9 @@ class ProgramFirmwareTestCase(JaguarTestCase):
         self._held_reset = False
 
         if erase:
-            self.append_step("Erase", self.erase)
-        self.append_step("Flash", self.flash)
+            self.append_step("Erase", self.erase, checkpoint=True)
+        # a partial write leaves the flash in an unknown state: erase again before the retry
+        self.append_step("Flash", self.flash, checkpoint=True, resumable=False)
         if get_iot:
             self.append_step("Get IOT Number", self.get_iot)
 
@@ -48,42 +53,13 @@ class ProgramFirmwareTestCase(JaguarTestCase):
     # ------------------ power / connect --------------------
 
     def _target_power_on(self):
-        # DC OFF
-        try:
-            self.interface.dc_power_en(False)
-            self._li("PFW SETUP: dc_power=DIS")
-        except Exception:
-            self._li("PFW SETUP: dc_power_en not available (ok)")
-
-        # V3 rail ON (if present)
-        try:
-            if hasattr(self.interface, "v3_power_en"):
-                self.interface.v3_power_en(True)
-                self._used_v3_power = True
-                self._li("PFW SETUP: v3_power=EN")
-        except Exception as e:
-            self._li(f"PFW SETUP: v3_power_en ignored: {e}")
-
-        # Battery ON (explicit; matches AnalogTestCase)
-        try:
-            self.interface.battery_power_en(True)
-            self._li("PFW SETUP: battery=EN")
-        except Exception as e:
-            self._li(f"PFW SETUP: battery_power_en failed/absent: {e}")
-
-        # Optional helpful rails (mirror AnalogTestCase tone—non-fatal)
-        for fn_name, desc in [
-            ("gpio_enable", "gpio=EN"),
-            ("rs232_enable", "rs232=EN"),
-        ]:
-            try:
-                getattr(self.interface, fn_name)(True)
-                self._li(f"PFW SETUP: {desc}")
-            except Exception:
-                pass
-
-        # Let rails settle so ST-Link sees stable Vtarget
-        time.sleep(0.5)
+        # DC OFF, V3 + battery ON (matches AnalogTestCase), GPIO/RS232 ON. The settle time lets ST-Link see a
+        # stable Vtarget and is skipped when the DUT is already powered from the previous testcase.
+        self._used_v3_power = hasattr(self.interface, "v3_power_en")
+        ok = self.apply_rails(RailProfile(dc=False, bat=True, v3=self._used_v3_power or None, gpio=True, rs232=True,
+                                          settle_s=0.5))
+        self._li(f"PFW SETUP: rails dc=DIS bat=EN v3={'EN' if self._used_v3_power else 'n/a'} gpio=EN rs232=EN "
+                 f"(vsys ok={ok})")
 
     def _prep_connect_path(self):
         # Lower SWD speed if wrapper supports it
@@ -150,7 +126,7 @@ class ProgramFirmwareTestCase(JaguarTestCase):
     def setup(self):
         """
         Programming setup:
-        - DC OFF, V3 ON, Battery ON (mirror AnalogTestCase power path)
+        - DC OFF, V3 ON, Battery ON (rail profile, mirrors AnalogTestCase power path)
         - Optional: hold reset, lower SWD, select UR connect
         - Enable JTAG/SWD
         """
@@ -169,7 +145,7 @@ class ProgramFirmwareTestCase(JaguarTestCase):
 
         # Release reset to let programmer attach in UR path
         if self._held_reset:
-            time.sleep(0.1)
+            self.sleep(0.1)
             self._hold_reset_if_available(False)
 
         # Optional: read/log target voltage if wrapper exposes it
@@ -245,7 +221,7 @@ class ProgramFirmwareTestCase(JaguarTestCase):
             except Exception:
                 pass
 
-            time.sleep(0.2)
+            self.sleep(0.2)
 
         # Best-effort UART sniff; safe even if no UART
         try:
@@ -291,37 +267,11 @@ class ProgramFirmwareTestCase(JaguarTestCase):
 
     def teardown(self):
         """
-        Power down to leave fixture in a known state (mirrors AnalogTestCase).
+        Release the rails; the next testcase's profile (or the end of the suite) powers down.
         """
         self._li("PFW TEARDOWN: start")
 
-        for fn_name, desc in [
-            ("gpio_enable", "gpio=DIS"),
-            ("rs232_enable", "rs232=DIS"),
-        ]:
-            try:
-                getattr(self.interface, fn_name)(False)
-                self._li(f"PFW TEARDOWN: {desc}")
-            except Exception:
-                pass
-
-        try:
-            self.interface.battery_power_en(False)
-            self._li("PFW TEARDOWN: battery=DIS")
-        except Exception:
-            pass
-
-        if self._used_v3_power:
-            try:
-                self.interface.v3_power_en(False)
-                self._li("PFW TEARDOWN: v3_power=DIS")
-            except Exception:
-                pass
-
-        try:
-            self.interface.dc_power_en(False)
-            self._li("PFW TEARDOWN: dc_power=DIS")
-        except Exception:
-            pass
+        # Rails are left for the next testcase (powered off now if this one failed)
+        self.release_rails()
 
         self._li("PFW TEARDOWN: done")
@@ -26,6 +26,8 @@ from statistics import mean  # kept if used elsewhere
 from rogers_api import jasper
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from birch.testcase.testcase import Resource
 from birch.peripheral.lte_module import UBloxSara
 
 # -----------------------------------------------------------------------------
@@ -120,6 +122,10 @@ class ProvisionTestCase(_ReadableLogMixin, JaguarTestCase):
     to device and activate SIM.
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET, Resource.PROGRAMMER, Resource.NETWORK)
+    # leaves the DUT firmware in passthrough mode
+    release_cold = True
+
     STANDARD_SUBJECT = "/C=CA/ST=ONT/L=Mississauga/O=ROMET LIMITED/CN=rometlimited.com"
     DEFAULT_CA_CERT_VALIDITY = 1278
 
@@ -145,6 +151,14 @@ class ProvisionTestCase(_ReadableLogMixin, JaguarTestCase):
         self.provision_enable = provision_enable
         self.internet_connection = False
         self.sara = None
+        # outputs kept for a retry (see the checkpoint steps)
+        self.cert_arn = None
+        self.iot_id = None
+        self.certs_uploaded = False
+        self.iccid = None
+        # per attempt: DUT reset for the SARA USB port, SARA acquired
+        self._dut_reset = False
+        self._sara_ready = False
 
         self.PATH_TO_CONFIG = Path(self.config.active_dir) / Path(self.job._id)
         self.PATH_TO_CERTS = self.PATH_TO_CONFIG / "certificates"
@@ -158,31 +172,33 @@ class ProvisionTestCase(_ReadableLogMixin, JaguarTestCase):
         if self.provision_enable:
             self.append_step("Check for Internet Connection", self.internet)
             if self.eraseBool:
-                self.append_step("Erase Existing Flash", self.erase)
+                self.append_step("Erase Existing Flash", self.erase, checkpoint=True)
             if self.flashBool:
-                self.append_step("Flash Fresh Firmware", self.flash)
-            self.append_step("Upload Certificates", self.upload_certificates)
+                self.append_step("Flash Fresh Firmware", self.flash, checkpoint=True, resumable=False)
+            # a retry resumes after the last of these that passed: no new key pair / AWS IoT
+            # certificate, no second transfer of the certificates
+            self.append_step("Register Device with AWS IoT", self.register_device, checkpoint=True)
+            self.append_step("Upload Certificates", self.upload_certificates, checkpoint=True)
+            self.append_step("Read ICCID", self.read_iccid, checkpoint=True)
+            self.append_step("Pair ICCID and IoT ID", self.pair_iccid)
 
     # -------------------------------------------------------------------------
     # SETUP / TEARDOWN
     # -------------------------------------------------------------------------
 
     def setup(self):
-        self.interface.dc_power_en(False)
-        self.interface.battery_power_en(False)
-        time.sleep(1)
-        self.interface.battery_power_en(True)
-        self.interface.rs232_enable(True)
-        time.sleep(0.5)
-        self.interface.analog_enable(True)
-        time.sleep(0.5)
-        self.interface.jtag_enable(True)
+        self._dut_reset = False
+        self._sara_ready = False
+        self.apply_rails(RailProfile(dc=False, bat=True, rs232=True, analog=True, jtag=True))
 
     def teardown(self):
         self.target.enable_ble_passthrough(False)
-        self.interface.dc_power_en(False)
-        self.interface.battery_power_en(False)
-        self.interface.analog_enable(False)
+        self.release_rails()
+
+    def finish(self):
+        super().finish()
+        # the generated device key is only kept on disk for a retry
+        self.clean_up()
 
     # -------------------------------------------------------------------------
     # LTE acquire
@@ -197,12 +213,9 @@ class ProvisionTestCase(_ReadableLogMixin, JaguarTestCase):
         self.sara = UBloxSara(self.target.connection)
 
         with self._step("Detect SARA module", timeout_s=self.detect_time):
-            t0 = time.time()
-            while time.time() - t0 < self.detect_time:
-                time.sleep(1)
-                if self.sara.ping():
-                    self._info("SARA responded to ping")
-                    return {"result": True, "provision_status": True}
+            if self.sara.wait_ready(self.detect_time)[0]:
+                self._info("SARA responded to ping")
+                return {"result": True, "provision_status": True}
 
         self._error("LTE communication failed (no ping response within detect_time)")
         self.log_error(self.ErrorCode.lte_communication_failed)
@@ -387,14 +400,34 @@ class ProvisionTestCase(_ReadableLogMixin, JaguarTestCase):
     # Main provisioning step
     # -------------------------------------------------------------------------
 
-    def upload_certificates(self):
+    def reset_dut(self):
+        # Reset the chip so it starts the USB port for SARA
+        with self._step("Reset DUT (RDP=0 + Chip Reset)"):
+            self.programmer.set_rdp(0)
+            self.programmer.chip_reset()
+        self._dut_reset = True
+
+    def ready_sara(self):
+        """
+        Reset the DUT and acquire the SARA once per attempt
+        """
+        if self._sara_ready:
+            return True
+        if not self._dut_reset:
+            self.reset_dut()
+        self._sara_ready = self.acquire()["result"]
+        return self._sara_ready
+
+    def register_device(self):
+        """
+        Device key pair and certificate registered with AWS IoT, Thing created, policy attached
+        """
+        self.cert_arn = None
+        self.iot_id = None
         if not self.internet_connection:
             self._warn("No internet connection – skipping provisioning")
             return {"result": False, "provision_status": False}
 
-        result = False
-        iot_id = None
-
         cafile = self.PATH_TO_CERTS / f"{self.rootCA}.pem"
         cakey = self.PATH_TO_CERTS / f"{self.rootCA}.key"
         self._info("CA file check", cafile=str(cafile), cakey=str(cakey))
@@ -410,95 +443,113 @@ class ProvisionTestCase(_ReadableLogMixin, JaguarTestCase):
             else:
                 self._info("Device CA pem found", cafile=str(cafile))
 
-        if cafile is not None and cakey is not None and days is not None:
-            # Reset the chip so it starts the USB port for SARA
-            with self._step("Reset DUT (RDP=0 + Chip Reset)"):
-                self.programmer.set_rdp(0)
-                self.programmer.chip_reset()
-
-            # Create device (validates IoT ID first)
-            res = self.create_device(cafile=cafile, cakey=cakey, days=days)
-            if not res:
-                self.clean_up()
-                return {"result": False, "provision_status": False}
-            cert_arn, iot_id = res
-
-            # Ensure/attach policy
-            self.create_policy_from_json(self.ROMET_STD_IOT_POLICY, self.ROMET_STD_IOT_POLICY_FILE)
-            self.attach_policy_to_device_cert(cert_arn, self.ROMET_STD_IOT_POLICY)
-
-            # Load certs to memory
-            aws_ca, aws_ca_size = self.read_cert(str(self.AWS_AUTH_CA_NAME))
-            device_cert, device_cert_size = self.read_cert(f"{str(self.DEVICE_NAME)}.pem")
-            device_key, device_key_size = self.read_cert(f"{str(self.DEVICE_NAME)}.key")
-
-            # Test if LTE chip com port is ready
-            if self.acquire()["result"]:
-                self._info("SARA acquired – ready for certificate transfer")
-            else:
-                self._error("SARA failed to respond to AT command – aborting")
-                aws_ca.close(); device_cert.close(); device_key.close()
-                self.clean_up()
-                return {"result": False, "provision_status": False}
+        if cafile is None or cakey is None or days is None:
+            self.log_error(self.ErrorCode.aws_failed_ca_requirements)
+            self._error("CA required. See confluence documentation for solutions.")
+            return {"result": False, "provision_status": False}
+
+        self.reset_dut()
+
+        # Create device (validates IoT ID first)
+        res = self.create_device(cafile=cafile, cakey=cakey, days=days)
+        if not res:
+            self.clean_up()
+            return {"result": False, "provision_status": False}
+        cert_arn, iot_id = res
+
+        # Ensure/attach policy
+        self.create_policy_from_json(self.ROMET_STD_IOT_POLICY, self.ROMET_STD_IOT_POLICY_FILE)
+        self.attach_policy_to_device_cert(cert_arn, self.ROMET_STD_IOT_POLICY)
+
+        self.cert_arn, self.iot_id = cert_arn, iot_id
+        return {"result": True, "cert_arn": cert_arn, "iot_id": iot_id}
+
+    def upload_certificates(self):
+        """
+        AWS CA, device certificate and device key written to the SARA
+        """
+        self.certs_uploaded = False
+        if self.cert_arn is None:
+            self._warn("Device not registered – skipping certificate upload")
+            return {"result": False, "provision_status": False}
+
+        # Test if LTE chip com port is ready
+        if self.ready_sara():
+            self._info("SARA acquired – ready for certificate transfer")
+        else:
+            self._error("SARA failed to respond to AT command – aborting")
+            return {"result": False, "provision_status": False}
+
+        # Load certs to memory
+        aws_ca, aws_ca_size = self.read_cert(str(self.AWS_AUTH_CA_NAME))
+        device_cert, device_cert_size = self.read_cert(f"{str(self.DEVICE_NAME)}.pem")
+        device_key, device_key_size = self.read_cert(f"{str(self.DEVICE_NAME)}.key")
 
-            # Transfer certs; on failure, close/cleanup/return
+        # Transfer certs; on failure, close/return (the files are kept for the retry)
+        try:
             with self._step("Transfer certificates to SARA"):
                 if self.sara.send_cert(aws_ca, "aws_ca", aws_ca_size) is False:
                     self._error("Certificate transfer failed", which="aws_ca")
-                    aws_ca.close(); device_cert.close(); device_key.close()
-                    self.clean_up()
                     self.log_error(self.ErrorCode.lte_aws_ca_cert_transfer_unsuccessful)
                     return {"result": False, "provision_status": False}
 
                 if self.sara.send_cert(device_cert, "device_cert", device_cert_size) is False:
                     self._error("Certificate transfer failed", which="device_cert")
-                    aws_ca.close(); device_cert.close(); device_key.close()
-                    self.clean_up()
                     self.log_error(self.ErrorCode.lte_device_cert_transfer_unsuccessful)
                     return {"result": False, "provision_status": False}
 
                 if self.sara.send_cert(device_key, "device_key", device_key_size) is False:
                     self._error("Certificate transfer failed", which="device_key")
-                    aws_ca.close(); device_cert.close(); device_key.close()
-                    self.clean_up()
                     self.log_error(self.ErrorCode.lte_device_key_transfer_unsuccessful)
                     return {"result": False, "provision_status": False}
-
-            # Close files
+        finally:
             aws_ca.close()
             device_cert.close()
             device_key.close()
 
-            # Activate the SIM and pair to IoT
-            with self._step("Pair ICCID and IoT ID"):
-                iccid = self.sara.get_sim_iccid()
-                if iccid is None:
-                    self.log_error(self.ErrorCode.lte_sim_iccid_invalid)
-                    self._error("Could not get ICCID from SARA")
-                    self.clean_up()
-                    return {"result": False, "provision_status": False}
+        self.certs_uploaded = True
+        return {"result": True}
 
-                # Rogers API credentials
-                creds_path = self.PATH_TO_CONFIG / "credentials/credentials.json"
-                creds = json.load(open(creds_path))
-                API_KEY = creds["api_key"]
-                username = creds["username"]
+    def read_iccid(self):
+        self.iccid = None
+        if not self.certs_uploaded:
+            return {"result": False, "provision_status": False}
+        if not self.ready_sara():
+            self._error("SARA failed to respond to AT command – aborting")
+            return {"result": False, "provision_status": False}
 
-                rogers = jasper.Jasper(username, API_KEY)
-                self._info("Rogers set_device_id response",
-                           response=rogers.set_device_id(self.sara.iccid, iot_id))
+        iccid = self.sara.get_sim_iccid()
+        if iccid is None:
+            self.log_error(self.ErrorCode.lte_sim_iccid_invalid)
+            self._error("Could not get ICCID from SARA")
+            return {"result": False, "provision_status": False}
+        self.iccid = iccid
+        return {"result": True, "iccid": iccid}
 
-            # Delete certs from computer
-            self.clean_up()
-            print(ascii_message.PASS_STRING)  # preserve existing PASS banner
-            print(iot_id)  # preserve existing IoT ID print
-            result = True
-            return {"result": result, "provision_status": result, "iot": iot_id}
-        else:
-            self.log_error(self.ErrorCode.aws_failed_ca_requirements)
-            self._error("CA required. See confluence documentation for solutions.")
+    def pair_iccid(self):
+        """
+        Activate the SIM and pair to IoT
+        """
+        if self.iccid is None:
             return {"result": False, "provision_status": False}
 
+        with self._step("Pair ICCID and IoT ID"):
+            # Rogers API credentials
+            creds_path = self.PATH_TO_CONFIG / "credentials/credentials.json"
+            creds = json.load(open(creds_path))
+            API_KEY = creds["api_key"]
+            username = creds["username"]
+
+            rogers = jasper.Jasper(username, API_KEY)
+            self._info("Rogers set_device_id response",
+                       response=rogers.set_device_id(self.iccid, self.iot_id))
+
+        # Delete certs from computer
+        self.clean_up()
+        print(ascii_message.PASS_STRING)  # preserve existing PASS banner
+        print(self.iot_id)  # preserve existing IoT ID print
+        return {"result": True, "provision_status": True, "iot": self.iot_id}
+
     # -------------------------------------------------------------------------
     # DUT erase/flash
     # -------------------------------------------------------------------------
@@ -528,7 +579,7 @@ class ProvisionTestCase(_ReadableLogMixin, JaguarTestCase):
                 if not ok:
                     self.log_error(self.ErrorCode.dut_program_failed)
                     break
-                time.sleep(1)
+                self.sleep(1)
 
         return {"result": result, "firmware_list": self.firmware_list}
 
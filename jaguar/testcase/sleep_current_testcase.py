@@ -1,7 +1,8 @@
 import time
-from statistics import mean
 
 from .jaguar_testcase import JaguarTestCase
+from jaguar.peripheral.interface import RailProfile
+from birch.testcase.testcase import Resource
 
 
 class SleepCurrentTestCase(JaguarTestCase):
@@ -10,12 +11,15 @@ class SleepCurrentTestCase(JaguarTestCase):
 
     """
 
+    resources = (Resource.INTERFACE, Resource.TARGET)
+
     def __init__(self, i_min=0.00001, i_max=0.001, samples=10, delay=1, *args, **kwargs):
         """
         i_min minimum current threshold
         i_max maximum current threshold
         samples: number of samples to measure
-        delay: time between enter sleep mode and data capture start
+        delay: longest time between enter sleep mode and data capture start; the capture starts as soon
+               as the battery current is flat within the ADC noise
         """
         super().__init__(*args, **kwargs)
         self.i_min = i_min
@@ -27,43 +31,34 @@ class SleepCurrentTestCase(JaguarTestCase):
         self.append_step("Measure", self.measure)
 
     def setup(self):
-        self.interface.dc_power_en(False)
-        self.interface.battery_power_en(False)
-        self.interface.analog_enable(True)
-        self.interface.jtag_enable(False)
-        time.sleep(1)
-        self.interface.dc_power_en(False)
-        self.interface.battery_power_en(True)
-        self.interface.analog_enable(True)
-        self.interface.rs232_enable(True)
+        self.apply_rails(RailProfile(dc=False, bat=True, analog=True, jtag=False, rs232=True))
 
     def teardown(self):
-        self.interface.dc_power_en(False)
-        self.interface.battery_power_en(False)
-        self.interface.analog_enable(False)
-        self.interface.rs232_enable(False)
+        self.release_rails()
 
     def enter_sleep_mode(self):
         self.target.enter_sleep_mode()
         self.interface.rs232_enable(False)
-        time.sleep(self.delay)
-        return {"result": True}
+        # the DUT may take a moment to go to sleep: wait until the current is flat within the ADC
+        # noise (SETTLE_LIMITS); i_min/i_max are only the pass limits of measure()
+        settle = self.interface.settle("battery_current", timeout=self.delay, name="sleep_current")
+        return {"result": True, "settle": settle.as_dict()}
 
     def measure(self):
         result = True
-        samples = []
-        for i in range(self.samples):
-            time.sleep(0.1)
-            samples.append(self.interface.battery_current())
+        w = self.interface.capture("battery_current", n=self.samples)
+        if not len(w):
+            self.log_error(self.ErrorCode.sleep_current_min)
+            return {"result": False, "samples": 0}
 
-        self.event_logger.info("Sleep current %s" % str(samples))
-        if mean(samples) < self.i_min:
+        i_mean = w.mean("battery_current")
+        self.event_logger.info("Sleep current %s" % str(w["battery_current"].tolist()))
+        if i_mean < self.i_min:
             result = False
             self.log_error(self.ErrorCode.sleep_current_min)
-        if mean(samples) > self.i_max:
+        if i_mean > self.i_max:
             result = False
             self.log_error(self.ErrorCode.sleep_current_max)
 
-        avg = sum(samples) / len(samples)
-
-        return {"result": result, "samples": self.samples, "i_min": min(samples), "i_max": max(samples), "i_mean": avg}
+        return {"result": result, "samples": len(w), "i_min": w.min("battery_current"),
+                "i_max": w.max("battery_current"), "i_mean": i_mean}
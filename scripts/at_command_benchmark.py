@@ -0,0 +1,83 @@
+"""
+AT command benchmark.
+
+Time of UBloxSara.read_module_info() + read_network_info() against the simulated SARA modem
+(UBloxSaraSimulator), behind the DUT test firmware LTE passthrough as on the fixture:
+
+    legacy     write, fixed 0.1 s sleep, read(1024) polled every 0.1 s until data (old at_command)
+    engine     AtEngine on the UartReader, returns on the final result code
+
+    python -m scripts.at_command_benchmark
+    python -m scripts.at_command_benchmark --runs 5 --latency 0.05
+"""
+import argparse
+import logging
+import time
+
+from birch.peripheral.lte_module import UBloxSara
+from jaguar.peripheral.sara_simulator import UBloxSaraSimulator
+from jaguar.peripheral.target_dut import JaguarTargetDUT
+from jaguar.peripheral.target_dut_simulator import JaguarTargetDUTSimulator
+
+
+def legacy_at_command(connection, cmd):
+    """
+    What UBloxSara.at_command did before the AT engine (one attempt)
+    """
+    connection.reset_input_buffer()
+    connection.write(cmd + b"\r\n")
+    time.sleep(0.1)
+    resp = connection.read(1024)
+    tries = 0
+    while resp == b"" and tries <= 20:
+        resp = connection.read(1024)
+        tries += 1
+        time.sleep(0.1)
+    return b"OK" in resp or b"ULSTFILE" in resp
+
+
+def workload(sara, at_command):
+    """
+    AT commands of one module + network info read; returns the number of commands issued
+    """
+    cmds = [b"AT+CGMI", b"AT+CGMM", b"AT+GMR", b"AT+GSN", b"ATI0", b"ATI9", b"AT+CCID", b'AT+CLCK="SC",2',
+            b"AT+CPIN?", b"AT+ULSTFILE", b"AT+COPS?", b"AT+CREG?", b"AT+CSQ"]
+    for cmd in cmds:
+        assert at_command(cmd), cmd
+    return len(cmds)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.ERROR,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="AT command time, legacy polling vs AT engine")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.01, help="simulated modem response time (s)")
+    args = parser.parse_args()
+
+    modem = UBloxSaraSimulator(latency=args.latency, register_after=0.0, realtime=False)
+    sim = JaguarTargetDUTSimulator(modem=modem)
+    target = JaguarTargetDUT()
+    target.port = sim.port
+    target.open()
+    assert target.enable_lte_passthrough(True)
+    sara = UBloxSara(target.connection)
+
+    modes = (("legacy", lambda cmd: legacy_at_command(target.connection, cmd)),
+             ("engine", lambda cmd: sara.at_command(cmd)[0]))
+    baseline = None
+    for name, at_command in modes:
+        times = []
+        for i in range(args.runs):
+            start = time.perf_counter()
+            n = workload(sara, at_command)
+            times.append(time.perf_counter() - start)
+        per_run = min(times)
+        baseline = baseline or per_run
+        print("%-8s %3d commands  %7.3f s/run  %7.2f ms/command  x%.1f" % (
+            name, n, per_run, 1000 * per_run / n, baseline / per_run))
+
+    print("engine: %s  modem: %s" % (sara.at.stats(), modem.stats()))
+    target.close()
+    sim.close()
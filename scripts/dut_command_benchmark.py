@@ -0,0 +1,119 @@
+"""
+DUT command benchmark.
+
+Test firmware command time on the simulated firmware UART, for the command mix of one
+DigitalTestCase + AnalogTestCase run (pin writes and reads, ADC reads, DAC writes, pulse counter):
+
+    legacy     byte-by-byte write, fixed 0.1 s sleep, readline polled every 0.1 s (old uart_write)
+    client     DutCommandClient, one command at a time, returns on the response line
+    pipelined  DutCommandClient, pin writes/reads of a group sent back to back (set_pins/read_pins)
+
+    python -m scripts.dut_command_benchmark
+    python -m scripts.dut_command_benchmark --runs 5 --latency 0.005
+    python -m scripts.dut_command_benchmark --latency-timer 0.016   # FTDI default latency timer
+"""
+import argparse
+import logging
+import time
+
+from jaguar.peripheral.dut_commands import DutCommand
+from jaguar.peripheral.target_dut import JaguarTargetDUT
+from jaguar.peripheral.target_dut_simulator import JaguarTargetDUTSimulator
+
+PIN_GROUP = [("A", 15), ("C", 0), ("C", 11), ("C", 12)]
+
+
+def legacy_write(connection, data, resp=False):
+    """
+    What JaguarTargetDUT.uart_write did for every test firmware command
+    """
+    connection.read(1024)
+    for d in data:
+        connection.write(bytes([d]))
+    time.sleep(0.1)
+    if not resp:
+        return None
+    for j in range(10):
+        time.sleep(0.1)
+        s = connection.readline(1000)
+        if len(s) > 0:
+            return s
+    return None
+
+
+def workload(set_pin, read_pin, read_adc, set_dac, read_pulse_count, set_pins=None, read_pins=None):
+    """
+    Commands of one digital + analog run; returns the number of commands issued
+    """
+    n = 0
+    for level in (0, 1):
+        if set_pins:
+            set_pins([(port, pin, level) for port, pin in PIN_GROUP])
+        else:
+            for port, pin in PIN_GROUP:
+                set_pin(port, pin, level)
+        if read_pins:
+            assert read_pins(PIN_GROUP) == [level] * len(PIN_GROUP)
+        else:
+            for port, pin in PIN_GROUP:
+                assert read_pin(port, pin) == level
+        n += 2 * len(PIN_GROUP)
+    for dac in (1, 2):
+        for value in (0, 128, 255):
+            set_dac(dac, value)
+            read_adc()
+            n += 2
+    read_pulse_count()
+    return n + 1
+
+
+def run_legacy(target):
+    c = target.connection
+    return workload(
+        set_pin=lambda port, pin, v: legacy_write(c, b"5 %s %d %d    \r" % (port.encode(), pin, v)),
+        read_pin=lambda port, pin: DutCommand.read_pin(port, pin).parse(
+            legacy_write(c, b"6 %s %d     \r" % (port.encode(), pin), resp=True)),
+        read_adc=lambda: legacy_write(c, b"4\r", resp=True),
+        set_dac=lambda dac, v: legacy_write(c, b"2 %d %d\r" % (dac, v)),
+        read_pulse_count=lambda: legacy_write(c, b"3 1 \r", resp=True))
+
+
+def run_client(target, pipelined):
+    return workload(target.set_pin, target.read_pin, target.read_adc, target.set_dac, target.read_pulse_count,
+                    set_pins=target.set_pins if pipelined else None,
+                    read_pins=target.read_pins if pipelined else None)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.ERROR,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Test firmware command time, legacy writer vs command client")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.002, help="simulated firmware time per command (s)")
+    parser.add_argument('--latency-timer', type=float, default=0.0, help="simulated USB-serial latency timer (s)")
+    args = parser.parse_args()
+
+    sim = JaguarTargetDUTSimulator(latency=args.latency, latency_timer=args.latency_timer)
+    target = JaguarTargetDUT()
+    target.port = sim.port
+    target.open()
+
+    modes = (("legacy", run_legacy),
+             ("client", lambda t: run_client(t, False)),
+             ("pipelined", lambda t: run_client(t, True)))
+    baseline = None
+    for name, fn in modes:
+        times = []
+        for i in range(args.runs):
+            start = time.perf_counter()
+            n = fn(target)
+            times.append(time.perf_counter() - start)
+        per_run = min(times)
+        baseline = baseline or per_run
+        print("%-10s %3d commands  %7.3f s/run  %6.2f ms/command  x%.1f" % (
+            name, n, per_run, 1000 * per_run / n, baseline / per_run))
+
+    print("client: %s  simulator: %s" % (target.commands.stats(), sim.stats()))
+    target.close()
+    sim.close()
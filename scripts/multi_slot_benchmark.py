@@ -0,0 +1,137 @@
+"""
+Multi-slot throughput benchmark.
+
+Runs 1..N slots in parallel against one simulated fixture each (JaguarFixtureSimulator pty per
+slot, bound through a slot_map style entry) and a shared token job, the way Slot does: claim a
+unit, reserve a token, wait for the DUT, run the suite (stand-in testcases from
+suite_schedule_benchmark), use or release the token and count the unit. Reports units per hour
+and checks that every token was used exactly once and the job counters add up.
+
+    python -m scripts.multi_slot_benchmark
+    python -m scripts.multi_slot_benchmark --slots 1 2 4 --units 8 --scale 0.005
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from birch.job.job_manager import Job
+from birch.test_status import TestStatus
+from jaguar.peripheral.interface import JaguarInterface
+from jaguar.peripheral.jaguar_interface.JaguarFixtureSimulator import JaguarFixtureSimulator
+from scripts.suite_schedule_benchmark import run as run_suite, testcase_resources
+
+
+def make_job(path, units):
+    """
+    Token job with one token per unit, as installed by JobBundleInstaller.
+    """
+    os.makedirs(os.path.join(path, "tokens"))
+    for i in range(units):
+        with open(os.path.join(path, "tokens", "%016X.json" % (0x70B3D50000000000 + i)), "w") as f:
+            json.dump({"eui": i}, f)
+    return Job(job_file=os.path.join(path, "job.json"), description="benchmark", fixture_id="sim", id="bench",
+               parameters={}, test_suite={"filename": "bench"}, timestamp="", type="production", path=path,
+               token_total=units)
+
+
+class BenchSlot(threading.Thread):
+    """
+    Slot stand-in: one simulated fixture bay testing DUTs until the job has no units left.
+    """
+
+    def __init__(self, number, job, data, resources, scale):
+        super().__init__(daemon=True)
+        self.number = number
+        self.job = job
+        self.data = data
+        self.resources = resources
+        self.scale = scale
+        self.sim = JaguarFixtureSimulator()
+        # slot_map entry for this bay
+        self.slot_config = {"interface_port": self.sim.port, "leds": {"busy": 1, "pass": 2, "fail": 3}}
+        self.interface = JaguarInterface(port=self.slot_config["interface_port"], leds=self.slot_config["leds"])
+        self.interface.open()
+        self.tokens = []
+        self.suite_time = []
+
+    def run(self):
+        while not self.job.is_complete():
+            if not self.job.start_unit():
+                break
+            token = self.job.reserve_token()
+            if token is None:
+                self.job.end_unit()
+                break
+
+            # operator inserts the DUT
+            self.sim.dut_present = True
+            while not self.interface.dut_present():
+                self.interface.wait_for_update()
+
+            self.interface.set_led(TestStatus.INCOMPLETE, True)
+            elapsed, timeline = run_suite(self.data, self.resources, self.interface, self.scale, parallel=True)
+            self.suite_time.append(elapsed)
+            self.interface.set_led(TestStatus.PASS, True)
+
+            self.job.use_token(token)
+            self.job.unit_passed()
+            self.job.unit_tested()
+            self.job.end_unit()
+            self.tokens.append(token)
+            self.sim.dut_present = False
+
+    def close(self):
+        self.interface.close()
+        self.sim.close()
+
+
+def bench(n, units, data, resources, scale):
+    path = tempfile.mkdtemp(prefix="multi_slot_")
+    try:
+        job = make_job(os.path.join(path, "job"), units)
+        slots = [BenchSlot(i + 1, job, data, resources, scale) for i in range(n)]
+        t0 = time.monotonic()
+        for s in slots:
+            s.start()
+        for s in slots:
+            s.join()
+        elapsed = time.monotonic() - t0
+        for s in slots:
+            s.close()
+
+        tokens = [t for s in slots for t in s.tokens]
+        assert len(tokens) == len(set(tokens)) == units, "token used twice or lost: %s" % tokens
+        assert job._units_passed == job._units_tested == units
+        assert job._units_active == 0 and job.calc_tokens_remaining() == 0 and job.is_complete()
+        return elapsed, [len(s.tokens) for s in slots]
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.WARNING,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Units per hour against the number of slots")
+    parser.add_argument('--suite', default="assets/testsuite/jaguar_selftestV7.json")
+    parser.add_argument('--scale', type=float, default=0.005, help="nominal testcase duration / suite timeout")
+    parser.add_argument('--slots', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--units', type=int, default=8)
+    args = parser.parse_args()
+
+    with open(args.suite, 'r') as f:
+        data = json.load(f)
+    resources = testcase_resources()
+
+    base = None
+    for n in args.slots:
+        elapsed, per_slot = bench(n, args.units, data, resources, args.scale)
+        uph = args.units * 3600.0 / elapsed
+        base = base or uph / n
+        print("%d slot(s): %d units in %.2fs, %.0f UPH (%.2fx of linear), per slot %s" % (
+            n, args.units, elapsed, uph, uph / (base * n), per_slot))
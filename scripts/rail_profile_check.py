@@ -0,0 +1,74 @@
+"""
+Rail profile check.
+
+Applies the rail profiles of the production testcases in suite order on the simulated fixture,
+with each testcase's release_rails() in between, the way a test suite does. After every
+apply_rails() each line the profile sets must read back at the requested level from the fixture
+echo. Lines that share an output (v3 and gpio both drive GPIO_EN) must not undo each other or be
+undone by lines the previous testcase released.
+
+    python -m scripts.rail_profile_check
+    python -m scripts.rail_profile_check --rounds 3
+
+Exits with status 1 if a line does not read back as requested.
+"""
+import argparse
+import sys
+
+from jaguar.peripheral.interface import JaguarInterface, RailProfile
+from jaguar.peripheral.jaguar_interface.JaguarFixtureSimulator import JaguarFixtureSimulator
+
+# (testcase, profile) in suite order, as in the testcases' setup()
+PROFILES = [
+    ("POWER", RailProfile(dc=False, bat=False, rs232=False, jtag=False, analog=True, cold=True)),
+    ("PROGRAM_FIRMWARE", RailProfile(dc=False, bat=True, v3=True, gpio=True, rs232=True, settle_s=0.5)),
+    ("DIGITAL", RailProfile(dc=True, bat=False, gpio=True, rs232=True)),
+    ("DIGITAL_BAT", RailProfile(dc=False, bat=True, v3=True, gpio=True, rs232=True)),
+    ("ANALOG", RailProfile(dc=False, bat=True, v3=True, gpio=True, rs232=True, analog=True)),
+    ("ANALOG_DC", RailProfile(dc=True, bat=False, gpio=True, rs232=True, analog=True)),
+    ("MEMORY_PROTECT", RailProfile(dc=False, bat=True, v3=True, analog=True, jtag=True, settle_s=1.0)),
+    ("LTE", RailProfile(dc=False, bat=True, rs232=True, analog=True)),
+    ("BLE_DC", RailProfile(dc=True, bat=False, rs232=True)),
+    ("BLE", RailProfile(dc=False, bat=True, v3=True, rs232=True)),
+    ("SLEEP_CURRENT", RailProfile(dc=False, bat=True, analog=True, jtag=False, rs232=True)),
+    ("PROVISION", RailProfile(dc=False, bat=True, rs232=True, analog=True, jtag=True)),
+]
+
+
+def check(interface, name, profile):
+    """
+    Lines of profile that do not read back at the requested level: [(line, wanted, level)]
+    """
+    interface.apply_rails(profile)
+    interface.wait_for_outputs(timeout=1.0)
+    return [(line, wanted, interface.interface.rail_level(line)) for line, wanted in profile.lines().items()
+            if interface.interface.rail_level(line) != wanted]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check rail profiles read back after apply_rails()")
+    parser.add_argument('--rounds', type=int, default=2, help="times the suite order is applied")
+    args = parser.parse_args()
+
+    sim = JaguarFixtureSimulator(tau=0.01)
+    interface = JaguarInterface(port=sim.port)
+    interface.open()
+    failures = 0
+    try:
+        for _ in range(args.rounds):
+            for name, profile in PROFILES:
+                wrong = check(interface, name, profile)
+                print("%-16s %s%s" % (name, profile, "" if not wrong else "  WRONG %s" % wrong))
+                failures += bool(wrong)
+                interface.release_rails()
+        interface.flush_rails()
+    finally:
+        interface.close()
+        sim.close()
+
+    print("%d profile(s) applied, %d wrong" % (args.rounds * len(PROFILES), failures))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Device session benchmark.
+
+Per-DUT device setup before and after SessionManager, on the simulated fixture and a pty standing
+in for the DUT UART:
+
+    legacy   new JaguarTargetDUT per barcode: port enumeration + serial open (never closed)
+    session  one JaguarTargetDUT and JaguarInterface kept open, prepare() health-checks and resets
+
+Then both links are dropped (as a USB disconnect would) to check that prepare() reopens them.
+The BLED112 dongle, whose open/close costs about 2 s per scan() in the legacy flow, is not
+simulated.
+
+    python -m scripts.session_benchmark
+    python -m scripts.session_benchmark --units 50
+"""
+import argparse
+import logging
+import os
+import statistics
+import time
+
+import serial.tools.list_ports as list_ports
+
+from birch.peripheral.session_manager import SessionManager
+from jaguar.peripheral.interface import JaguarInterface
+from jaguar.peripheral.jaguar_interface.JaguarFixtureSimulator import JaguarFixtureSimulator
+from jaguar.peripheral.target_dut import JaguarTargetDUT
+
+
+def legacy_unit(port):
+    """
+    What Slot.state_scan_barcode_enter did per barcode
+    """
+    d = JaguarTargetDUT()
+    # find_port() enumerated the USB serial ports on every call
+    list_ports.comports()
+    d.port = port
+    d.open()
+    return d
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.ERROR,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Per-DUT device open time with and without sessions")
+    parser.add_argument('--units', type=int, default=20)
+    args = parser.parse_args()
+
+    sim = JaguarFixtureSimulator()
+    master, slave = os.openpty()
+    dut_port = os.ttyname(slave)
+
+    legacy = []
+    leaked = []
+    for i in range(args.units):
+        start = time.perf_counter()
+        leaked.append(legacy_unit(dut_port))
+        legacy.append(time.perf_counter() - start)
+    for d in leaked:
+        d.close()
+
+    sessions = SessionManager("bench")
+    interface = JaguarInterface(port=sim.port)
+    target = JaguarTargetDUT()
+    target.port = dut_port
+    sessions.add("interface", interface)
+    sessions.add("target", target)
+    start = time.perf_counter()
+    sessions.open_all()
+    interface.wait_for_update()
+    first_open = time.perf_counter() - start
+
+    session = []
+    for i in range(args.units):
+        start = time.perf_counter()
+        target.new_unit()
+        failed = sessions.prepare()
+        session.append(time.perf_counter() - start)
+        assert not failed, failed
+
+    # USB disconnect: both ports go away under the open handles
+    interface.interface.fixture_session.jaguarCom.ser.close()
+    target.connection.close()
+    start = time.perf_counter()
+    failed = sessions.prepare()
+    recover = time.perf_counter() - start
+    recovered = not failed and interface.healthy() and target.healthy()
+
+    stats = sessions.stats()
+    sessions.close_all()
+    sim.close()
+    os.close(master)
+    os.close(slave)
+
+    print("legacy  per unit: mean %.2f ms, max %.2f ms (DUT UART only, fixture opened once per INIT)" % (
+        statistics.mean(legacy) * 1000, max(legacy) * 1000))
+    print("session per unit: mean %.2f ms, max %.2f ms (health check + reset of fixture and DUT UART)" % (
+        statistics.mean(session) * 1000, max(session) * 1000))
+    print("first open %.1f ms, reopen after disconnect %.1f ms, recovered: %s" % (
+        first_open * 1000, recover * 1000, recovered))
+    for name, s in stats.items():
+        print("  %-10s opens %d reopens %d reuses %d open %.1f ms check %.1f ms saved %.1f ms" % (
+            name, s["opens"], s["reopens"], s["reuses"], s["open_time"] * 1000, s["check_time"] * 1000,
+            s["saved"] * 1000))
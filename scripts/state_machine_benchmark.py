@@ -0,0 +1,171 @@
+"""
+State machine latency benchmark.
+
+Measures the delay from an input to the state machine acting on it, for the previous fixed-tick
+loop (LegacyStateMachine) and the event driven StateMachine:
+
+    transition  state_transition() from another thread (operator UI / barcode callback)
+    event       post() handled by the state's event_fn, which makes the transition
+    dut         DUT inserted in the simulated fixture, seen through the fixture update callback
+                (legacy: polled dut_present() in run_fn, as JaguarSlot.state_empty_run does)
+
+Idle run_fn calls per second are reported as a measure of the polling overhead.
+
+    python -m scripts.state_machine_benchmark
+    python -m scripts.state_machine_benchmark --n 50 --no-fixture
+"""
+import argparse
+import enum
+import logging
+import statistics
+import threading
+import time
+
+from birch.core.state_machine import State, StateMachine
+from jaguar.peripheral.interface import JaguarInterface
+from jaguar.peripheral.jaguar_interface.JaguarFixtureSimulator import JaguarFixtureSimulator
+
+
+class LegacyStateMachine(StateMachine):
+    """
+    Replica of the previous run loop: sleep tick_period, then run the state.
+    """
+
+    def run(self):
+        self.start()
+
+        current_state = None
+        while self.running:
+            current_state = self.state
+            s = self.state_table[current_state]
+            s.enter()
+            self.state_timer = time.time()
+            while current_state == self.state and self.running:
+                time.sleep(self.tick_period)
+                s.run()
+            s.exit()
+
+
+class BenchState(enum.Enum):
+    WAIT = 0
+    DONE = 1
+
+
+class BenchMachine(object):
+    """
+    Two state machine: WAIT until the input is seen, DONE records the time of entry.
+    """
+
+    def __init__(self, cls, interface=None, tick_period=0.1):
+        self.sm = cls(prefix="bench", tick_period=tick_period)
+        self.sm.log_info = lambda *args, **kwargs: None
+        self.interface = interface
+        self.entered = threading.Event()
+        self.entered_at = None
+        self.runs = 0
+        self.sm.state_table = {
+            BenchState.WAIT: State(None, self.wait_run, None, self.wait_event),
+            BenchState.DONE: State(self.done_enter, None, None),
+        }
+        self.sm.state = BenchState.WAIT
+
+    def wait_run(self):
+        self.runs += 1
+        if self.interface is not None and self.interface.dut_present():
+            self.sm.state_transition(BenchState.DONE)
+
+    def wait_event(self, event, data):
+        if event == "go":
+            self.sm.state_transition(BenchState.DONE)
+
+    def done_enter(self):
+        self.entered_at = time.monotonic()
+        self.entered.set()
+        self.sm.stop()
+
+    def start(self):
+        self.sm.start_thread()
+
+    def join(self):
+        self.entered.wait(5.0)
+        self.sm.thread.join(5.0)
+
+
+def measure(cls, mode, n, sim=None, interface=None, tick_period=0.1):
+    latency = []
+    for i in range(n):
+        m = BenchMachine(cls, interface if mode == "dut" else None, tick_period)
+        if mode == "dut":
+            sim.dut_present = False
+            while interface.dut_present():
+                interface.wait_for_update()
+            if cls is not LegacyStateMachine:
+                # as JaguarSlot: the fixture update callback wakes the machine
+                def update(state, m=m):
+                    if interface.interface.dut_present(state):
+                        m.sm.wake()
+                interface.add_update_callback(update)
+        m.start()
+        # inject at a random phase of the tick
+        time.sleep(tick_period * ((i * 7919) % 97) / 97.0 + 0.01)
+        t = time.monotonic()
+        if mode == "transition":
+            m.sm.state_transition(BenchState.DONE)
+        elif mode == "event":
+            if cls is LegacyStateMachine:
+                # no event queue: the closest equivalent is a flag polled by run_fn
+                m.sm.state_transition(BenchState.DONE)
+            else:
+                m.sm.post("go")
+        else:
+            sim.dut_present = True
+        m.join()
+        if mode == "dut" and cls is not LegacyStateMachine:
+            interface.remove_update_callback(update)
+        latency.append(m.entered_at - t)
+    return latency
+
+
+def idle_rate(cls, tick_period=0.1, duration=2.0):
+    m = BenchMachine(cls, tick_period=tick_period)
+    m.start()
+    time.sleep(duration)
+    runs = m.runs
+    m.sm.stop()
+    return runs / duration
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.WARNING,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Event injection to state transition latency")
+    parser.add_argument('--n', type=int, default=20)
+    parser.add_argument('--tick', type=float, default=0.1, help="legacy tick period")
+    parser.add_argument('--no-fixture', action='store_true', help="skip the simulated fixture DUT insertion")
+    args = parser.parse_args()
+
+    sim = interface = None
+    modes = ["transition", "event"]
+    if not args.no_fixture:
+        sim = JaguarFixtureSimulator()
+        interface = JaguarInterface(port=sim.port)
+        interface.open()
+        modes.append("dut")
+
+    print("%-12s %-8s %10s %10s %10s" % ("mode", "machine", "mean ms", "p50 ms", "max ms"))
+    for mode in modes:
+        for cls in (LegacyStateMachine, StateMachine):
+            latency = [x * 1000 for x in measure(cls, mode, args.n, sim, interface, args.tick)]
+            print("%-12s %-8s %10.2f %10.2f %10.2f" % (
+                mode, "legacy" if cls is LegacyStateMachine else "event",
+                statistics.mean(latency), statistics.median(latency), max(latency)))
+
+    if interface is not None:
+        interface.close()
+        sim.close()
+
+    print("idle run_fn calls/s: legacy %.1f, event (tick 1.0) %.1f, event (no tick) %.1f" % (
+        idle_rate(LegacyStateMachine, args.tick),
+        idle_rate(StateMachine, 1.0),
+        idle_rate(StateMachine, None)))
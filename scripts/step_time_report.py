@@ -0,0 +1,117 @@
+"""
+Step time report.
+
+Ranks testcase steps by total time across the units in result logs (result.log, result.log.1, ...),
+with each step's time split into sleep, serial/fixture I/O, subprocess (programmer), CPU and other
+(waits not accounted for), as recorded in the step "timing" entries. Setup and teardown are listed
+as steps of their own. Retried attempts count too: their time was spent.
+
+    python -m scripts.step_time_report log/
+    python -m scripts.step_time_report log/result.log log/result.log.1 --top 20
+    python -m scripts.step_time_report log/ --csv steps.csv
+"""
+import argparse
+import collections
+import csv
+import json
+import statistics
+from pathlib import Path
+
+KINDS = ("sleep", "io", "subprocess", "cpu", "other")
+
+
+def result_files(paths):
+    for p in paths:
+        p = Path(p)
+        if p.is_dir():
+            yield from sorted(p.glob("result.log*"))
+        else:
+            yield p
+
+
+def read_results(paths):
+    """
+    Suite results (one JSON record per line) from result log files
+    """
+    for f in result_files(paths):
+        with open(f) as fp:
+            for line in fp:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                if "steps" in r:
+                    yield r
+
+
+def step_times(results):
+    """
+    (test_id, step name) -> list of timing splits, and the number of units
+    """
+    steps = collections.defaultdict(list)
+    units = 0
+    for r in results:
+        units += 1
+        for attempt in r["steps"]:
+            test_id = attempt.get("test_id")
+            for s in attempt.get("log") or []:
+                # a reused checkpoint took no time, its step is counted with the attempt that ran it
+                if s.get("timing") and not s.get("reused"):
+                    steps[(test_id, s.get("step_name"))].append(s["timing"])
+            for phase, timing in (attempt.get("timing") or {}).items():
+                steps[(test_id, "(%s)" % phase)].append(timing)
+    return steps, units
+
+
+def summarize(steps, units):
+    rows = []
+    for (test_id, step), timings in steps.items():
+        wall = [t.get("wall", 0.0) for t in timings]
+        row = {
+            "test_id": test_id,
+            "step": step,
+            "n": len(timings),
+            "total": sum(wall),
+            "per_unit": sum(wall) / units if units else 0.0,
+            "mean": statistics.mean(wall),
+            "p95": sorted(wall)[int(0.95 * (len(wall) - 1))],
+        }
+        for kind in KINDS:
+            row[kind] = sum(t.get(kind, 0.0) for t in timings)
+        rows.append(row)
+    rows.sort(key=lambda r: r["total"], reverse=True)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank test steps by time spent across units")
+    parser.add_argument("paths", nargs="+", help="result log files or log directories")
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--csv", help="write all steps to a CSV file")
+    args = parser.parse_args()
+
+    steps, units = step_times(read_results(args.paths))
+    rows = summarize(steps, units)
+    grand = sum(r["total"] for r in rows)
+    if not rows:
+        print("no step timing found in %s" % ", ".join(args.paths))
+        raise SystemExit(1)
+
+    print("%d units, %.1f s of testcase time (%.1f s per unit)" % (units, grand, grand / units))
+    print("  " + "  ".join("%s %.0f%%" % (k, 100 * sum(r[k] for r in rows) / grand) for k in KINDS))
+    print()
+    print("%-24s %-32s %6s %8s %6s %7s %7s  %s" % (
+        "testcase", "step", "n", "s/unit", "share", "mean", "p95", "  ".join("%5s" % k[:5] for k in KINDS)))
+    cumulative = 0.0
+    for r in rows[:args.top]:
+        cumulative += r["total"]
+        print("%-24s %-32s %6d %8.2f %5.1f%% %7.3f %7.3f  %s   (cum %.0f%%)" % (
+            str(r["test_id"])[:24], str(r["step"])[:32], r["n"], r["per_unit"], 100 * r["total"] / grand,
+            r["mean"], r["p95"], "  ".join("%4.0f%%" % (100 * r[k] / r["total"] if r["total"] else 0)
+                                           for k in KINDS), 100 * cumulative / grand))
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as fp:
+            w = csv.DictWriter(fp, fieldnames=list(rows[0].keys()))
+            w.writeheader()
+            w.writerows(rows)
@@ -0,0 +1,136 @@
+"""
+Test suite scheduler benchmark.
+
+Runs the preconditions DAG of a suite file through TestcaseScheduler twice, sequentially and with
+parallel=True, against the simulated fixture. Resource claims come from the testcase classes
+(or a "resources" key in the suite file). Each stand-in testcase drives the simulator through
+JaguarInterface when it claims the fixture and otherwise waits for a nominal duration of
+--scale x its suite timeout, standing in for DUT, programmer and network time.
+
+    python -m scripts.suite_schedule_benchmark
+    python -m scripts.suite_schedule_benchmark --suite assets/testsuite/jaguar_selftestV7.json --scale 0.01
+"""
+import argparse
+import ast
+import glob
+import importlib
+import json
+import logging
+import os
+import time
+
+from birch.core.scheduler import TestcaseScheduler
+from birch.test_status import TestStatus
+from birch.testcase.testcase import Resource, TestCase
+from jaguar.peripheral.interface import JaguarInterface
+from jaguar.peripheral.jaguar_interface.JaguarFixtureSimulator import JaguarFixtureSimulator
+
+
+def testcase_resources():
+    """
+    Resource claims by lower case class name. Without the testcase dependencies (rogers_api etc.)
+    installed, the class attributes are read from the source instead.
+    """
+    try:
+        importlib.import_module("jaguar.testcase")
+        return {cls.__name__.lower(): cls.resources for cls in TestCase.all_testcases(TestCase)}
+    except ImportError as e:
+        logging.warning("jaguar.testcase import failed (%s), reading resources from source" % e)
+
+    claims, bases = {}, {}
+    for path in glob.glob(os.path.join(os.path.dirname(__file__), "..", "jaguar", "testcase", "*.py")):
+        with open(path, 'r') as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            name = node.name.lower()
+            bases[name] = [b.id.lower() for b in node.bases if isinstance(b, ast.Name)]
+            for item in node.body:
+                if isinstance(item, ast.Assign) and [t.id for t in item.targets if isinstance(t, ast.Name)] == ["resources"]:
+                    claims[name] = tuple(getattr(Resource, e.attr) for e in item.value.elts)
+
+    def lookup(name):
+        if name in claims:
+            return claims[name]
+        for b in bases.get(name, []):
+            claim = lookup(b)
+            if claim is not None:
+                return claim
+        return None
+
+    return {name: lookup(name) for name in bases}
+
+
+class BenchTestCase(object):
+    """
+    Stand-in for a suite testcase with the attributes the scheduler uses.
+    """
+
+    def __init__(self, test_id, resources, duration, interface, timeline, t0):
+        self.test_id = test_id
+        self.resources = resources
+        self.duration = duration
+        self.interface = interface
+        self.timeline = timeline
+        self.t0 = t0
+        self.status = TestStatus.UNTESTED
+
+    def execute(self):
+        start = time.monotonic()
+        if self.resources is None or Resource.INTERFACE in self.resources:
+            self.interface.rails_set_dc_only(settle_s=0.25)
+            self.interface.capture(["sys_voltage", "dc_current"], n=10)
+        time.sleep(max(0.0, self.duration - (time.monotonic() - start)))
+        self.status = TestStatus.PASS
+        self.timeline.append((self.test_id, start - self.t0, time.monotonic() - self.t0))
+        return []
+
+
+def run(data, resources, interface, scale, parallel):
+    timeline = []
+    t0 = time.monotonic()
+    testcases = {}
+    preconditions = {}
+    for c in data["test_cases"]:
+        claim = c.get("resources", resources.get(c["target"].lower()))
+        testcases[c["id"]] = BenchTestCase(c["id"], claim, c["timeout"] * scale, interface, timeline, t0)
+        preconditions[c["id"]] = c["preconditions"]
+
+    scheduler = TestcaseScheduler(testcases, preconditions)
+    scheduler.run(lambda t: t.execute(), parallel=parallel)
+    interface.power_off()
+    return time.monotonic() - t0, timeline
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s.%(msecs)03d %(levelname)s:\t%(message)s', level=logging.WARNING,
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Sequential vs parallel test suite scheduling")
+    parser.add_argument('--suite', default="assets/testsuite/full/jaguar_productionV7.json")
+    parser.add_argument('--scale', type=float, default=0.02, help="nominal testcase duration / suite timeout")
+    args = parser.parse_args()
+
+    with open(args.suite, 'r') as f:
+        data = json.load(f)
+    resources = testcase_resources()
+
+    sim = JaguarFixtureSimulator()
+    interface = JaguarInterface(port=sim.port)
+    interface.open()
+
+    results = {}
+    for parallel in (False, False, True):
+        # first pass warms up the link and is discarded
+        results[parallel] = run(data, resources, interface, args.scale, parallel)
+
+    interface.close()
+    sim.close()
+
+    for parallel in (False, True):
+        elapsed, timeline = results[parallel]
+        print("%s: %.2fs" % ("parallel" if parallel else "sequential", elapsed))
+        for test_id, start, end in timeline:
+            print("  %-28s %6.2f - %6.2f" % (test_id, start, end))
+    print("speedup: %.2fx" % (results[False][0] / results[True][0]))
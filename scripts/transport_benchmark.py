@@ -0,0 +1,172 @@
+"""
+Jaguar fixture transport microbenchmark.
+
+Feeds a byte stream through the old byte-at-a-time packet state machine and through the
+incremental FrameParser used by SerialTransport, and reports frames/sec for each.
+
+The stream is either a raw capture from a fixture (--input, record one with --record) or a
+synthetic stream of update packets with some line noise mixed in.
+
+    python -m scripts.transport_benchmark
+    python -m scripts.transport_benchmark --record COM5 --seconds 10 --input fixture.bin
+    python -m scripts.transport_benchmark --input fixture.bin --chunk 64
+"""
+import argparse
+import binascii
+import os
+import random
+import struct
+import time
+
+from jaguar.peripheral.jaguar_interface.SerialTransport import FrameParser, RXPacketType, Transport
+
+try:
+    from PyCRC.CRCCCITT import CRCCCITT
+
+    def legacy_crc(data):
+        return CRCCCITT(version="FFFF").calculate(data)
+except ImportError:
+    def legacy_crc(data):
+        return binascii.crc_hqx(data, 0xFFFF)
+
+
+class LegacyParser(Transport):
+    """
+    The previous SerialTransport receive path: one call per byte, bytes concatenation,
+    six-state machine and a CRC object per packet.
+    """
+    WAIT_FOR_SOF, WAIT_FOR_DELIMITER, WAIT_FOR_LENGTH, WAIT_FOR_PACKET_TYPE, WAIT_FOR_CRC, WAIT_FOR_PAYLOAD = range(6)
+
+    def __init__(self):
+        self.packet_state = self.WAIT_FOR_SOF
+        self.packet_rx_buf = bytes()
+        self.packet_rx_len = 0
+        self.frames = 0
+
+    def reset_packet(self):
+        self.packet_state = self.WAIT_FOR_SOF
+        self.packet_rx_buf = bytes()
+        self.packet_rx_len = 0
+
+    def feed(self, data):
+        for i in range(len(data)):
+            self.receive_byte(data[i:i + 1])
+
+    def receive_byte(self, data):
+        self.packet_rx_buf += data
+        self.packet_rx_len += len(data)
+
+        if self.packet_state == self.WAIT_FOR_SOF:
+            if self.packet_rx_buf[0] == self.PACKET_SOF:
+                self.packet_state = self.WAIT_FOR_DELIMITER
+            else:
+                self.reset_packet()
+
+        if self.packet_state == self.WAIT_FOR_DELIMITER and self.packet_rx_len >= 4:
+            if int.from_bytes(self.packet_rx_buf[0:4], byteorder='little') == self.PACKET_DELIMITER:
+                self.packet_state = self.WAIT_FOR_LENGTH
+            else:
+                self.reset_packet()
+
+        if self.packet_state == self.WAIT_FOR_LENGTH and self.packet_rx_len >= 5:
+            length = self.packet_rx_buf[4]
+            if 0 < length <= (self.MAX_PACKET_LEN - self.PACKET_LEN_HEADER):
+                self.packet_state = self.WAIT_FOR_PACKET_TYPE
+            else:
+                self.reset_packet()
+
+        if self.packet_state == self.WAIT_FOR_PACKET_TYPE and self.packet_rx_len >= 6:
+            if RXPacketType.RX_PACKET_TYPE_NONE < self.packet_rx_buf[5] < RXPacketType.RX_PACKET_TYPE_MAX:
+                self.packet_state = self.WAIT_FOR_CRC
+            else:
+                self.reset_packet()
+
+        if self.packet_state == self.WAIT_FOR_CRC and self.packet_rx_len >= 8:
+            self.packet_state = self.WAIT_FOR_PAYLOAD
+
+        if self.packet_state == self.WAIT_FOR_PAYLOAD:
+            if self.packet_rx_len >= self.PACKET_LEN_HEADER + self.packet_rx_buf[4]:
+                payload = self.packet_rx_buf[self.PACKET_PAYLOAD_OFFSET:]
+                crc = (self.packet_rx_buf[7] << 8) | self.packet_rx_buf[6]
+                if crc == legacy_crc(payload):
+                    self.frames += 1
+                self.reset_packet()
+
+
+def update_packet(counter):
+    payload = struct.pack("<BBHI8H2IB", 1, counter & 0xFF, 0x0300, 0x0018,
+                          *[random.randint(0, 4095) for _ in range(8)], 128, 0, 0x01)
+    return Transport.PACKET_HEADER.pack(Transport.PACKET_DELIMITER, len(payload),
+                                        RXPacketType.RX_PACKET_TYPE_UPDATE,
+                                        binascii.crc_hqx(payload, 0xFFFF)) + payload
+
+
+def synthetic_stream(packets, noise=0.05):
+    random.seed(1)
+    out = bytearray()
+    for i in range(packets):
+        if random.random() < noise:
+            out += os.urandom(random.randint(1, 12))
+        out += update_packet(i)
+    return bytes(out)
+
+
+def record(port, seconds, filename):
+    import serial
+    ser = serial.Serial(port, 115200, timeout=0.1)
+    data = bytearray()
+    t0 = time.time()
+    while time.time() - t0 < seconds:
+        data += ser.read(4096)
+    ser.close()
+    with open(filename, "wb") as f:
+        f.write(data)
+    print("Recorded %d bytes from %s to %s" % (len(data), port, filename))
+
+
+def run(parser, stream, chunk):
+    t0 = time.perf_counter()
+    feed = parser.feed
+    view = memoryview(stream)
+    for i in range(0, len(stream), chunk):
+        feed(view[i:i + chunk])
+    dt = time.perf_counter() - t0
+    return parser.frames, dt
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--input", help="raw byte stream captured from the fixture")
+    ap.add_argument("--record", metavar="PORT", help="record --seconds of fixture traffic to --input first")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--packets", type=int, default=20000, help="synthetic stream length")
+    ap.add_argument("--chunk", type=int, default=64, help="bytes per feed() call for the new parser")
+    args = ap.parse_args()
+
+    if args.record:
+        record(args.record, args.seconds, args.input or "fixture_capture.bin")
+        args.input = args.input or "fixture_capture.bin"
+
+    if args.input:
+        with open(args.input, "rb") as f:
+            stream = f.read()
+    else:
+        stream = synthetic_stream(args.packets)
+
+    print("Stream: %d bytes" % len(stream))
+    results = [
+        ("legacy, 1 byte/call", LegacyParser(), 1),
+        ("FrameParser, 1 byte/call", FrameParser(), 1),
+        ("FrameParser, %d bytes/call" % args.chunk, FrameParser(), args.chunk),
+    ]
+    baseline = None
+    for name, parser, chunk in results:
+        frames, dt = run(parser, stream, chunk)
+        rate = frames / dt if dt > 0 else float("inf")
+        if baseline is None:
+            baseline = rate
+        print("%-32s frames=%-7d %8.3fs %12.0f frames/s  x%.1f" % (name, frames, dt, rate, rate / baseline))
+
+
+if __name__ == "__main__":
+    main()